@@ -0,0 +1,132 @@
+# backend/api/batching.py
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+@contextmanager
+def run_inline():
+    """
+    Within this block, calls from the current thread to any MicroBatcher run
+    ``batch_fn`` on this thread as a batch of one instead of queueing. Used
+    while profiling a request, since cProfile only sees the calling thread.
+    """
+    previous = getattr(_local, "inline", False)
+    _local.inline = True
+    try:
+        yield
+    finally:
+        _local.inline = previous
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item calls into small batches.
+
+    Callers submit one item at a time from any thread. A background thread
+    takes the first queued item, keeps collecting until ``max_batch`` items
+    are waiting or ``max_latency_ms`` has passed, then calls
+    ``batch_fn(items)`` once and resolves every caller's future with the
+    result at the same position. A blocking call waits at most ``timeout``
+    seconds and then raises ``concurrent.futures.TimeoutError``.
+    """
+
+    def __init__(self, batch_fn, max_batch: int = 32, max_latency_ms: float = 5.0, timeout: float = 30.0):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_latency = max(0.0, float(max_latency_ms)) / 1000.0
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        # Batch-size distribution: {batch_size: number_of_batches}
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.items = 0
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def submit(self, item) -> Future:
+        """
+        Queue one item and return a Future for its result.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        if getattr(_local, "inline", False):
+            return self.batch_fn([item])[0]
+        return self.submit(item).result(timeout=self.timeout)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches = sum(self.batch_sizes.values())
+            return {
+                "batches": batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / batches, 2) if batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            }
+
+    # -------------------------
+    # Worker thread
+    # -------------------------
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so a worker started in a gunicorn
+        # master has to be restarted in each child.
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            if self._pid != pid:
+                self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name="decision-microbatcher", daemon=True)
+            self._pid = pid
+            self._thread.start()
+
+    def _run(self):
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(q.get(timeout=remaining))
+                    else:
+                        batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        with self._stats_lock:
+            self.batch_sizes[len(batch)] += 1
+            self.items += len(batch)
+
+        try:
+            results = list(self.batch_fn([item for item, _ in batch]))
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
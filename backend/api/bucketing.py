@@ -0,0 +1,101 @@
+# backend/api/bucketing.py
+import numpy as np
+
+# What to do with texts longer than the embedder's max sequence length:
+# "head" lets the model truncate, "head_tail" keeps the start and the end,
+# "chunk_mean" embeds every window and mean-pools them.
+LONG_TEXT_POLICIES = ("head", "head_tail", "chunk_mean")
+
+
+def plan_batches(lengths, token_budget: int, max_batch: int) -> list:
+    """
+    Group item indices into batches of similar length.
+
+    Items are sorted by length and packed greedily while the padded cost of
+    the batch (items x longest item) stays within ``token_budget`` and the
+    batch holds at most ``max_batch`` items. A single item longer than the
+    budget still gets a batch of its own.
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches, current, longest = [], [], 0
+    for i in order:
+        longest_if_added = max(longest, lengths[i])
+        if current and (len(current) >= max_batch or (len(current) + 1) * longest_if_added > token_budget):
+            batches.append(current)
+            current, longest_if_added = [], lengths[i]
+        current.append(i)
+        longest = longest_if_added
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _pieces(text, ids, max_tokens, tokenizer, policy, head_fraction, max_chunks):
+    """
+    Split one text into the pieces that get embedded, as (text, n_tokens).
+    ``max_tokens`` excludes the two special tokens the model adds.
+    """
+    if len(ids) <= max_tokens or policy == "head":
+        return [(text, min(len(ids), max_tokens) + 2)]
+
+    if policy == "head_tail":
+        head = int(max_tokens * head_fraction)
+        tail = max_tokens - head
+        kept = ids[:head] + (ids[-tail:] if tail else [])
+        return [(tokenizer.decode(kept), max_tokens + 2)]
+
+    windows = [ids[start:start + max_tokens] for start in range(0, len(ids), max_tokens)][:max_chunks]
+    return [(tokenizer.decode(w), len(w) + 2) for w in windows]
+
+
+def encode_bucketed(embedder, texts, token_budget: int, max_batch: int,
+                    policy: str = "head", head_fraction: float = 0.5, max_chunks: int = 16) -> np.ndarray:
+    """
+    Embed ``texts`` in length-bucketed batches capped by a token budget.
+
+    Texts are tokenized once to measure them, long texts are handled
+    according to ``policy``, similar lengths are batched together so little
+    compute goes to padding, and the embeddings come back in input order.
+    Under "head" the measuring pass stops at the model's limit, since the
+    tokens past it are never used.
+    """
+    if policy not in LONG_TEXT_POLICIES:
+        raise ValueError(f"Unknown long-text policy {policy!r}; expected one of {LONG_TEXT_POLICIES}")
+
+    if not texts:
+        return embedder.encode([], convert_to_numpy=True)
+
+    tokenizer = embedder.tokenizer
+    max_tokens = embedder.get_max_seq_length() - 2
+    if policy == "head":
+        ids = tokenizer(list(texts), add_special_tokens=False, truncation=True, max_length=max_tokens,
+                        verbose=False)["input_ids"]
+    else:
+        ids = tokenizer(list(texts), add_special_tokens=False, truncation=False, verbose=False)["input_ids"]
+
+    pieces, owners = [], []
+    for i, (text, text_ids) in enumerate(zip(texts, ids)):
+        for piece in _pieces(text, text_ids, max_tokens, tokenizer, policy, head_fraction, max_chunks):
+            pieces.append(piece)
+            owners.append(i)
+
+    lengths = [n for _, n in pieces]
+    piece_emb = None
+    for batch in plan_batches(lengths, token_budget, max_batch):
+        emb = embedder.encode([pieces[j][0] for j in batch], batch_size=len(batch), convert_to_numpy=True)
+        if piece_emb is None:
+            piece_emb = np.empty((len(pieces), emb.shape[1]), dtype=np.float32)
+        piece_emb[batch] = emb
+
+    if len(pieces) == len(texts):
+        return piece_emb
+
+    # chunk_mean: average the windows of each text, keeping unit norm when
+    # the embedder produces normalized vectors
+    owners = np.asarray(owners)
+    out = np.zeros((len(texts), piece_emb.shape[1]), dtype=np.float32)
+    np.add.at(out, owners, piece_emb)
+    out /= np.bincount(owners, minlength=len(texts))[:, None]
+    if np.allclose(np.linalg.norm(piece_emb, axis=1), 1.0, atol=1e-3):
+        out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+    return out
@@ -0,0 +1,216 @@
+# backend/api/corpus_stats.py
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from api.term_stats import count_terms
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Built by `python manage.py build_corpus_stats`
+CORPUS_STATS_DIR = Path(os.environ.get("DECISION_CORPUS_STATS_DIR", PROJECT_ROOT / "data" / "corpus_stats"))
+
+# Response names of the dataset's 0/1 labels
+LABEL_NAMES = {0: "normal", 1: "flagged"}
+LABEL_MAP = {"FAKE": 1, "REAL": 0, "fake": 1, "real": 0, "1": 1, "0": 0, 1: 1, 0: 0}
+
+
+class CorpusStats:
+    """
+    Label counts and per-label term frequencies of the training corpus.
+
+    Saved under one directory:
+
+    * ``meta.json``: label counts, source file and vocabulary size
+    * ``terms.bin`` + ``offsets.npy``: the vocabulary as one UTF-8 blob
+    * ``counts.npy``: ``(n_terms, n_labels)`` term frequencies
+    * ``first_seen.npy``: ``(n_terms, n_labels)`` rank of each term's first
+      occurrence within each label
+    * ``order_<label>.npy``: term indices by descending frequency for that
+      label, ties in first-seen order as ``Counter.most_common`` gives them
+
+    ``load`` memory-maps the arrays, so label counts are a dict lookup and
+    the top ``k`` terms of a label cost ``O(k)`` however large the corpus.
+    """
+
+    def __init__(self, meta, blob, offsets, counts, first_seen, orders):
+        self.meta = meta
+        self._blob = blob
+        self._offsets = offsets
+        self._counts = counts
+        self._first_seen = first_seen
+        self._orders = orders
+        self._columns = {name: i for i, name in enumerate(meta["labels"])}
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> "CorpusStats":
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text())
+        mode = "r" if mmap else None
+        blob = np.memmap(directory / "terms.bin", dtype=np.uint8, mode="r") if meta["n_terms"] else b""
+        return cls(
+            meta,
+            blob,
+            np.load(directory / "offsets.npy", mmap_mode=mode),
+            np.load(directory / "counts.npy", mmap_mode=mode),
+            np.load(directory / "first_seen.npy", mmap_mode=mode),
+            {name: np.load(directory / f"order_{name}.npy", mmap_mode=mode) for name in meta["labels"]},
+        )
+
+    @property
+    def labels(self) -> list:
+        return list(self.meta["labels"])
+
+    def label_counts(self) -> dict:
+        return dict(self.meta["label_counts"])
+
+    def _term(self, i: int) -> str:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def top_terms(self, label: str, k: int = 50) -> list:
+        """
+        The ``k`` most frequent ``(term, count)`` pairs for ``label``.
+        """
+        column = self._columns[label]
+        out = []
+        for i in self._orders[label][:k]:
+            count = int(self._counts[i, column])
+            if count == 0:
+                break
+            out.append((self._term(i), count))
+        return out
+
+    def term_counters(self) -> dict:
+        """
+        ``{label: Counter}`` of every term in first-seen order, for
+        incremental rebuilds.
+        """
+        counters = {}
+        for name, column in self._columns.items():
+            present = np.flatnonzero(self._counts[:, column])
+            present = present[np.argsort(self._first_seen[present, column], kind="stable")]
+            counters[name] = Counter({self._term(i): int(self._counts[i, column]) for i in present})
+        return counters
+
+
+# -------------------------
+# Building
+# -------------------------
+def accumulate(chunks, label_counts: Counter = None, term_counts: dict = None):
+    """
+    Fold ``(texts, labels)`` chunks into label counts and per-label term
+    counters, with the same filtering the training script applies: known
+    labels only, texts longer than 10 characters.
+    """
+    label_counts = Counter() if label_counts is None else label_counts
+    term_counts = {name: Counter() for name in LABEL_NAMES.values()} if term_counts is None else term_counts
+    for texts, labels in chunks:
+        if labels is None:
+            raise ValueError("corpus statistics need a label column")
+        for text, raw_label in zip(texts, labels):
+            label = LABEL_MAP.get(raw_label.strip() if isinstance(raw_label, str) else raw_label)
+            if label is None or text is None or len(str(text)) <= 10:
+                continue
+            name = LABEL_NAMES[label]
+            label_counts[name] += 1
+            count_terms([text], term_counts[name])
+    return label_counts, term_counts
+
+
+def save_corpus_stats(directory, label_counts, term_counts, source: str = None) -> dict:
+    """
+    Write the artifact to ``directory``, replacing it as a whole: the new
+    files go to a sibling folder that is renamed into place, so workers that
+    still map the old files keep a consistent view.
+    """
+    directory = Path(directory)
+    labels = list(LABEL_NAMES.values())
+
+    vocab = {}
+    for name in labels:
+        for term in term_counts.get(name, ()):
+            vocab.setdefault(term, len(vocab))
+    counts = np.zeros((len(vocab), len(labels)), dtype=np.int64)
+    first_seen = np.full((len(vocab), len(labels)), len(vocab), dtype=np.int64)
+    for column, name in enumerate(labels):
+        for rank, (term, count) in enumerate(term_counts.get(name, {}).items()):
+            counts[vocab[term], column] = count
+            first_seen[vocab[term], column] = rank
+
+    encoded = [term.encode("utf-8") for term in vocab]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    (tmp / "terms.bin").write_bytes(b"".join(encoded))
+    np.save(tmp / "offsets.npy", offsets)
+    np.save(tmp / "counts.npy", counts)
+    np.save(tmp / "first_seen.npy", first_seen)
+    for column, name in enumerate(labels):
+        order = np.lexsort((first_seen[:, column], -counts[:, column]))
+        np.save(tmp / f"order_{name}.npy", order.astype(np.int64))
+    meta = {
+        "source": source,
+        "labels": labels,
+        "label_counts": {name: int(label_counts.get(name, 0)) for name in labels},
+        "n_terms": len(vocab),
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    old = directory.with_name(directory.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if directory.exists():
+        os.replace(directory, old)
+    os.replace(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+
+# -------------------------
+# Serving
+# -------------------------
+# While the artifact is missing, the directory is checked again at most
+# this often, so a build is picked up without a restart
+MISSING_RECHECK_SECONDS = 30.0
+
+_stats = None
+_stats_lock = threading.Lock()
+_missing_checked_at = None
+_missing_logged = False
+
+
+def get_corpus_stats():
+    """
+    The memory-mapped artifact of this process, or None when it has not
+    been built. Loaded once, on first use; a miss is cached for
+    ``MISSING_RECHECK_SECONDS`` and logged once per process.
+    """
+    global _stats, _missing_checked_at, _missing_logged
+    if _stats is not None:
+        return _stats
+    checked_at = _missing_checked_at
+    if checked_at is not None and time.monotonic() - checked_at < MISSING_RECHECK_SECONDS:
+        return None
+    with _stats_lock:
+        if _stats is None:
+            if not (CORPUS_STATS_DIR / "meta.json").exists():
+                _missing_checked_at = time.monotonic()
+                if not _missing_logged:
+                    _missing_logged = True
+                    logger.warning("No corpus statistics at %s. Run: python manage.py build_corpus_stats",
+                                   CORPUS_STATS_DIR)
+                return None
+            _stats = CorpusStats.load(CORPUS_STATS_DIR)
+            _missing_checked_at = None
+    return _stats
@@ -1,63 +1,515 @@
 # backend/api/decision.py
+from itertools import islice
 from pathlib import Path
-import joblib
-from sentence_transformers import SentenceTransformer
-import numpy as np
+from typing import TYPE_CHECKING
 import os 
 
+from api.executor import BoundedExecutor
+from api.metrics import BATCH_SIZE, PREDICTION_ERRORS, STAGE_SECONDS, registry as metrics_registry
+from api.registry import ModelRegistry
+from api.utils.preprocess import INVALID_TEXT, is_valid_text, normalize_batch
+
+# numpy and the modules built on it are imported where they are used, so
+# that importing this module (which the WSGI/ASGI entry points do) stays
+# cheap when the models load lazily. See api/scripts/bench_startup.py.
+if TYPE_CHECKING:
+    import numpy as np
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 MODELS_DIR = PROJECT_ROOT / "backend" / "api" / "models"
 
+# When to load the models: "lazy" (first request), "eager" (at server start)
+# or "background" (at server start, without blocking; see /api/ready/)
+LOAD_MODE = os.environ.get("DECISION_LOAD_MODE", "lazy")
+# Seconds before a model whose loader failed is tried again
+MODEL_RETRY_SECONDS = float(os.environ.get("DECISION_MODEL_RETRY_SECONDS", "30"))
+
+# Embedder backend: "torch" (SentenceTransformer), "onnx" or "onnx-int8"
+# (ONNX Runtime; export with api/scripts/export_onnx_embedder.py), or "stub"
+# (deterministic hashed bag of words, for offline tests and benchmarks)
+EMBED_BACKEND = os.environ.get("DECISION_EMBED_BACKEND", "torch")
+
+# Stub embedder (DECISION_EMBED_BACKEND=stub, see api/embedders.py): vector
+# size (the classifier's input size) and simulated cost per word in us
+STUB_EMBED_DIM = int(os.environ.get("DECISION_STUB_EMBED_DIM", "384"))
+STUB_TOKEN_US = float(os.environ.get("DECISION_STUB_TOKEN_US", "0"))
+
+# Number of texts handed to the embedder per forward pass in batch mode
+EMBED_BATCH_SIZE = int(os.environ.get("DECISION_EMBED_BATCH_SIZE", "32"))
+
+# Length bucketing: sort texts by token count and cap each forward pass by a
+# padded token budget instead of an item count
+LENGTH_BUCKETING = os.environ.get("DECISION_LENGTH_BUCKETING", "1") == "1"
+TOKEN_BUDGET = int(os.environ.get("DECISION_TOKEN_BUDGET", "8192"))
+
+# Texts beyond the embedder's max sequence length: "head", "head_tail" or
+# "chunk_mean" (see api/bucketing.py)
+LONG_TEXT_POLICY = os.environ.get("DECISION_LONG_TEXT_POLICY", "head")
+HEAD_FRACTION = float(os.environ.get("DECISION_HEAD_FRACTION", "0.5"))
+
+# Document mode: overlapping word windows scored separately, then aggregated
+DOC_WINDOW_WORDS = int(os.environ.get("DECISION_DOC_WINDOW_WORDS", "180"))
+DOC_STRIDE_WORDS = int(os.environ.get("DECISION_DOC_STRIDE_WORDS", "135"))
+DOC_MAX_CHUNKS = int(os.environ.get("DECISION_DOC_MAX_CHUNKS", "64"))
+# Largest "window" / "stride" a client may request, in words
+DOC_MAX_WINDOW_WORDS = int(os.environ.get("DECISION_DOC_MAX_WINDOW_WORDS", "512"))
+
+# Server-side micro-batching of concurrent predict_fake calls (off by default)
+MICROBATCH_ENABLED = os.environ.get("DECISION_MICROBATCH", "0") == "1"
+MICROBATCH_MAX_BATCH = int(os.environ.get("DECISION_MICROBATCH_MAX_BATCH", "32"))
+MICROBATCH_MAX_LATENCY_MS = float(os.environ.get("DECISION_MICROBATCH_MAX_LATENCY_MS", "5"))
+# Longest a request waits for its micro-batch result (model loading included)
+MICROBATCH_TIMEOUT = float(os.environ.get("DECISION_MICROBATCH_TIMEOUT", "60"))
+
+# Async endpoint: inference threads, requests allowed to wait for one (beyond
+# that: 429), the Retry-After hint in seconds and the per-request timeout
+ASYNC_WORKERS = int(os.environ.get("DECISION_ASYNC_WORKERS", "4"))
+ASYNC_QUEUE = int(os.environ.get("DECISION_ASYNC_QUEUE", "64"))
+ASYNC_RETRY_AFTER = int(os.environ.get("DECISION_ASYNC_RETRY_AFTER", "1"))
+ASYNC_TIMEOUT = float(os.environ.get("DECISION_ASYNC_TIMEOUT", "30"))
+
+# Embedding cache: in-memory LRU entries (0 disables) and optional SQLite file
+EMBED_CACHE_SIZE = int(os.environ.get("DECISION_EMBED_CACHE_SIZE", "10000"))
+EMBED_CACHE_PATH = os.environ.get("DECISION_EMBED_CACHE_PATH", "")
+
+# Memory-map the flat forest's and distilled heads' arrays from the page
+# cache instead of copying them into each process. An sklearn forest loaded
+# from the joblib is copied anyway (Tree.__setstate__ copies its nodes)
+RF_MMAP = os.environ.get("DECISION_RF_MMAP", "1") == "1"
+
+# Forest engine: "flat" serves the array export in models/fake_rf_flat/
+# (falls back to sklearn when it is missing or stale), "sklearn" the joblib
+RF_ENGINE = os.environ.get("DECISION_RF_ENGINE", "flat")
+
+# Classifier head: "forest" (fake_rf), or a head distilled from it by the
+# trainer, "linear" or "mlp" (models/fake_head_<kind>/)
+HEAD = os.environ.get("DECISION_HEAD", "forest")
+
+LABEL_MAP = {0: "real", 1: "fake"}
+
 RF_MODEL_PATH = MODELS_DIR / "fake_rf.joblib"
+RF_FLAT_DIR = MODELS_DIR / "fake_rf_flat"
 EMBED_MODEL_NAME_PATH = MODELS_DIR / "embed_model_name.txt"
+ONNX_DIR = MODELS_DIR / "onnx"
 
 # -------------------------
-# Load RandomForest + Embedder
+# Model loaders (run lazily through the registry)
 # -------------------------
-rf_model = None
-try:
-    if RF_MODEL_PATH.exists():
-        rf_model = joblib.load(RF_MODEL_PATH)
-    else:
-        raise FileNotFoundError(f"Model file not found at: {RF_MODEL_PATH}")
-except Exception as e:
-    print(f"[WARN] Could not load RandomForest model: {e}")
-
-embedder = None
-try:
-    if EMBED_MODEL_NAME_PATH.exists():
-        embed_model_name = EMBED_MODEL_NAME_PATH.read_text().strip()
-        embedder = SentenceTransformer(embed_model_name)
-    else:
+def _read_embed_model_name() -> str:
+    if not EMBED_MODEL_NAME_PATH.exists():
         raise FileNotFoundError(f"Embedder name file not found at: {EMBED_MODEL_NAME_PATH}")
-except Exception as e:
-    print(f"[WARN] Could not load embedder model: {e}")
+    return EMBED_MODEL_NAME_PATH.read_text().strip()
+
+
+def _load_flat_forest():
+    import json
+    from api.forest import FlatForest, matches_source
+
+    meta_path = RF_FLAT_DIR / "meta.json"
+    if not meta_path.exists():
+        print(f"[WARN] No flat forest at {RF_FLAT_DIR}; using sklearn. Run api/scripts/export_flat_forest.py")
+        return None
+    if not matches_source(json.loads(meta_path.read_text()), RF_MODEL_PATH):
+        print(f"[WARN] {RF_FLAT_DIR} is older than {RF_MODEL_PATH.name}; using sklearn. Re-run api/scripts/export_flat_forest.py")
+        return None
+    return FlatForest.load(RF_FLAT_DIR, mmap=RF_MMAP)
+
+
+def _load_distilled_head():
+    import json
+    from api.forest import matches_source
+    from api.heads import DenseHead, head_dir_for
+
+    head_dir = head_dir_for(MODELS_DIR, HEAD)
+    meta_path = head_dir / "meta.json"
+    if not meta_path.exists():
+        print(f"[WARN] No {HEAD} head at {head_dir}; serving the forest. Re-run api/scripts/train_fake_classifier.py")
+        return None
+    if not matches_source(json.loads(meta_path.read_text()), RF_MODEL_PATH):
+        print(f"[WARN] {head_dir} was distilled from an older {RF_MODEL_PATH.name}; serving the forest. "
+              "Re-run api/scripts/train_fake_classifier.py")
+        return None
+    return DenseHead.load(head_dir, mmap=RF_MMAP)
+
+
+def _load_rf_model():
+    import joblib
+
+    if HEAD != "forest":
+        head = _load_distilled_head()
+        if head is not None:
+            return head
+
+    if RF_ENGINE == "flat":
+        flat = _load_flat_forest()
+        if flat is not None:
+            return flat
+
+    if not RF_MODEL_PATH.exists():
+        raise FileNotFoundError(f"Model file not found at: {RF_MODEL_PATH}")
+    return joblib.load(RF_MODEL_PATH, mmap_mode="r" if RF_MMAP else None)
+
+
+def _load_embedder():
+    from api.embedders import load_embedder
+
+    return load_embedder(_read_embed_model_name(), EMBED_BACKEND, ONNX_DIR,
+                         stub_dimension=STUB_EMBED_DIM, stub_token_us=STUB_TOKEN_US)
+
+
+def _embed_cache_key_name() -> str:
+    # Backends and long-text policies do not produce identical vectors for
+    # the same text, so each combination caches separately
+    name = _read_embed_model_name()
+    if EMBED_BACKEND != "torch":
+        name = f"{name}@{EMBED_BACKEND}"
+    if LONG_TEXT_POLICY != "head":
+        name = f"{name}#{LONG_TEXT_POLICY}"
+    return name
+
+
+def _load_embed_cache():
+    from api.embed_cache import EmbeddingCache
+
+    if EMBED_CACHE_SIZE <= 0 and not EMBED_CACHE_PATH:
+        return None
+    return EmbeddingCache(_embed_cache_key_name(), capacity=EMBED_CACHE_SIZE, disk_path=EMBED_CACHE_PATH or None)
+
+
+registry = ModelRegistry(retry_seconds=MODEL_RETRY_SECONDS)
+registry.register("rf_model", _load_rf_model)
+registry.register("embedder", _load_embedder)
+# Without the cache every text is embedded, which is slower but correct
+registry.register("embed_cache", _load_embed_cache, required=False)
+
+
+def warmup(background: bool = False):
+    """
+    Load all models now instead of on the first request.
+    """
+    registry.warmup(background=background)
+
+
+def is_ready() -> bool:
+    return registry.is_ready()
+
+
+def startup():
+    """
+    Apply DECISION_LOAD_MODE; called from the WSGI/ASGI entry points.
+    """
+    if LOAD_MODE == "eager":
+        warmup()
+    elif LOAD_MODE == "background":
+        warmup(background=True)
+
+
+def __getattr__(name):
+    # Backward compatibility for code reading decision.rf_model / decision.embedder
+    if name in ("rf_model", "embedder", "embed_cache"):
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _encode_uncached(embedder, texts, batch_size: int) -> "np.ndarray":
+    BATCH_SIZE.observe(len(texts), "embed")
+    with STAGE_SECONDS.time("embed"):
+        # A lone text has nothing to be batched with; under "head" the model
+        # truncates it itself, so measuring it first would only tokenize twice
+        single_head = len(texts) == 1 and LONG_TEXT_POLICY == "head"
+        if LENGTH_BUCKETING and hasattr(embedder, "tokenizer") and not single_head:
+            from api.bucketing import encode_bucketed
+
+            return encode_bucketed(
+                embedder, texts,
+                token_budget=TOKEN_BUDGET,
+                max_batch=batch_size,
+                policy=LONG_TEXT_POLICY,
+                head_fraction=HEAD_FRACTION,
+            )
+        return embedder.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+
+def encode_texts(texts, batch_size: int = EMBED_BATCH_SIZE) -> "np.ndarray":
+    """
+    Embed texts, serving repeats from the embedding cache.
+
+    Texts get the same "embedding" normalization as the training corpus.
+    Only texts missing from the cache reach the transformer, and duplicates
+    inside one call are embedded once.
+    """
+    import numpy as np
+    from api.embed_cache import normalize_for_key
+
+    with STAGE_SECONDS.time("normalize"):
+        texts = normalize_batch(texts, "embedding")
+    embedder = registry.get("embedder")
+    embed_cache = registry.get("embed_cache")
+    if embed_cache is None:
+        return _encode_uncached(embedder, texts, batch_size)
+
+    found = embed_cache.get_many(texts)
+    missing = {}
+    for i, emb in enumerate(found):
+        if emb is None:
+            missing.setdefault(normalize_for_key(texts[i]), []).append(i)
+
+    if missing:
+        fresh_texts = [texts[rows[0]] for rows in missing.values()]
+        fresh = _encode_uncached(embedder, fresh_texts, batch_size)
+        embed_cache.put_many(fresh_texts, fresh)
+        for rows, emb in zip(missing.values(), fresh):
+            for i in rows:
+                found[i] = emb
+
+    return np.vstack(found)
 
 # -------------------------
 # Prediction Function
 # -------------------------
+def classify_embeddings(embeddings) -> list:
+    """
+    Score a matrix of embeddings with one forest evaluation.
+
+    The label is the argmax of the class probabilities (exactly what
+    ``RandomForestClassifier.predict`` does internally), so the trees are
+    traversed once instead of once for ``predict`` and again for
+    ``predict_proba``. Each result carries the winning label, its
+    probability and the full per-class distribution, in percent.
+    """
+    rf_model = registry.get("rf_model")
+    BATCH_SIZE.observe(len(embeddings), "classify")
+    with STAGE_SECONDS.time("classify"):
+        probs = rf_model.predict_proba(embeddings)
+    names = _class_names(rf_model)
+    return [_format_result(names, row) for row in probs]
+
+
+def _class_names(rf_model) -> list:
+    return [LABEL_MAP.get(c, str(c)) for c in rf_model.classes_]
+
+
+def _format_result(names, row) -> dict:
+    best = int(row.argmax())
+    return {
+        "label": names[best],
+        "probability": round(float(row[best]) * 100, 2),
+        "probabilities": {name: round(float(p) * 100, 2) for name, p in zip(names, row)},
+    }
+
+
 def predict_fake(text: str) -> dict:
     """
     Predict whether given text is fake or real.
+
+    With micro-batching enabled the call is queued and scored together with
+    other concurrent calls through ``predict_fake_batch``.
+    """
+    if _microbatcher is not None:
+        from concurrent.futures import TimeoutError as FuturesTimeout
+
+        try:
+            return _microbatcher(text)
+        except FuturesTimeout:
+            PREDICTION_ERRORS.inc("timeout")
+            return {"error": f"Prediction timed out after {_microbatcher.timeout:g}s"}
+        except Exception as e:
+            PREDICTION_ERRORS.inc("exception")
+            return {"error": f"An error occurred during prediction: {str(e)}"}
+
+    if registry.get("rf_model") is None or registry.get("embedder") is None:
+        PREDICTION_ERRORS.inc("model_unavailable")
+        return {"error": "Prediction model not found. Check decision.py."}
+    if not is_valid_text(text):
+        PREDICTION_ERRORS.inc("invalid_input")
+        return {"error": INVALID_TEXT}
+
+    try:
+        return classify_embeddings(encode_texts([text]))[0]
+    except Exception as e:
+        PREDICTION_ERRORS.inc("exception")
+        return {"error": f"An error occurred during prediction: {str(e)}"}
+
+
+def predict_fake_batch(texts, batch_size: int = EMBED_BATCH_SIZE) -> list:
+    """
+    Predict fake/real for many texts at once.
+
+    Texts are embedded in minibatches of ``batch_size`` and the forest is
+    evaluated once on the stacked embeddings. Results are returned in input
+    order; an invalid or failing item gets its own ``{"error": ...}`` entry
+    instead of failing the whole batch.
+    """
+    import numpy as np
+
+    if registry.get("rf_model") is None or registry.get("embedder") is None:
+        PREDICTION_ERRORS.inc("model_unavailable", amount=len(texts))
+        return [{"error": "Prediction model not found. Check decision.py."} for _ in texts]
+
+    results = [None] * len(texts)
+    valid = []
+    for i, text in enumerate(texts):
+        if is_valid_text(text):
+            valid.append(i)
+        else:
+            PREDICTION_ERRORS.inc("invalid_input")
+            results[i] = {"error": INVALID_TEXT}
+
+    # Embed in minibatches; a failing minibatch is retried item by item so
+    # only the offending rows end up with an error.
+    rows, embs = [], []
+    for start in range(0, len(valid), batch_size):
+        chunk = valid[start:start + batch_size]
+        try:
+            embs.append(encode_texts([texts[i] for i in chunk], batch_size=batch_size))
+            rows.extend(chunk)
+        except Exception:
+            for i in chunk:
+                try:
+                    embs.append(encode_texts([texts[i]]))
+                    rows.append(i)
+                except Exception as e:
+                    PREDICTION_ERRORS.inc("exception")
+                    results[i] = {"error": f"An error occurred during prediction: {str(e)}"}
+
+    if not rows:
+        return results
+
+    try:
+        scored = classify_embeddings(np.vstack(embs))
+    except Exception as e:
+        PREDICTION_ERRORS.inc("exception", amount=len(rows))
+        for i in rows:
+            results[i] = {"error": f"An error occurred during prediction: {str(e)}"}
+        return results
+
+    for i, result in zip(rows, scored):
+        results[i] = result
+    return results
+
+
+def predict_fake_document(text: str, aggregation: str = "mean", window: int = DOC_WINDOW_WORDS,
+                          stride: int = DOC_STRIDE_WORDS, max_chunks: int = DOC_MAX_CHUNKS) -> dict:
+    """
+    Classify a long article window by window.
+
+    The text is split into overlapping word windows (at most ``max_chunks``),
+    the windows are embedded and scored in groups of ``EMBED_BATCH_SIZE``
+    and their class probabilities are folded into one document score by
+    ``aggregation`` ("mean", "max" or "attention"). Per-chunk scores are
+    returned alongside.
     """
-    if rf_model is None or embedder is None:
+    from api.documents import StreamingAggregator, iter_windows
+
+    rf_model = registry.get("rf_model")
+    if rf_model is None or registry.get("embedder") is None:
+        PREDICTION_ERRORS.inc("model_unavailable")
         return {"error": "Prediction model not found. Check decision.py."}
 
     try:
-        emb = embedder.encode([text], convert_to_numpy=True)
-        pred = rf_model.predict(emb)[0]
-        prob = max(rf_model.predict_proba(emb)[0])
+        names = _class_names(rf_model)
+        positive = names.index("fake") if "fake" in names else len(names) - 1
+        aggregator = StreamingAggregator(len(names), positive, aggregation)
+        # One window past the cap tells whether the document was cut short
+        windows = iter_windows(text, window=window, stride=stride, max_chunks=max_chunks + 1)
+
+        chunks = []
+        while len(chunks) < max_chunks:
+            group = list(islice(windows, min(EMBED_BATCH_SIZE, max_chunks - len(chunks))))
+            if not group:
+                break
+            embeddings = encode_texts([chunk for _, _, chunk in group])
+            BATCH_SIZE.observe(len(group), "classify")
+            with STAGE_SECONDS.time("classify"):
+                probs = rf_model.predict_proba(embeddings)
+            aggregator.update(probs)
+            for (start, end, _), row in zip(group, probs):
+                chunk = _format_result(names, row)
+                chunks.append({"index": len(chunks), "start_word": start, "end_word": end, **chunk})
 
-        label_map = {0: "real", 1: "fake"}
-        label_name = label_map.get(pred, str(pred))
+        if not chunks:
+            return {"error": "text is empty"}
 
-        return {
-            "label": label_name,
-            "probability": round(prob * 100, 2)
-        }
+        result = _format_result(names, aggregator.result())
+        result.update({
+            "aggregation": aggregation,
+            "n_chunks": len(chunks),
+            "truncated": next(windows, None) is not None,
+            "chunks": chunks,
+        })
+        return result
+    except ValueError as e:
+        PREDICTION_ERRORS.inc("invalid_input")
+        return {"error": str(e)}
     except Exception as e:
+        PREDICTION_ERRORS.inc("exception")
         return {"error": f"An error occurred during prediction: {str(e)}"}
 
+# -------------------------
+# Micro-batching
+# -------------------------
+def _score_microbatch(texts) -> list:
+    BATCH_SIZE.observe(len(texts), "microbatch")
+    return predict_fake_batch(texts, batch_size=MICROBATCH_MAX_BATCH)
+
+
+_microbatcher = None
+if MICROBATCH_ENABLED:
+    from api.batching import MicroBatcher
+
+    _microbatcher = MicroBatcher(
+        _score_microbatch,
+        max_batch=MICROBATCH_MAX_BATCH,
+        max_latency_ms=MICROBATCH_MAX_LATENCY_MS,
+        timeout=MICROBATCH_TIMEOUT,
+    )
+
+
+_inference_executor = BoundedExecutor(ASYNC_WORKERS, ASYNC_QUEUE)
+
+
+def inference_executor() -> BoundedExecutor:
+    """
+    The bounded thread pool the async endpoint runs inference on.
+    """
+    return _inference_executor
+
+
+def _collect_metrics() -> list:
+    """
+    Model, cache and async-pool numbers for /api/metrics/.
+    Reads only what is already loaded.
+    """
+    status = registry.status()
+    families = [
+        ("decision_model_loaded", "gauge", "1 once the model loaded without error.",
+         [({"model": name}, int(s["loaded"])) for name, s in status.items()]),
+        ("decision_model_load_seconds", "gauge", "Seconds the model took to load in this process.",
+         [({"model": name}, s["load_seconds"]) for name, s in status.items() if s["load_seconds"] is not None]),
+    ]
+
+    embed_cache = registry.peek("embed_cache")
+    if embed_cache is not None:
+        stats = embed_cache.stats()
+        families += [
+            ("decision_embed_cache_lookups_total", "counter", "Embedding cache lookups by result.",
+             [({"result": "hit"}, stats["hits"] - stats["disk_hits"]), ({"result": "disk_hit"}, stats["disk_hits"]),
+              ({"result": "miss"}, stats["misses"])]),
+            ("decision_embed_cache_hit_ratio", "gauge", "Share of lookups served from the cache.",
+             [({}, stats["hit_rate"])]),
+            ("decision_embed_cache_entries", "gauge", "Embeddings held in memory.", [({}, stats["size"])]),
+        ]
+
+    stats = _inference_executor.stats()
+    families += [
+        ("decision_async_in_flight", "gauge", "Async inference calls running or queued.", [({}, stats["in_flight"])]),
+        ("decision_async_rejected_total", "counter", "Async requests turned away with 429.", [({}, stats["rejected"])]),
+    ]
+    return families
+
+
+metrics_registry.add_collector(_collect_metrics)
+
 # -------------------------
 # Backward Compatibility
 # -------------------------
@@ -0,0 +1,109 @@
+# backend/api/dedup.py
+import hashlib
+import re
+import time
+import zlib
+
+import numpy as np
+
+from api.embed_cache import normalize_for_key
+
+_WORD = re.compile(r"\w+")
+
+# Universal hashing modulo a prime just below 2**32
+_PRIME = np.uint64(4294967291)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles.
+
+    Words are hashed once with crc32 and combined into ``shingle``-word
+    shingle hashes with NumPy, then every signature slot is the minimum of
+    ``(a * h + b) mod p`` over the shingles for its own random ``a, b``.
+    The fraction of equal slots between two signatures estimates the
+    Jaccard similarity of their shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle: int = 3, seed: int = 42):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self._a = rng.integers(1, int(_PRIME), size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=(num_perm, 1), dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = np.array([zlib.crc32(w.encode()) for w in _WORD.findall(text.lower())], dtype=np.uint64)
+        if len(words) == 0:
+            return np.zeros(1, dtype=np.uint64)
+        if len(words) < self.shingle:
+            return np.array([zlib.crc32(text.lower().encode())], dtype=np.uint64)
+        h = np.zeros(len(words) - self.shingle + 1, dtype=np.uint64)
+        for k in range(self.shingle):
+            h = h * np.uint64(1000003) + words[k:len(words) - self.shingle + 1 + k]
+        return h % _PRIME
+
+    def signature(self, text: str) -> np.ndarray:
+        h = self.shingles(text)[None, :]
+        return ((self._a * h + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def find_duplicates(texts, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle: int = 3):
+    """
+    Mark exact and near duplicates in ``texts``, keeping the first
+    occurrence of each group.
+
+    Exact duplicates share the hash of their whitespace-normalized,
+    lower-cased text. The rest are MinHashed and split into ``bands`` bands
+    for locality-sensitive hashing: a text is compared only with the first
+    kept text in each of its band buckets and counts as a near duplicate
+    when their estimated Jaccard similarity reaches ``threshold``. Work is
+    linear in the number of texts.
+
+    Returns ``(duplicate_of, stats)``: ``duplicate_of[i]`` is the index of
+    the kept text that row ``i`` duplicates, or -1 if row ``i`` is kept.
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    rows = num_perm // bands
+    start = time.perf_counter()
+
+    duplicate_of = np.full(len(texts), -1, dtype=np.int64)
+    exact = {}
+    for i, text in enumerate(texts):
+        key = hashlib.sha1(normalize_for_key(str(text)).lower().encode("utf-8")).digest()
+        duplicate_of[i] = exact.setdefault(key, i)
+    duplicate_of[duplicate_of == np.arange(len(texts))] = -1
+    exact_mask = duplicate_of >= 0
+    n_exact = int(exact_mask.sum())
+
+    hasher = MinHasher(num_perm=num_perm, shingle=shingle)
+    buckets = [{} for _ in range(bands)]
+    signatures = {}
+    for i in np.flatnonzero(duplicate_of < 0):
+        sig = hasher.signature(str(texts[i]))
+        keys = [sig[b * rows:(b + 1) * rows].tobytes() for b in range(bands)]
+        for key, bucket in zip(keys, buckets):
+            j = bucket.get(key)
+            if j is not None and (signatures[j] == sig).mean() >= threshold:
+                duplicate_of[i] = j
+                break
+        else:
+            signatures[i] = sig
+            for key, bucket in zip(keys, buckets):
+                bucket.setdefault(key, i)
+
+    # Exact duplicates of a row that turned out to be a near duplicate point
+    # at the row that was kept instead
+    exact_rows = np.flatnonzero(exact_mask)
+    targets = duplicate_of[exact_rows]
+    duplicate_of[exact_rows] = np.where(duplicate_of[targets] >= 0, duplicate_of[targets], targets)
+
+    stats = {
+        "rows": len(texts),
+        "exact_duplicates": n_exact,
+        "near_duplicates": int((duplicate_of >= 0).sum()) - n_exact,
+        "kept": int((duplicate_of < 0).sum()),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return duplicate_of, stats
@@ -0,0 +1,91 @@
+# backend/api/documents.py
+import re
+from itertools import islice
+
+import numpy as np
+
+AGGREGATIONS = ("mean", "max", "attention")
+
+_WORD = re.compile(r"\S+")
+
+
+def iter_windows(text: str, window: int = 180, stride: int = 135, max_chunks: int = 64):
+    """
+    Yield ``(start_word, end_word, chunk_text)`` for overlapping word
+    windows over ``text``.
+
+    Words are read lazily with a regex iterator and only the current window
+    is kept, so memory does not grow with the document. At most
+    ``max_chunks`` windows are produced.
+    """
+    window = max(1, int(window))
+    stride = max(1, min(int(stride), window))
+    words = _WORD.finditer(text)
+
+    buffer = [m.group() for m in islice(words, window)]
+    start = 0
+    produced = 0
+    while buffer and produced < max_chunks:
+        yield start, start + len(buffer), " ".join(buffer)
+        produced += 1
+        more = [m.group() for m in islice(words, stride)]
+        if not more:
+            return
+        buffer = buffer[stride:] + more
+        start += stride
+
+
+class StreamingAggregator:
+    """
+    Folds per-window class probabilities into one document score without
+    keeping them all in memory.
+
+    * ``mean``: average distribution over windows
+    * ``max``: distribution of the window with the highest positive-class
+      probability (one suspicious passage flags the document)
+    * ``attention``: windows weighted by softmax(confidence / temperature),
+      where confidence is the distance of the window's top probability from
+      uniform; computed with a running log-sum-exp
+    """
+
+    def __init__(self, n_classes: int, positive: int, aggregation: str = "mean", temperature: float = 0.1):
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation {aggregation!r}; expected one of {AGGREGATIONS}")
+        self.aggregation = aggregation
+        self.positive = positive
+        self.temperature = temperature
+        self.count = 0
+
+        self._sum = np.zeros(n_classes)
+        self._best = None
+        self._best_score = -np.inf
+        self._log_max = -np.inf
+        self._weighted = np.zeros(n_classes)
+        self._weight_sum = 0.0
+
+    def update(self, probs: np.ndarray):
+        probs = np.asarray(probs, dtype=np.float64)
+        self.count += len(probs)
+        self._sum += probs.sum(axis=0)
+
+        i = int(probs[:, self.positive].argmax())
+        if probs[i, self.positive] > self._best_score:
+            self._best_score = probs[i, self.positive]
+            self._best = probs[i].copy()
+
+        logits = (probs.max(axis=1) - 1.0 / probs.shape[1]) / self.temperature
+        new_max = max(self._log_max, float(logits.max()))
+        scale = np.exp(self._log_max - new_max) if np.isfinite(self._log_max) else 0.0
+        weights = np.exp(logits - new_max)
+        self._weighted = self._weighted * scale + weights @ probs
+        self._weight_sum = self._weight_sum * scale + float(weights.sum())
+        self._log_max = new_max
+
+    def result(self) -> np.ndarray:
+        if self.count == 0:
+            raise ValueError("no windows were aggregated")
+        if self.aggregation == "max":
+            return self._best
+        if self.aggregation == "attention":
+            return self._weighted / self._weight_sum
+        return self._sum / self.count
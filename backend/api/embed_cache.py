@@ -0,0 +1,187 @@
+# backend/api/embed_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+def normalize_for_key(text: str) -> str:
+    """
+    Normalization used only for cache keys: Unicode NFC and collapsed
+    whitespace, so reposts that differ only in spacing share an entry.
+    """
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+def text_key(text: str, model_name: str) -> str:
+    """
+    Content address of ``text`` under ``model_name``.
+    """
+    payload = f"{model_name}\x00{normalize_for_key(text)}".encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+
+    Entries are keyed by a hash of the normalized text plus the embedder model
+    name. The first tier is a bounded in-memory LRU; the optional second tier
+    is a SQLite file shared by every worker on the host. The model name is
+    fixed for the life of the cache: a new model is picked up by building a
+    new cache (a restart or ``registry.reset()``), and rows written under
+    other names stay in the file untouched, since other backends or
+    long-text policies may share it.
+    """
+
+    def __init__(self, model_name: str, capacity: int = 10000, disk_path=None):
+        self.model_name = model_name
+        self.capacity = max(0, int(capacity))
+        self.disk_path = Path(disk_path) if disk_path else None
+
+        # Guards the memory tier and counters only; SQLite I/O runs outside it
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_path is not None:
+            self._open_disk()
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def get_many(self, texts) -> list:
+        """
+        Cached embedding for each text, or ``None`` where there is none.
+        """
+        keys = [text_key(t, self.model_name) for t in texts]
+        found = [None] * len(keys)
+        on_disk = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                emb = self._memory.get(key)
+                if emb is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = emb
+                    self.hits += 1
+                else:
+                    on_disk.append(i)
+
+        if on_disk and self.disk_path is not None:
+            rows = self._disk_get([keys[i] for i in on_disk])
+            with self._lock:
+                for i in on_disk:
+                    emb = rows.get(keys[i])
+                    if emb is not None:
+                        found[i] = emb
+                        self.hits += 1
+                        self.disk_hits += 1
+                        self._remember(keys[i], emb)
+
+        with self._lock:
+            self.misses += sum(1 for emb in found if emb is None)
+        return found
+
+    def put_many(self, texts, embeddings):
+        keys = [text_key(t, self.model_name) for t in texts]
+        vectors = [np.array(e, dtype=np.float32) for e in embeddings]
+        for v in vectors:
+            v.setflags(write=False)
+
+        with self._lock:
+            for key, v in zip(keys, vectors):
+                self._remember(key, v)
+
+        if self.disk_path is not None:
+            self._disk_put(keys, vectors)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "size": len(self._memory),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    # -------------------------
+    # Memory tier
+    # -------------------------
+    def _remember(self, key, emb):
+        # Caller holds self._lock
+        if self.capacity == 0:
+            return
+        self._memory[key] = emb
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    # -------------------------
+    # Disk tier (SQLite)
+    # -------------------------
+    def _connection(self):
+        # One connection per thread, so reads need no lock (WAL lets them run
+        # alongside a writer), reopened after fork() since SQLite connections
+        # must not cross it.
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.disk_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vec BLOB NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def _disk_get(self, keys) -> dict:
+        out = {}
+        try:
+            conn = self._connection()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE model = ? AND key IN ({marks})",
+                    [self.model_name, *chunk],
+                ).fetchall()
+                for key, blob in rows:
+                    out[key] = np.frombuffer(blob, dtype=np.float32)
+        except sqlite3.Error as e:
+            print(f"[WARN] Embedding cache read failed: {e}")
+        return out
+
+    def _disk_put(self, keys, vectors):
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vec) VALUES (?, ?, ?)",
+                    [(k, self.model_name, v.tobytes()) for k, v in zip(keys, vectors)],
+                )
+        except sqlite3.Error as e:
+            print(f"[WARN] Embedding cache write failed: {e}")
+
+    def _open_disk(self):
+        try:
+            self._connection()
+        except sqlite3.Error as e:
+            print(f"[WARN] Could not open embedding cache at {self.disk_path}: {e}")
+            self.disk_path = None
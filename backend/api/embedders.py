@@ -0,0 +1,235 @@
+# backend/api/embedders.py
+import json
+import re
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+# "torch": SentenceTransformer on PyTorch; "onnx": the exported graph on
+# ONNX Runtime; "onnx-int8": the same graph with dynamically quantized weights;
+# "stub": hashed bag of words, for offline tests and benchmarks
+BACKENDS = ("torch", "onnx", "onnx-int8", "stub")
+
+ONNX_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def onnx_dir_for(model_name: str, root) -> Path:
+    """
+    Folder holding the ONNX export of ``model_name`` under ``root``.
+    """
+    return Path(root) / re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+
+def load_embedder(model_name: str, backend: str = "torch", onnx_root=None, stub_dimension: int = 384,
+                  stub_token_us: float = 0.0):
+    """
+    Build the embedder for ``model_name`` on the requested backend. Every
+    backend exposes the SentenceTransformer ``encode`` signature.
+    """
+    if backend == "stub":
+        return StubEmbedder(stub_dimension, token_cost_us=stub_token_us)
+
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name)
+        # Inference only: with no autograd state the weight pages are never
+        # written after load, so forked workers keep sharing them.
+        model.eval()
+        for param in model.parameters():
+            param.requires_grad_(False)
+        return model
+
+    if backend in ("onnx", "onnx-int8"):
+        directory = onnx_dir_for(model_name, onnx_root)
+        if not (directory / "meta.json").exists():
+            raise FileNotFoundError(
+                f"No ONNX export at {directory}. Run api/scripts/export_onnx_embedder.py first."
+            )
+        return OnnxEmbedder(directory, quantized=backend == "onnx-int8")
+
+    raise ValueError(f"Unknown embedder backend {backend!r}; expected one of {BACKENDS}")
+
+
+class OnnxEmbedder:
+    """
+    Runs an exported sentence-transformers model on ONNX Runtime.
+
+    The graph outputs the transformer's token embeddings; mean pooling over
+    the attention mask and the optional L2 normalization are done here,
+    reproducing the Pooling/Normalize modules of the original model.
+    """
+
+    def __init__(self, directory, quantized: bool = False, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text())
+        self.model_name = meta["model_name"]
+        self.max_seq_length = int(meta["max_seq_length"])
+        self.normalize = bool(meta["normalize"])
+        self.dimension = int(meta["dimension"])
+        self.quantized = quantized
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(directory))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        path = directory / ("model.int8.onnx" if quantized else "model.onnx")
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self._inputs = [i.name for i in self.session.get_inputs()]
+
+    def get_max_seq_length(self) -> int:
+        return self.max_seq_length
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        out = []
+        for start in range(0, len(texts), batch_size):
+            enc = self.tokenizer(
+                list(texts[start:start + batch_size]),
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {}
+            for name in self._inputs:
+                if name in enc:
+                    feeds[name] = enc[name].astype(np.int64)
+                elif name == "token_type_ids":
+                    feeds[name] = np.zeros_like(enc["input_ids"], dtype=np.int64)
+            hidden = self.session.run(None, feeds)[0]
+
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            emb = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                emb /= np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+            out.append(emb.astype(np.float32))
+
+        if not out:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.vstack(out)
+
+
+class StubEmbedder:
+    """
+    Deterministic stand-in for the sentence transformer: each lowercased word
+    adds +1 or -1 to a crc32-chosen dimension and the sum is L2-normalized.
+    Needs no model download, so tests and benchmarks run offline and give
+    the same vectors on every machine. ``token_cost_us`` sleeps that long
+    per word to mimic a transformer whose cost grows with the input length.
+    """
+
+    max_seq_length = 256
+
+    def __init__(self, dimension: int = 384, token_cost_us: float = 0.0):
+        self.dimension = int(dimension)
+        self.token_cost_us = float(token_cost_us)
+
+    def get_max_seq_length(self) -> int:
+        return self.max_seq_length
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        n_words = 0
+        for row, text in enumerate(texts):
+            words = str(text).lower().split()[:self.max_seq_length]
+            n_words += len(words)
+            for word in words:
+                h = zlib.crc32(word.encode("utf-8"))
+                out[row, h % self.dimension] += 1.0 if (h >> 16) & 1 else -1.0
+        out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        if self.token_cost_us:
+            time.sleep(n_words * self.token_cost_us / 1e6)
+        return out
+
+
+def quantize_onnx(directory) -> Path:
+    """
+    Write ``model.int8.onnx`` next to ``model.onnx`` in ``directory``, with
+    the weights dynamically quantized to int8 (activations stay float).
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    directory = Path(directory)
+    out = directory / "model.int8.onnx"
+    quantize_dynamic(str(directory / "model.onnx"), str(out), weight_type=QuantType.QInt8)
+    return out
+
+
+def export_onnx(model_name: str, onnx_root, quantize: bool = True, opset: int = 14) -> Path:
+    """
+    Export ``model_name`` to ONNX (plus a dynamically quantized int8 copy)
+    under ``onnx_root``. Needs torch and sentence-transformers; serving the
+    export only needs onnxruntime and transformers' tokenizer.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0]
+    pooling = st_model[1]
+    if not getattr(pooling, "pooling_mode_mean_tokens", False):
+        raise ValueError(f"{model_name} does not use mean pooling; the ONNX backend only supports mean pooling")
+    normalize = any(type(module).__name__ == "Normalize" for module in st_model)
+
+    hf_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["export sample text"], return_tensors="pt")
+    input_names = [name for name in ONNX_INPUTS if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    directory = onnx_dir_for(model_name, onnx_root)
+    directory.mkdir(parents=True, exist_ok=True)
+    onnx_path = directory / "model.onnx"
+
+    axes = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(hf_model),
+            tuple(sample[name] for name in input_names),
+            str(onnx_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: axes for name in [*input_names, "last_hidden_state"]},
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    tokenizer.save_pretrained(str(directory))
+
+    if quantize:
+        quantize_onnx(directory)
+
+    meta = {
+        "model_name": model_name,
+        "max_seq_length": st_model.max_seq_length,
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "pooling": "mean",
+        "normalize": normalize,
+        "opset": opset,
+        "quantized": quantize,
+    }
+    (directory / "meta.json").write_text(json.dumps(meta, indent=2))
+    return directory
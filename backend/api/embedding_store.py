@@ -0,0 +1,137 @@
+# backend/api/embedding_store.py
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from api.embed_cache import text_key
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding matrix for training corpora, one per embedder.
+
+    Layout under ``<root>/<model name>/``:
+
+    * ``vectors.bin``: raw row-major float32/float16 rows, append-only
+    * ``keys.txt``: one content hash per line; line ``i`` describes row ``i``
+    * ``meta.json``: model name, dimension and dtype
+
+    Rows are addressed by the same text hash as the serving-side embedding
+    cache, so an edited row gets a new hash and is embedded again while
+    unchanged rows are read straight from the memory-mapped matrix.
+    """
+
+    def __init__(self, root, model_name: str, dtype: str = "float32"):
+        self.model_name = model_name
+        self.directory = Path(root) / model_name.replace("/", "_")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / "vectors.bin"
+        self._keys_path = self.directory / "keys.txt"
+        self._meta_path = self.directory / "meta.json"
+
+        if self._meta_path.exists():
+            meta = json.loads(self._meta_path.read_text())
+            self.dim = meta["dim"]
+            self.dtype = np.dtype(meta["dtype"])
+        else:
+            self.dim = None
+            self.dtype = np.dtype(dtype)
+
+        keys = self._keys_path.read_text().split() if self._keys_path.exists() else []
+        # An interrupted append, or a vectors.bin that was deleted or cut
+        # short, leaves more keys than complete rows. Keep the rows that are
+        # intact and rewrite keys.txt to match, so the next append lines up;
+        # the dropped texts are embedded again.
+        if self.dim:
+            size = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+            complete = size // (self.dim * self.dtype.itemsize)
+            if complete < len(keys):
+                print(f"[WARN] {self._vectors_path} holds {complete} complete rows for {len(keys)} keys; "
+                      "the rest will be embedded again")
+                keys = keys[:complete]
+                self._keys_path.write_text("".join(k + "\n" for k in keys))
+        self._index = {key: row for row, key in enumerate(keys)}
+        self.rows = len(keys)
+        # Texts embedded vs reused and embedding seconds of the last get()
+        self.last_run = {"embedded": 0, "reused": 0, "seconds": 0.0}
+
+    # -------------------------
+    # Lookup / append
+    # -------------------------
+    def lookup(self, texts) -> np.ndarray:
+        """
+        Row of each text in the store, -1 where it has not been embedded.
+        """
+        return np.array([self._index.get(text_key(t, self.model_name), -1) for t in texts], dtype=np.int64)
+
+    def add(self, texts, embeddings):
+        embeddings = np.asarray(embeddings)
+        if self.dim is None:
+            self.dim = int(embeddings.shape[1])
+            self._meta_path.write_text(json.dumps({
+                "model_name": self.model_name, "dim": self.dim, "dtype": self.dtype.name,
+            }, indent=2))
+        if embeddings.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim}-dim embeddings, got {embeddings.shape[1]}")
+
+        keys = [text_key(t, self.model_name) for t in texts]
+        # Vectors first, keys second: a crash in between leaves rows without
+        # keys, which are simply overwritten on the next append.
+        with open(self._vectors_path, "r+b" if self._vectors_path.exists() else "wb") as f:
+            f.seek(self.rows * self.dim * self.dtype.itemsize)
+            f.write(np.ascontiguousarray(embeddings, dtype=self.dtype).tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._keys_path, "w" if self.rows == 0 else "a") as f:
+            f.write("".join(k + "\n" for k in keys))
+
+        for key in keys:
+            if key not in self._index:
+                self._index[key] = self.rows
+            self.rows += 1
+
+    def matrix(self) -> np.ndarray:
+        """
+        The whole store as a read-only memory-mapped (rows, dim) matrix.
+        """
+        if not self.rows:
+            return np.zeros((0, self.dim or 0), dtype=self.dtype)
+        return np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(self.rows, self.dim))
+
+    # -------------------------
+    # Main entry point
+    # -------------------------
+    def get(self, texts, embed_fn) -> np.ndarray:
+        """
+        Embeddings for ``texts``. Only texts not in the store are passed to
+        ``embed_fn(list_of_texts)`` and appended; the rest are read from the
+        memory-mapped matrix. When the texts map to consecutive rows (the
+        same corpus in the same order) the result is a zero-copy view.
+        """
+        texts = list(texts)
+        rows = self.lookup(texts)
+        missing = np.flatnonzero(rows < 0)
+        if len(missing):
+            # Embed each distinct new text once
+            first = {}
+            for i in missing:
+                first.setdefault(text_key(texts[i], self.model_name), i)
+            new_texts = [texts[i] for i in first.values()]
+            print(f"Embedding {len(new_texts)} new texts ({len(texts) - len(missing)} reused from {self.directory})")
+            start = time.perf_counter()
+            self.add(new_texts, embed_fn(new_texts))
+            self.last_run = {"embedded": len(new_texts), "reused": len(texts) - len(missing),
+                             "seconds": time.perf_counter() - start}
+            rows = self.lookup(texts)
+        else:
+            print(f"All {len(texts)} embeddings reused from {self.directory}")
+            self.last_run = {"embedded": 0, "reused": len(texts), "seconds": 0.0}
+
+        mm = self.matrix()
+        if len(rows) and np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows))):
+            return mm[rows[0]:rows[0] + len(rows)]
+        return np.asarray(mm[rows])
@@ -0,0 +1,83 @@
+# backend/api/executor.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """
+    Raised by ``BoundedExecutor.submit`` when no slot is free.
+    """
+
+
+class BoundedExecutor:
+    """
+    A thread pool with a cap on queued work.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more
+    wait for a thread; beyond that ``submit`` raises ``QueueFull`` instead
+    of queueing, so callers can shed load (HTTP 429) rather than let
+    latency grow without bound. The pool is created on first use in each
+    process, so it is safe to build before a fork.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    def _ensure_pool(self):
+        pid = os.getpid()
+        if self._pool is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._pool is None or self._pid != pid:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+                self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+                self.in_flight = 0
+                self._pid = pid
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule ``fn(*args, **kwargs)`` and return its Future, or raise
+        ``QueueFull`` when every worker and queue slot is taken.
+        """
+        self._ensure_pool()
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise QueueFull(f"{self.max_workers} running and {self.max_queue} queued")
+
+        with self._stats_lock:
+            self.in_flight += 1
+            self.submitted += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._stats_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,187 @@
+# backend/api/forest.py
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous node arrays.
+
+    The nodes of all trees are concatenated; ``roots[t]`` is the index of
+    tree ``t``'s root. Leaves point to themselves in ``left``/``right`` and
+    test feature 0, so every tree can be walked a fixed ``max_depth`` steps
+    at once with plain NumPy indexing. ``value`` holds the normalized class
+    distribution of each node, as used by ``predict_proba``.
+
+    Saved as one ``.npy`` file per array; ``load`` memory-maps them so worker
+    processes share the pages through the page cache.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, n_features, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    # -------------------------
+    # Conversion
+    # -------------------------
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in model.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            node_ids = np.arange(n, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left).astype(np.int32) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right).astype(np.int32) + offset
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+
+            # tree_.value is (n_nodes, n_outputs, n_classes); single output here
+            value = np.asarray(tree.value[:, 0, :], dtype=np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+
+            features.append(feature)
+            thresholds.append(np.asarray(tree.threshold, dtype=np.float64))
+            lefts.append(left)
+            rights.append(right)
+            values.append(value / totals)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            max_depth=max_depth,
+        )
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        meta = {
+            "classes": self.classes_.tolist(),
+            "n_features": self.n_features_in_,
+            "max_depth": self.max_depth,
+            "n_estimators": self.n_estimators,
+            "n_nodes": int(len(self.feature)),
+        }
+        (directory / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> "FlatForest":
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text())
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in ARRAYS
+        }
+        return cls(
+            **arrays,
+            classes=meta["classes"],
+            n_features=meta["n_features"],
+            max_depth=meta["max_depth"],
+        )
+
+    # -------------------------
+    # Inference
+    # -------------------------
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Class probabilities, matching RandomForestClassifier.predict_proba.
+        """
+        # sklearn casts inputs to float32 and compares them to float64
+        # thresholds; do the same so borderline splits agree.
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}")
+
+        rows = np.arange(X.shape[0])[:, None]
+        idx = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[idx]] <= self.threshold[idx]
+            idx = np.where(go_left, self.left[idx], self.right[idx])
+
+        return self.value[idx].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def file_sha1(path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_stamp(path) -> dict:
+    """
+    What an exported artifact records about the model it came from: the
+    file's hash plus its size and mtime, which let ``matches_source`` skip
+    the hash while the file is untouched.
+    """
+    stat = Path(path).stat()
+    return {"source_sha1": file_sha1(path), "source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+def matches_source(meta: dict, path) -> bool:
+    """
+    Whether ``path`` is still the file recorded in ``meta`` by
+    ``source_stamp``. The file is only hashed when its size or mtime differ
+    from the recorded ones (e.g. after a fresh checkout), so a worker
+    loading an up-to-date artifact never reads the joblib.
+    """
+    expected = meta.get("source_sha1")
+    if not expected or not Path(path).exists():
+        return True
+    stat = Path(path).stat()
+    if meta.get("source_size") == stat.st_size and meta.get("source_mtime_ns") == stat.st_mtime_ns:
+        return True
+    return file_sha1(path) == expected
+
+
+def export_flat_forest(model, out_dir, source_path=None) -> FlatForest:
+    """
+    Flatten ``model`` and save it under ``out_dir``. With ``source_path``
+    the joblib file's ``source_stamp`` is recorded in meta.json, so the
+    loader can tell when the flat copy is stale.
+    """
+    flat = FlatForest.from_sklearn(model)
+    flat.save(out_dir)
+    if source_path is not None:
+        meta_path = Path(out_dir) / "meta.json"
+        meta = json.loads(meta_path.read_text())
+        meta.update(source_stamp(source_path))
+        meta_path.write_text(json.dumps(meta, indent=2))
+    return flat
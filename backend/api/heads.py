@@ -0,0 +1,152 @@
+# backend/api/heads.py
+import json
+from pathlib import Path
+
+import numpy as np
+
+HEAD_KINDS = ("linear", "mlp")
+
+
+class DenseHead:
+    """
+    A small softmax classifier over embeddings: logistic regression when it
+    has one layer, a ReLU MLP otherwise. Scoring is a few matrix multiplies,
+    so a batch costs about the same as a single item.
+
+    Saved as ``W<i>.npy``/``b<i>.npy`` per layer plus ``meta.json``; ``load``
+    memory-maps the weights like the flat forest.
+    """
+
+    def __init__(self, weights, biases, classes):
+        self.weights = list(weights)
+        self.biases = list(biases)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(self.weights[0].shape[0])
+
+    @property
+    def kind(self) -> str:
+        return "linear" if len(self.weights) == 1 else "mlp"
+
+    # -------------------------
+    # Inference
+    # -------------------------
+    def _forward(self, X):
+        """
+        Hidden activations of every layer and the output probabilities.
+        """
+        activations = [X]
+        h = X
+        for W, b in zip(self.weights[:-1], self.biases[:-1]):
+            h = np.maximum(h @ W + b, 0.0)
+            activations.append(h)
+        logits = h @ self.weights[-1] + self.biases[-1]
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return activations, probs
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the head expects {self.n_features_in_}")
+        return self._forward(X)[1]
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self, directory, source: dict = None):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for old in directory.glob("*.npy"):
+            old.unlink()
+        for i, (W, b) in enumerate(zip(self.weights, self.biases)):
+            np.save(directory / f"W{i}.npy", np.ascontiguousarray(W, dtype=np.float32))
+            np.save(directory / f"b{i}.npy", np.ascontiguousarray(b, dtype=np.float32))
+        meta = {
+            "kind": self.kind,
+            "classes": self.classes_.tolist(),
+            "n_features": self.n_features_in_,
+            "layers": [list(W.shape) for W in self.weights],
+        }
+        if source:
+            meta.update(source)
+        (directory / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> "DenseHead":
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text())
+        mode = "r" if mmap else None
+        n_layers = len(meta["layers"])
+        return cls(
+            weights=[np.load(directory / f"W{i}.npy", mmap_mode=mode) for i in range(n_layers)],
+            biases=[np.load(directory / f"b{i}.npy", mmap_mode=mode) for i in range(n_layers)],
+            classes=meta["classes"],
+        )
+
+
+# -------------------------
+# Distillation
+# -------------------------
+def distill_head(X, soft_targets, classes, hidden: int = 0, epochs: int = 200, lr: float = 1e-2,
+                 l2: float = 1e-4, batch_size: int = 256, seed: int = 42) -> DenseHead:
+    """
+    Fit a head to a teacher's class probabilities by minimizing the
+    cross-entropy between its softmax and ``soft_targets`` with mini-batch
+    Adam. ``hidden=0`` gives a linear head, otherwise one ReLU layer of that
+    width.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=np.float32)
+    T = np.asarray(soft_targets, dtype=np.float32)
+    sizes = [X.shape[1]] + ([hidden] if hidden else []) + [T.shape[1]]
+
+    weights = [
+        (rng.standard_normal((n_in, n_out)) * np.sqrt(2.0 / n_in)).astype(np.float32)
+        for n_in, n_out in zip(sizes[:-1], sizes[1:])
+    ]
+    biases = [np.zeros(n_out, dtype=np.float32) for n_out in sizes[1:]]
+    head = DenseHead(weights, biases, classes)
+
+    params = weights + biases
+    m = [np.zeros_like(p) for p in params]
+    v = [np.zeros_like(p) for p in params]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    step = 0
+
+    for _ in range(epochs):
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), batch_size):
+            idx = order[start:start + batch_size]
+            activations, probs = head._forward(X[idx])
+
+            # Backpropagate d(cross-entropy)/d(logits) = probs - targets
+            delta = (probs - T[idx]) / len(idx)
+            grads_W, grads_b = [], []
+            for layer in range(len(weights) - 1, -1, -1):
+                grads_W.append(activations[layer].T @ delta + l2 * weights[layer])
+                grads_b.append(delta.sum(axis=0))
+                if layer:
+                    delta = (delta @ weights[layer].T) * (activations[layer] > 0)
+            grads = grads_W[::-1] + grads_b[::-1]
+
+            step += 1
+            for p, g, m_i, v_i in zip(params, grads, m, v):
+                m_i *= beta1
+                m_i += (1 - beta1) * g
+                v_i *= beta2
+                v_i += (1 - beta2) * g * g
+                m_hat = m_i / (1 - beta1 ** step)
+                v_hat = v_i / (1 - beta2 ** step)
+                p -= (lr * m_hat / (np.sqrt(v_hat) + eps)).astype(np.float32)
+
+    return head
+
+
+def head_dir_for(models_dir, kind: str) -> Path:
+    return Path(models_dir) / f"fake_head_{kind}"
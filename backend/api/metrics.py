@@ -0,0 +1,215 @@
+# backend/api/metrics.py
+import bisect
+import os
+import threading
+import time
+
+# Set DECISION_METRICS=0 to make every counter, histogram and span a no-op
+ENABLED = os.environ.get("DECISION_METRICS", "1") == "1"
+
+# Upper bounds (seconds) for latency histograms: 0.5 ms .. 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds for batch-size histograms
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    A monotonically increasing count per label combination.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """
+    Observations counted into fixed cumulative buckets per label
+    combination, plus their sum and count, as Prometheus histograms are.
+    An observation is a bisect and three additions under a lock.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        if not ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels) -> "Span":
+        """
+        Context manager observing the seconds spent inside it.
+        """
+        return Span(self, labels)
+
+    def snapshot(self, *labels) -> dict:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                return {"count": 0, "sum": 0.0, "buckets": {}}
+            counts, total, count = list(series[0]), series[1], series[2]
+        cumulative, running = {}, 0
+        for bound, n in zip((*self.buckets, float("inf")), counts):
+            running += n
+            cumulative[bound] = running
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def samples(self):
+        with self._lock:
+            keys = list(self._series)
+        for labels in keys:
+            snap = self.snapshot(*labels)
+            for bound, n in snap["buckets"].items():
+                le = f'le="{_number(float(bound))}"'
+                yield self.name + "_bucket" + _format_labels(self.labelnames, labels, le), n
+            yield self.name + "_sum" + _format_labels(self.labelnames, labels), snap["sum"]
+            yield self.name + "_count" + _format_labels(self.labelnames, labels), snap["count"]
+
+
+class Span:
+    """
+    Times a block into a histogram: ``with STAGE_SECONDS.time("embed"): ...``
+    """
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    The metrics of this process plus collector callbacks for values that
+    live elsewhere (cache counters, model load times), rendered in the
+    Prometheus text exposition format. Every worker process keeps its own
+    numbers.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, fn):
+        """
+        Register ``fn() -> [(name, kind, help, [(labels_dict, value), ...])]``,
+        called on every render. Collectors must not load anything.
+        """
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{key} {_number(value)}" for key, value in metric.samples())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"[WARN] Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# -------------------------
+# Shared metrics
+# -------------------------
+REQUESTS = registry.counter("api_requests_total", "HTTP requests by route, method and status.",
+                            ("route", "method", "status"))
+REQUEST_ERRORS = registry.counter("api_request_errors_total", "HTTP responses with status >= 500 by route.",
+                                  ("route",))
+REQUEST_SECONDS = registry.histogram("api_request_duration_seconds", "HTTP request latency by route.", ("route",))
+STAGE_SECONDS = registry.histogram("decision_stage_seconds",
+                                   "Time per inference stage (normalize, embed, classify, wordcloud).", ("stage",))
+BATCH_SIZE = registry.histogram("decision_batch_size",
+                                "Texts per embedder call, rows per classifier call and requests per micro-batch.",
+                                ("stage",), buckets=SIZE_BUCKETS)
+PREDICTION_ERRORS = registry.counter("decision_prediction_errors_total",
+                                     "Texts that got an error instead of a prediction, by reason.", ("reason",))
@@ -0,0 +1,212 @@
+# backend/api/profiling.py
+import os
+import pstats
+import re
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Where ProfilingMiddleware writes .prof files (read by `manage.py profile_report`)
+PROFILE_DIR = Path(os.environ.get("DECISION_PROFILE_DIR", PROJECT_ROOT / "data" / "profiles"))
+
+# Share of requests to the profiled routes run under cProfile (0 = only on
+# request, via the X-Profile header or the admin switch)
+SAMPLE_RATE = float(os.environ.get("DECISION_PROFILE_SAMPLE_RATE", "0"))
+
+# Value the X-Profile header must carry; when unset the header is ignored
+TOKEN = os.environ.get("DECISION_PROFILE_TOKEN", "")
+
+# URL patterns (as in api_app/urls.py, prefixed with api/) eligible for profiling
+ROUTES = tuple(r.strip() for r in os.environ.get("DECISION_PROFILE_ROUTES", "api/analyze/").split(",") if r.strip())
+
+# Sampled profiles merged into one file, and the number of files kept
+FLUSH_EVERY = int(os.environ.get("DECISION_PROFILE_FLUSH_EVERY", "20"))
+KEEP_FILES = int(os.environ.get("DECISION_PROFILE_KEEP", "50"))
+
+# Code areas the report breaks time down by: path fragments of their modules,
+# first match wins
+AREAS = {
+    "embedding": ("api/embedders.py", "api/bucketing.py", "api/embed_cache.py", "sentence_transformers/",
+                  "transformers/", "tokenizers/", "torch/", "onnxruntime/"),
+    "forest": ("api/forest.py", "api/heads.py", "sklearn/ensemble/", "sklearn/tree/", "joblib/"),
+    "normalize": ("api/utils/preprocess.py", "api/term_stats.py"),
+    # The rest of the app (views, decision, caches); after the specific areas
+    "app": ("backend/api/", "backend/api_app/"),
+    "django": ("django/", "rest_framework/"),
+}
+
+_RUNS = re.compile(r"-n(\d+)\.prof$")
+
+
+class ProfileStore:
+    """
+    Writes cProfile results to ``directory`` as ``.prof`` files (the
+    ``pstats`` format, readable by snakeviz, gprof2dot, ...).
+
+    ``add`` merges sampled profiles in memory and writes them out as one file
+    per ``flush_every`` requests; ``write`` saves a single profile at once.
+    File names carry the number of merged requests (``-n20.prof``). Beyond
+    ``keep`` files the oldest are deleted.
+    """
+
+    def __init__(self, directory=None, flush_every: int = None, keep: int = None):
+        self.directory = Path(directory if directory is not None else PROFILE_DIR)
+        self.flush_every = max(1, int(flush_every if flush_every is not None else FLUSH_EVERY))
+        self.keep = max(1, int(keep if keep is not None else KEEP_FILES))
+        self._lock = threading.Lock()
+        self._stats = None
+        self._pending = 0
+        self._seq = 0
+
+    def add(self, profile):
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        """
+        Write the merged profiles not yet on disk; returns the file or None.
+        """
+        with self._lock:
+            return self._flush_locked()
+
+    def write(self, profile, tag: str = "request") -> Path:
+        with self._lock:
+            return self._dump(pstats.Stats(profile), 1, tag)
+
+    def _flush_locked(self):
+        if self._stats is None:
+            return None
+        path = self._dump(self._stats, self._pending, "sampled")
+        self._stats, self._pending = None, 0
+        return path
+
+    def _dump(self, stats, runs: int, tag: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._seq}-{tag}-n{runs}.prof"
+        path = self.directory / name
+        tmp = path.with_suffix(".tmp")
+        stats.dump_stats(tmp)
+        os.replace(tmp, path)
+        self._rotate()
+        return path
+
+    def _rotate(self):
+        files = sorted(self.directory.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+        for old in files[:-self.keep]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+# -------------------------
+# Reporting
+# -------------------------
+def profile_files(directory=None, since_hours: float = None) -> list:
+    directory = Path(directory if directory is not None else PROFILE_DIR)
+    if not directory.is_dir():
+        return []
+    files = sorted(directory.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    if since_hours is not None:
+        cutoff = time.time() - since_hours * 3600
+        files = [p for p in files if p.stat().st_mtime >= cutoff]
+    return files
+
+
+def merge_profiles(files):
+    """
+    One ``pstats.Stats`` over all ``files`` and the number of requests they
+    cover.
+    """
+    stats, runs = None, 0
+    for path in files:
+        if stats is None:
+            stats = pstats.Stats(str(path))
+        else:
+            stats.add(str(path))
+        m = _RUNS.search(Path(path).name)
+        runs += int(m.group(1)) if m else 1
+    return stats, runs
+
+
+def area_of(func) -> str:
+    filename = func[0].replace("\\", "/")
+    for area, fragments in AREAS.items():
+        if any(fragment in filename for fragment in fragments):
+            return area
+    return "other"
+
+
+def short_name(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name
+    filename = filename.replace("\\", "/")
+    for marker in ("site-packages/", "dist-packages/", str(PROJECT_ROOT).replace("\\", "/") + "/"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{filename}:{line}({name})"
+
+
+def area_seconds(stats, passes: int = 20) -> dict:
+    """
+    Profiled time split by code area, adding up to the total. Time in
+    functions outside every area (C builtins, numpy, the standard library)
+    is charged to the areas of their callers in proportion to the time each
+    caller spent in them, the way gprof propagates time, so the C calls made
+    from the forest count as forest time.
+    """
+    entries = stats.stats
+    own = {func: area_of(func) for func in entries}
+    shares = {func: {area: 1.0} for func, area in own.items()}
+    for _ in range(passes):
+        changed = False
+        for func, (_, _, _, _, callers) in entries.items():
+            if own[func] != "other" or not callers:
+                continue
+            weights = defaultdict(float)
+            for caller, timing in callers.items():
+                # Per-caller (calls, primitive calls, tottime, cumtime)
+                weight = timing[2] if isinstance(timing, tuple) else timing
+                for area, share in shares.get(caller, {"other": 1.0}).items():
+                    weights[area] += weight * share
+            total = sum(weights.values())
+            if total <= 0:
+                continue
+            new = {area: w / total for area, w in weights.items()}
+            if new != shares[func]:
+                shares[func], changed = new, True
+        if not changed:
+            break
+
+    totals = defaultdict(float)
+    for func, (_, _, tottime, _, _) in entries.items():
+        for area, share in shares[func].items():
+            totals[area] += tottime * share
+    return dict(totals)
+
+
+def hot_functions(stats, area: str = None, sort: str = "tottime", top: int = 20) -> list:
+    """
+    The ``top`` functions by ``sort`` ("tottime" or "cumulative"), restricted
+    to ``area`` when given, as dicts of name, calls and seconds.
+    """
+    rows = []
+    for func, (_, ncalls, tottime, cumulative, _) in stats.stats.items():
+        if area is not None and area_of(func) != area:
+            continue
+        rows.append({"function": short_name(func), "area": area_of(func), "calls": ncalls,
+                     "tottime": tottime, "cumulative": cumulative})
+    rows.sort(key=lambda r: r[sort], reverse=True)
+    return rows[:top]
@@ -0,0 +1,113 @@
+# backend/api/registry.py
+import threading
+import time
+
+
+class ModelRegistry:
+    """
+    Loads named models on first use, once per process.
+
+    Each model has a loader callable. ``get`` loads it lazily behind
+    double-checked locking so concurrent first requests trigger one load;
+    ``warmup`` loads everything up front, optionally on a background thread.
+    A loader that raises is recorded as failed (its value is ``None``) and is
+    retried by the first ``get`` after ``retry_seconds``, so a transient
+    failure does not last for the life of the worker. Models registered with
+    ``required=False`` (e.g. a cache) do not count towards ``is_ready``.
+    """
+
+    def __init__(self, retry_seconds: float = 30.0):
+        self._loaders = {}
+        self._optional = set()
+        self._models = {}
+        self._errors = {}
+        self._failed_at = {}
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+        self.retry_seconds = retry_seconds
+        self.load_seconds = {}
+
+    def register(self, name: str, loader, required: bool = True):
+        self._loaders[name] = loader
+        if not required:
+            self._optional.add(name)
+
+    def _settled(self, name: str) -> bool:
+        # Loaded, or failed recently enough that it is not retried yet
+        if name not in self._models:
+            return False
+        failed_at = self._failed_at.get(name)
+        return failed_at is None or time.monotonic() - failed_at < self.retry_seconds
+
+    def get(self, name: str):
+        if self._settled(name):
+            return self._models[name]
+        with self._lock:
+            if self._settled(name):
+                return self._models[name]
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                print(f"[WARN] Could not load {name} (retrying in {self.retry_seconds:g}s): {e}")
+                self._errors[name] = str(e)
+                self._failed_at[name] = time.monotonic()
+                model = None
+            else:
+                self._errors.pop(name, None)
+                self._failed_at.pop(name, None)
+            self.load_seconds[name] = round(time.perf_counter() - start, 4)
+            # Publish last: readers outside the lock only see finished loads
+            self._models[name] = model
+            return model
+
+    def peek(self, name: str):
+        """
+        The model if it has been loaded, else None; never triggers a load.
+        """
+        return self._models.get(name)
+
+    def warmup(self, background: bool = False):
+        """
+        Load every registered model. With ``background=True`` the loading
+        happens on a daemon thread and this returns immediately.
+        """
+        if not background:
+            for name in self._loaders:
+                self.get(name)
+            return
+        with self._lock:
+            if self._warmup_thread is None or not self._warmup_thread.is_alive():
+                if not self.is_ready():
+                    self._warmup_thread = threading.Thread(target=self.warmup, name="model-warmup", daemon=True)
+                    self._warmup_thread.start()
+
+    def is_loaded(self) -> bool:
+        """
+        True once every registered loader has run (successfully or not).
+        """
+        return all(name in self._models for name in self._loaders)
+
+    def is_ready(self) -> bool:
+        """
+        True once every required model loaded without error.
+        """
+        return self.is_loaded() and not (self._errors.keys() - self._optional)
+
+    def reset(self):
+        with self._lock:
+            self._models.clear()
+            self._errors.clear()
+            self._failed_at.clear()
+            self.load_seconds.clear()
+
+    def status(self) -> dict:
+        return {
+            name: {
+                "loaded": name in self._models and name not in self._errors,
+                "load_seconds": self.load_seconds.get(name),
+                "error": self._errors.get(name),
+                "required": name not in self._optional,
+            }
+            for name in self._loaders
+        }
@@ -0,0 +1,393 @@
+"""
+End-to-end latency and throughput of /api/analyze/ under load.
+
+Run from the backend/ folder:
+
+    python api/scripts/bench_analyze.py                                   # in-process, stub embedder
+    python api/scripts/bench_analyze.py --concurrency 1,4,16 --lengths mixed --dup-rate 0.3
+    python api/scripts/bench_analyze.py --mode http --server gunicorn --concurrency 8
+    python api/scripts/bench_analyze.py --mode http --server uvicorn --path /api/analyze/async/
+    python api/scripts/bench_analyze.py --json after.json --compare before.json
+
+The workload is generated from ``--seed``, so two runs (or two commits) send
+the same texts in the same order: ``--requests`` texts drawn from a length
+distribution (``--lengths``), where a ``--dup-rate`` fraction repeat an
+earlier text, the way reposted content does. ``--concurrency`` clients send
+them back to back (closed loop) after ``--warmup`` untimed requests that
+load the models. Each level starts from cold models and an empty embedding
+cache (in HTTP mode, a fresh server), unless ``--url`` points at a server
+this script did not start.
+
+``--mode inprocess`` drives the Django app through its test client in this
+process. Besides end-to-end latency it splits every request into stages:
+normalize, embed (only texts the embedding cache missed), classify, word
+cloud, and "other" (Django, DRF, the cache, JSON). Stage times are not
+attributed when DECISION_MICROBATCH=1, since inference then runs on the
+batcher thread. ``--mode http`` starts gunicorn or uvicorn (see
+api/scripts/bench_startup.py) and measures over real sockets; it only sees
+end-to-end latency and status codes.
+
+The embedder is the deterministic stub (DECISION_EMBED_BACKEND=stub), so
+runs need no model download. ``--token-us`` gives it a per-word cost, and
+``--embedder configured`` keeps whatever DECISION_EMBED_BACKEND says. The
+JSON output records the configuration and the git commit, and
+``--compare`` prints the change against an earlier file.
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from api.scripts.bench_startup import SERVERS, server_command  # noqa: E402
+
+# Words per text: (low, high) ranges and the mixes drawn from them
+LENGTH_RANGES = {"short": (5, 25), "medium": (40, 160), "long": (300, 700)}
+LENGTH_MIXES = {
+    "short": {"short": 1.0},
+    "medium": {"medium": 1.0},
+    "long": {"long": 1.0},
+    "mixed": {"short": 0.6, "medium": 0.3, "long": 0.1},
+}
+
+STAGES = ("normalize", "embed", "classify", "wordcloud")
+
+
+# -------------------------
+# Workload
+# -------------------------
+def make_vocabulary(rng: random.Random, size: int = 5000) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choices(letters, k=rng.randint(2, 10))) for _ in range(size)]
+
+
+def make_workload(n: int, lengths: str = "mixed", dup_rate: float = 0.0, seed: int = 42) -> list:
+    """
+    ``n`` texts whose word counts follow ``LENGTH_MIXES[lengths]``; with
+    probability ``dup_rate`` a text repeats one generated earlier.
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(rng)
+    mix = LENGTH_MIXES[lengths]
+    buckets, weights = list(mix), list(mix.values())
+    texts = []
+    for i in range(n):
+        if i and rng.random() < dup_rate:
+            texts.append(rng.choice(texts))
+            continue
+        low, high = LENGTH_RANGES[rng.choices(buckets, weights)[0]]
+        words = rng.choices(vocab, k=rng.randint(low, high))
+        # Some URLs and handles so normalization has work to do
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words) + 1), f"https://t.co/{rng.choice(vocab)}")
+        if rng.random() < 0.3:
+            words.insert(0, f"@{rng.choice(vocab)}")
+        texts.append(" ".join(words).capitalize() + ".")
+    return texts
+
+
+# -------------------------
+# Measurement
+# -------------------------
+def percentiles(values) -> dict:
+    if not len(values):
+        return {}
+    arr = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"mean_ms": float(arr.mean()), "p50_ms": float(p50), "p95_ms": float(p95),
+            "p99_ms": float(p99), "max_ms": float(arr.max())}
+
+
+class StageTimer:
+    """
+    Wraps module-level functions so each call adds its duration to a
+    per-thread total, which ``take`` returns and clears.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def wrap(self, module, attr: str, stage: str):
+        fn = getattr(module, attr)
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                totals = getattr(self._local, "totals", None)
+                if totals is not None:
+                    totals[stage] += time.perf_counter() - start
+
+        setattr(module, attr, timed)
+
+    def begin(self):
+        self._local.totals = defaultdict(float)
+
+    def take(self) -> dict:
+        totals, self._local.totals = self._local.totals, None
+        return dict(totals)
+
+
+def closed_loop(send, texts, concurrency: int):
+    """
+    Send every text with ``concurrency`` clients, each starting its next
+    request when the previous one returns. Returns the per-request results
+    of ``send`` in input order and the wall time.
+    """
+    results = [None] * len(texts)
+    cursor = iter(range(len(texts)))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                i = next(cursor, None)
+            if i is None:
+                return
+            results[i] = send(texts[i])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for f in [pool.submit(client) for _ in range(concurrency)]:
+            f.result()
+    return results, time.perf_counter() - start
+
+
+def summarize(results, wall: float, concurrency: int) -> dict:
+    ok = [r for r in results if r["status"] == 200]
+    summary = {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "seconds": wall,
+        "throughput_rps": len(ok) / wall if wall else 0.0,
+        "status": {str(k): v for k, v in sorted(Counter(r["status"] for r in results).items())},
+        "latency": percentiles([r["seconds"] for r in ok]),
+    }
+    if ok and "stages" in ok[0]:
+        stages = {}
+        for stage in (*STAGES, "other"):
+            stages[stage] = percentiles([r["stages"].get(stage, 0.0) for r in ok])
+        summary["stages"] = stages
+    return summary
+
+
+# -------------------------
+# In-process run
+# -------------------------
+def setup_inprocess():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+    from api import decision
+    from api_app import views
+
+    timer = StageTimer()
+    timer.wrap(decision, "normalize_batch", "normalize")
+    timer.wrap(decision, "_encode_uncached", "embed")
+    timer.wrap(decision, "classify_embeddings", "classify")
+    timer.wrap(views, "wordcloud", "wordcloud")
+    return timer
+
+
+def inprocess_sender(timer: StageTimer, path: str, wordcloud: bool):
+    from django.test import Client
+
+    local = threading.local()
+
+    def send(text):
+        if not hasattr(local, "client"):
+            # A host DEBUG allows without ALLOWED_HOSTS (the default "testserver" is not)
+            local.client = Client(HTTP_HOST="localhost")
+        timer.begin()
+        start = time.perf_counter()
+        resp = local.client.post(path, {"text": text, "wordcloud": wordcloud}, content_type="application/json")
+        seconds = time.perf_counter() - start
+        stages = timer.take()
+        stages["other"] = max(0.0, seconds - sum(stages.values()))
+        return {"status": resp.status_code, "seconds": seconds, "stages": stages}
+
+    return send
+
+
+# -------------------------
+# HTTP run
+# -------------------------
+def http_sender(url: str, wordcloud: bool):
+    def send(text):
+        body = json.dumps({"text": text, "wordcloud": wordcloud}).encode()
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = 0
+        return {"status": status, "seconds": time.perf_counter() - start}
+
+    return send
+
+
+def start_server(server: str, port: int, timeout: float):
+    cmd, env = server_command(server, port)
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{server} exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2):
+                return proc
+        except urllib.error.HTTPError:
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise TimeoutError(f"{server} not listening after {timeout}s")
+
+
+# -------------------------
+# Report
+# -------------------------
+def print_summary(mode: str, s: dict):
+    lat = s["latency"]
+    print(f"\n== {mode}, concurrency {s['concurrency']} ==")
+    print(f"{s['requests']} requests in {s['seconds']:.2f} s: {s['throughput_rps']:.1f} req/s, status {s['status']}")
+    if lat:
+        print(f"latency  mean {lat['mean_ms']:8.2f}  p50 {lat['p50_ms']:8.2f}  p95 {lat['p95_ms']:8.2f}  "
+              f"p99 {lat['p99_ms']:8.2f}  max {lat['max_ms']:8.2f} ms")
+    if "stages" in s:
+        print(f"{'stage':<12}{'mean ms':>10}{'p95 ms':>10}{'share':>8}")
+        total = sum(v.get("mean_ms", 0.0) for v in s["stages"].values()) or 1.0
+        for stage, v in s["stages"].items():
+            print(f"{stage:<12}{v.get('mean_ms', 0.0):>10.3f}{v.get('p95_ms', 0.0):>10.3f}"
+                  f"{v.get('mean_ms', 0.0) / total:>8.0%}")
+
+
+def print_comparison(previous: dict, current: dict):
+    old_rows = {(r["mode"], r["concurrency"]): r for r in previous.get("runs", [])}
+    print(f"\n== vs {previous.get('environment', {}).get('commit', 'previous run')} ==")
+    print(f"{'run':<20}" + "".join(f"{h:>24}" for h in ("req/s", "p50 ms", "p95 ms", "p99 ms")))
+
+    def cell(old, new):
+        if not old:
+            return f"{new:>24.2f}"
+        return f"{old:>10.2f} -> {new:<7.2f}{(new - old) / old:>+5.0%}"
+
+    for run in current["runs"]:
+        old = old_rows.get((run["mode"], run["concurrency"]))
+        if old is None:
+            continue
+        row = f"{run['mode'] + ' c=' + str(run['concurrency']):<20}"
+        row += cell(old["throughput_rps"], run["throughput_rps"])
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            row += cell(old["latency"].get(key), run["latency"].get(key, 0.0))
+        print(row)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess")
+    parser.add_argument("--server", choices=[s for s in SERVERS if s != "runserver"], default="gunicorn",
+                        help="server started by --mode http")
+    parser.add_argument("--url", help="benchmark an already running server (e.g. http://127.0.0.1:8000)")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--path", default="/api/analyze/")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated client counts, one run each")
+    parser.add_argument("--lengths", choices=sorted(LENGTH_MIXES), default="mixed")
+    parser.add_argument("--dup-rate", type=float, default=0.2, help="fraction of texts repeating an earlier one")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-wordcloud", action="store_true", help='send "wordcloud": false')
+    parser.add_argument("--embedder", choices=("stub", "configured"), default="stub")
+    parser.add_argument("--token-us", type=float, default=0.0, help="stub embedder cost per word (us)")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for the server")
+    parser.add_argument("--json", type=Path, help="write the results here")
+    parser.add_argument("--compare", type=Path, help="earlier --json output to compare against")
+    args = parser.parse_args()
+
+    if args.embedder == "stub":
+        os.environ["DECISION_EMBED_BACKEND"] = "stub"
+        os.environ["DECISION_STUB_TOKEN_US"] = str(args.token_us)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    wordcloud = not args.no_wordcloud
+    warmup_texts = make_workload(args.warmup, "short", 0.0, seed=args.seed + 1)
+    texts = make_workload(args.requests, args.lengths, args.dup_rate, seed=args.seed)
+    words = [len(t.split()) for t in texts]
+    print(f"{len(texts)} texts ({args.lengths}): {np.mean(words):.0f} words on average, "
+          f"{len(texts) - len(set(texts))} repeats; embedder {os.environ.get('DECISION_EMBED_BACKEND', 'torch')}")
+
+    if args.mode == "inprocess":
+        send = inprocess_sender(setup_inprocess(), args.path, wordcloud)
+    else:
+        send = http_sender((args.url or f"http://127.0.0.1:{args.port}").rstrip("/") + args.path, wordcloud)
+
+    runs = []
+    for concurrency in levels:
+        # Every level starts from cold models and an empty embedding cache
+        server = None
+        if args.mode == "inprocess":
+            from api import decision
+
+            decision.registry.reset()
+        elif args.url is None:
+            server = start_server(args.server, args.port, args.timeout)
+        try:
+            closed_loop(send, warmup_texts, max(1, min(concurrency, len(warmup_texts))))
+            results, wall = closed_loop(send, texts, concurrency)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+        summary = {"mode": args.mode, **summarize(results, wall, concurrency)}
+        print_summary(args.mode, summary)
+        runs.append(summary)
+
+    report = {
+        "environment": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "runs": runs,
+    }
+    if args.compare:
+        print_comparison(json.loads(args.compare.read_text()), report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure the cost of the old predict + predict_proba scoring path against a
+single predict_proba evaluation, for the sklearn and flat forest engines.
+
+Run from the backend/ folder:
+
+    python api/scripts/bench_classifier.py
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from api.forest import FlatForest  # noqa: E402
+
+MODELS_DIR = BACKEND_DIR / "api" / "models"
+
+
+def two_pass(model, X):
+    # What predict_fake used to do: traverse the forest twice
+    preds = model.predict(X)
+    probs = model.predict_proba(X)
+    return preds, probs.max(axis=1)
+
+
+def one_pass(model, X):
+    probs = model.predict_proba(X)
+    return model.classes_[probs.argmax(axis=1)], probs.max(axis=1)
+
+
+def median_seconds(fn, repeat: int) -> float:
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=Path, default=MODELS_DIR / "fake_rf.joblib")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    sk_model = joblib.load(args.model)
+    engines = {"sklearn": sk_model, "flat": FlatForest.from_sklearn(sk_model)}
+    rng = np.random.default_rng(0)
+
+    print(f"{'engine':<8} {'batch':>6} {'two-pass':>12} {'one-pass':>12} {'saved':>7}")
+    for n in args.batch_sizes:
+        X = rng.standard_normal((n, sk_model.n_features_in_)).astype(np.float32)
+        X /= np.linalg.norm(X, axis=1, keepdims=True)
+        for name, model in engines.items():
+            old_labels, old_probs = two_pass(model, X)
+            new_labels, new_probs = one_pass(model, X)
+            assert (old_labels == new_labels).all() and np.allclose(old_probs, new_probs)
+
+            old = median_seconds(lambda: two_pass(model, X), args.repeat)
+            new = median_seconds(lambda: one_pass(model, X), args.repeat)
+            print(f"{name:<8} {n:>6} {old * 1e6:>10.0f}us {new * 1e6:>10.0f}us {1 - new / old:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
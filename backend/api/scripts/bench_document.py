@@ -0,0 +1,67 @@
+"""
+Latency of document-mode classification (api.decision.predict_fake_document)
+against document length, next to the single-pass predict_fake.
+
+Run from the backend/ folder:
+
+    python api/scripts/bench_document.py --words 100 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Repeated runs must not be served from the embedding cache
+os.environ.setdefault("DECISION_EMBED_CACHE_SIZE", "0")
+
+from api import decision  # noqa: E402
+
+VOCAB = (
+    "government india policy election minister report claims video viral news state "
+    "people police court health economy protest border army media social fake real "
+    "official statement announced according sources said week district farmers"
+).split()
+
+
+def make_document(n_words: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(VOCAB, size=n_words))
+
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="+", default=[100, 500, 2000, 10000, 50000])
+    parser.add_argument("--aggregation", default="mean", choices=["mean", "max", "attention"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    decision.warmup()
+    if not decision.is_ready():
+        sys.exit(f"Models not ready: {decision.registry.status()}")
+
+    print(f"{'words':>8} {'chunks':>7} {'truncated':>10} {'document':>12} {'single pass':>12}")
+    for n in args.words:
+        text = make_document(n)
+        result = decision.predict_fake_document(text, aggregation=args.aggregation)
+        doc_ms = median_ms(lambda: decision.predict_fake_document(text, aggregation=args.aggregation), args.repeat)
+        single_ms = median_ms(lambda: decision.predict_fake(text), args.repeat)
+        print(f"{n:>8} {result['n_chunks']:>7} {str(result['truncated']):>10} {doc_ms:>10.1f}ms {single_ms:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compare sklearn's RandomForestClassifier.predict_proba with the flat array
+evaluator in api.forest on single items and batches.
+
+Run from the backend/ folder:
+
+    python api/scripts/bench_forest.py
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from api.forest import FlatForest  # noqa: E402
+
+MODELS_DIR = BACKEND_DIR / "api" / "models"
+
+
+def time_call(fn, X, repeat: int) -> float:
+    """
+    Median seconds per call over ``repeat`` runs.
+    """
+    fn(X)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=Path, default=MODELS_DIR / "fake_rf.joblib")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 256])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    flat = FlatForest.from_sklearn(model)
+    rng = np.random.default_rng(0)
+
+    print(f"{'batch':>6} {'sklearn':>12} {'flat':>12} {'speedup':>8}")
+    for n in args.batch_sizes:
+        X = rng.standard_normal((n, model.n_features_in_)).astype(np.float32)
+        X /= np.linalg.norm(X, axis=1, keepdims=True)
+        sk = time_call(model.predict_proba, X, args.repeat)
+        fl = time_call(flat.predict_proba, X, args.repeat)
+        print(f"{n:>6} {sk * 1e6:>10.0f}us {fl * 1e6:>10.0f}us {sk / fl:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Per-document normalization throughput: the clean_text copies that used to
+live in views.py, train_fake_classifier.py and api/utils/preprocess.py (NLTK
+word_tokenize) against the shared profiles in api.utils.preprocess, on
+indian_news_500.csv (or synthetic posts when the file is missing). The NLTK
+comparison also checks that both tokenizers produce the same output; it is
+skipped when nltk is not installed.
+
+Run from the backend/ folder:
+
+    python api/scripts/bench_normalize.py
+    python api/scripts/bench_normalize.py --copies 20
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from api.utils.preprocess import STOPWORDS, normalize  # noqa: E402
+
+DATA_PATH = BACKEND_DIR.parent / "data" / "indian_news_500.csv"
+
+
+# -------------------------
+# Previous implementations, kept here as the baseline
+# -------------------------
+def legacy_views_clean_text(text):
+    text = str(text).lower()
+    text = re.sub(r"http\S+|@\w+|#\w+", "", text)
+    text = re.sub(r"[^\w\s]", "", text)
+    text = re.sub(r"\d+", "", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
+
+
+def legacy_trainer_clean_text(text):
+    text = str(text).lower()
+    text = re.sub(r"http\S+", "", text)
+    text = re.sub(r"@\w+", "", text)
+    text = re.sub(r"#\w+", "", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
+
+
+def legacy_nltk_clean_text(text, word_tokenize):
+    text = str(text).lower()
+    text = re.sub(r"http\S+|www\.\S+", "", text)
+    text = re.sub(r"@\w+", "", text)
+    text = re.sub(r"#\w+", "", text)
+    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    tokens = [t for t in word_tokenize(text) if t not in STOPWORDS and len(t) > 1]
+    return " ".join(tokens)
+
+
+def nltk_word_tokenize():
+    """
+    nltk's word_tokenize, or None when nltk is not installed. Without the
+    punkt data the Treebank tokenizer runs on the whole text (punkt has no
+    sentence boundary to find once punctuation is stripped).
+    """
+    try:
+        import nltk
+        from nltk.tokenize import word_tokenize
+    except ImportError:
+        return None
+    try:
+        nltk.data.find("tokenizers/punkt")
+        return word_tokenize
+    except LookupError:
+        print("[WARN] NLTK punkt data not found; timing word_tokenize(preserve_line=True)")
+        return lambda text: word_tokenize(text, preserve_line=True)
+
+
+def load_texts(copies: int) -> list:
+    if DATA_PATH.exists():
+        import pandas as pd
+
+        texts = pd.read_csv(DATA_PATH)["text"].dropna().astype(str).tolist()
+    else:
+        print(f"[WARN] {DATA_PATH} not found; using synthetic posts")
+        rng = random.Random(0)
+        words = ("india army border govt claims viral video protest minister report fake news "
+                 "the a of and to is in on for with").split()
+        extras = ["https://t.co/abc123", "@user_1", "#Breaking", "2024", "!!", "it's", "www.example.com"]
+        texts = [
+            " ".join(rng.choice(words + extras) for _ in range(rng.randint(20, 120)))
+            for _ in range(500)
+        ]
+    return texts * copies
+
+
+def docs_per_second(fn, texts) -> float:
+    start = time.perf_counter()
+    fn(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=10, help="repeat the corpus this many times")
+    args = parser.parse_args()
+
+    texts = load_texts(args.copies)
+    word_tokenize = nltk_word_tokenize()
+    print(f"{len(texts)} documents\n")
+    print(f"{'implementation':<42} {'docs/s':>10}")
+    rows = [
+        ("views.clean_text (legacy)", lambda ts: [legacy_views_clean_text(t) for t in ts]),
+        ("normalize(t, 'terms')", lambda ts: [normalize(t, "terms") for t in ts]),
+        ("train_fake_classifier.clean_text (legacy)", lambda ts: [legacy_trainer_clean_text(t) for t in ts]),
+        ("normalize(t, 'embedding')", lambda ts: [normalize(t, "embedding") for t in ts]),
+    ]
+    if word_tokenize is not None:
+        rows.append(("preprocess.clean_text (legacy, NLTK)",
+                     lambda ts: [legacy_nltk_clean_text(t, word_tokenize) for t in ts]))
+    rows.append(("normalize(t, 'tokens')", lambda ts: [normalize(t, "tokens") for t in ts]))
+    for name, fn in rows:
+        print(f"{name:<42} {docs_per_second(fn, texts):>10,.0f}")
+
+    if word_tokenize is not None:
+        same = sum(legacy_nltk_clean_text(t, word_tokenize) == normalize(t, "tokens") for t in texts)
+        print(f"\ntokens profile matches the NLTK output on {same}/{len(texts)} documents")
+
+
+if __name__ == "__main__":
+    main()
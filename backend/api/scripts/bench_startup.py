@@ -0,0 +1,285 @@
+"""
+Startup cost of the backend: what importing the entry point costs, module by
+module, how long a fresh server takes to answer its first /api/analyze/ and
+how much memory it peaks at (Linux only, reads /proc). Exits with status 1
+when a budget is exceeded, so it can gate CI or an image build.
+
+Run from the backend/ folder:
+
+    python api/scripts/bench_startup.py
+    python api/scripts/bench_startup.py --entry manage --top 30
+    python api/scripts/bench_startup.py --import-budget-ms 800 --first-request-budget-s 20 --rss-budget-mb 1500
+    python api/scripts/bench_startup.py --skip-server --fail-on-heavy
+
+The import profile runs ``python -X importtime`` on ``backend.wsgi``,
+``backend.asgi`` or ``manage.py check`` in a fresh interpreter (``--repeat``
+times, the median run is reported) and sums the self time of every module
+under its top-level package. Packages that only inference needs (torch,
+sentence-transformers, sklearn, pandas, ...) are listed separately: with
+DECISION_LOAD_MODE=lazy none of them should be imported before the first
+request. The server run starts gunicorn (backend/gunicorn.conf.py, one
+worker), uvicorn (backend.asgi) or ``manage.py runserver`` and polls until /api/analyze/ returns 200.
+Environment variables (DECISION_*, GUNICORN_*) are passed through.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from api.scripts.measure_worker_rss import children_of  # noqa: E402
+
+ENTRIES = {
+    "wsgi": ["-c", "import backend.wsgi"],
+    "asgi": ["-c", "import backend.asgi"],
+    "manage": ["manage.py", "check"],
+}
+
+# Only needed to serve predictions (or not at all); importing any of them at
+# startup delays the worker
+HEAVY_PACKAGES = (
+    "torch", "transformers", "sentence_transformers", "onnxruntime",
+    "sklearn", "scipy", "joblib", "pandas", "pyarrow", "nltk", "numpy",
+)
+
+SERVERS = ("gunicorn", "uvicorn", "runserver")
+
+SAMPLE_TEXT = "Government announces new policy on rural healthcare funding."
+
+
+# -------------------------
+# Import profile
+# -------------------------
+def parse_importtime(stderr: str) -> list:
+    """
+    ``(module, self_us, cumulative_us, depth)`` rows from ``-X importtime``
+    output, in the order the interpreter printed them.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile_imports(entry: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *ENTRIES[entry]],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        tail = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))[-2000:]
+        raise RuntimeError(f"{entry} exited with {proc.returncode}:\n{tail}")
+
+    rows = parse_importtime(proc.stderr)
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    return {
+        "entry": entry,
+        "wall_ms": wall_ms,
+        "import_ms": sum(self_us for _, self_us, _, _ in rows) / 1000,
+        "n_modules": len(rows),
+        "packages_ms": {k: v / 1000 for k, v in sorted(packages.items(), key=lambda kv: -kv[1])},
+        "modules": [{"module": n, "self_ms": s / 1000, "cumulative_ms": c / 1000} for n, s, c, _ in rows],
+        "heavy": sorted(p for p in packages if p in HEAVY_PACKAGES),
+    }
+
+
+def print_imports(profile: dict, top: int):
+    print(f"== import profile: {profile['entry']} ==")
+    print(f"{profile['n_modules']} modules, {profile['import_ms']:.1f} ms importing, "
+          f"{profile['wall_ms']:.1f} ms wall (interpreter start included)\n")
+    print(f"{'package':<32}{'self ms':>10}{'share':>8}")
+    for name, ms in list(profile["packages_ms"].items())[:top]:
+        print(f"{name:<32}{ms:>10.1f}{ms / profile['import_ms']:>8.0%}")
+
+    print(f"\n{'module':<48}{'cumulative ms':>15}")
+    slowest = sorted(profile["modules"], key=lambda m: -m["cumulative_ms"])[:top]
+    for m in slowest:
+        print(f"{m['module'][:47]:<48}{m['cumulative_ms']:>15.1f}")
+
+    if profile["heavy"]:
+        print(f"\nInference-only packages imported at startup: {', '.join(profile['heavy'])}")
+    else:
+        print("\nNo inference-only packages imported at startup.")
+
+
+# -------------------------
+# Server run
+# -------------------------
+def peak_rss_mib(pid: int):
+    """
+    VmHWM (peak resident set size) of one process in MiB, or None once it
+    has exited.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def server_command(server: str, port: int) -> tuple:
+    env = dict(os.environ)
+    if server == "gunicorn":
+        env.setdefault("GUNICORN_WORKERS", "1")
+        env["GUNICORN_BIND"] = f"127.0.0.1:{port}"
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "backend/gunicorn.conf.py", "backend.wsgi:application"]
+    elif server == "uvicorn":
+        env.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+        cmd = [sys.executable, "-m", "uvicorn", "backend.asgi:application", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", env.get("UVICORN_WORKERS", "1"), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload"]
+    return cmd, env
+
+
+def post_analyze(url: str) -> int:
+    """
+    Status of one /api/analyze/ call, 0 while nothing is listening.
+    """
+    body = json.dumps({"text": SAMPLE_TEXT, "wordcloud": False}).encode()
+    req = urllib.request.Request(url + "/api/analyze/", data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def time_first_request(server: str, port: int, timeout: float) -> dict:
+    """
+    Start a server and poll /api/analyze/ until it returns 200. Times are
+    seconds since the process was spawned.
+    """
+    cmd, env = server_command(server, port)
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    listening_s = first_ok_s = None
+    status = 0
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{server} exited with {proc.returncode} before answering")
+            status = post_analyze(url)
+            if status and listening_s is None:
+                listening_s = time.perf_counter() - start
+            if status == 200:
+                first_ok_s = time.perf_counter() - start
+                break
+            time.sleep(0.05)
+        pids = [proc.pid] + children_of(proc.pid)
+        rss = {pid: peak_rss_mib(pid) for pid in pids}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    if first_ok_s is None:
+        raise TimeoutError(f"/api/analyze/ did not return 200 within {timeout}s (last status: {status or 'no answer'})")
+    peaks = [v for v in rss.values() if v is not None]
+    return {
+        "server": server,
+        "listening_s": listening_s,
+        "first_analyze_s": first_ok_s,
+        "peak_rss_mib": max(peaks) if peaks else None,
+        "processes_peak_rss_mib": {str(pid): v for pid, v in rss.items()},
+    }
+
+
+def print_server(result: dict):
+    print(f"\n== first request: {result['server']} ==")
+    print(f"first HTTP answer      {result['listening_s']:>8.2f} s")
+    print(f"first 200 /api/analyze {result['first_analyze_s']:>8.2f} s")
+    if result["peak_rss_mib"] is not None:
+        print(f"peak RSS               {result['peak_rss_mib']:>8.1f} MiB (largest process)")
+
+
+# -------------------------
+# Budgets
+# -------------------------
+def check_budgets(report: dict, args) -> list:
+    failures = []
+    profile, server = report.get("imports"), report.get("server")
+    if args.import_budget_ms is not None and profile["import_ms"] > args.import_budget_ms:
+        failures.append(f"import time {profile['import_ms']:.1f} ms > budget {args.import_budget_ms:.1f} ms")
+    if args.fail_on_heavy and profile["heavy"]:
+        failures.append(f"inference-only packages imported at startup: {', '.join(profile['heavy'])}")
+    if server is not None:
+        if args.first_request_budget_s is not None and server["first_analyze_s"] > args.first_request_budget_s:
+            failures.append(
+                f"first /api/analyze/ after {server['first_analyze_s']:.2f} s > budget {args.first_request_budget_s:.2f} s"
+            )
+        if (args.rss_budget_mb is not None and server["peak_rss_mib"] is not None
+                and server["peak_rss_mib"] > args.rss_budget_mb):
+            failures.append(f"peak RSS {server['peak_rss_mib']:.1f} MiB > budget {args.rss_budget_mb:.1f} MiB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entry", choices=sorted(ENTRIES), default="wsgi", help="what to import-profile")
+    parser.add_argument("--repeat", type=int, default=5, help="import-profile runs; the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="packages and modules to list")
+    parser.add_argument("--server", choices=SERVERS, default="gunicorn")
+    parser.add_argument("--skip-server", action="store_true", help="only profile imports")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for the first 200")
+    parser.add_argument("--import-budget-ms", type=float)
+    parser.add_argument("--first-request-budget-s", type=float)
+    parser.add_argument("--rss-budget-mb", type=float)
+    parser.add_argument("--fail-on-heavy", action="store_true",
+                        help="fail when an inference-only package is imported at startup")
+    parser.add_argument("--json", type=Path, help="also write the full report here")
+    args = parser.parse_args()
+
+    runs = sorted((profile_imports(args.entry) for _ in range(max(1, args.repeat))), key=lambda p: p["import_ms"])
+    report = {"imports": runs[len(runs) // 2]}
+    report["imports"]["runs_ms"] = [p["import_ms"] for p in runs]
+    print_imports(report["imports"], args.top)
+    if args.repeat > 1:
+        print(f"(median of {len(runs)} runs; spread {runs[0]['import_ms']:.1f}-{runs[-1]['import_ms']:.1f} ms, "
+              f"stdev {statistics.pstdev(report['imports']['runs_ms']):.1f} ms)")
+
+    if not args.skip_server:
+        report["server"] = time_first_request(args.server, args.port, args.timeout)
+        print_server(report["server"])
+
+    failures = check_budgets(report, args)
+    report["failures"] = failures
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    if failures:
+        sys.exit(1)
+    budgets = (args.import_budget_ms, args.first_request_budget_s, args.rss_budget_mb)
+    if args.fail_on_heavy or any(b is not None for b in budgets):
+        print("\nAll budgets met.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Flatten fake_rf.joblib into the array layout served by api.forest.FlatForest.
+
+Run from the backend/ folder:
+
+    python api/scripts/export_flat_forest.py
+
+Writes backend/api/models/fake_rf_flat/ and checks that the flat evaluator
+reproduces the sklearn predict_proba on random unit vectors.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from api.forest import export_flat_forest  # noqa: E402
+
+MODELS_DIR = BACKEND_DIR / "api" / "models"
+
+
+def check_parity(model, flat, n: int = 1000, seed: int = 42) -> float:
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, model.n_features_in_)).astype(np.float32)
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return float(np.abs(flat.predict_proba(X) - model.predict_proba(X)).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=Path, default=MODELS_DIR / "fake_rf.joblib")
+    parser.add_argument("--out", type=Path, default=MODELS_DIR / "fake_rf_flat")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    flat = export_flat_forest(model, args.out, source_path=args.model)
+    diff = check_parity(model, flat)
+    print(f"Saved {flat.n_estimators} trees / {len(flat.feature)} nodes to {args.out}")
+    print(f"Max |flat - sklearn| predict_proba difference: {diff:.3g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Export the embedder named in embed_model_name.txt to ONNX (fp32 and
+dynamically quantized int8) and report how far the ONNX embeddings and the
+forest's predictions drift from the PyTorch ones on indian_news_500.csv.
+
+Run from the backend/ folder:
+
+    python api/scripts/export_onnx_embedder.py
+    python api/scripts/export_onnx_embedder.py --report-only --limit 200
+
+Serve the export with DECISION_EMBED_BACKEND=onnx or onnx-int8.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[3]  # project root
+sys.path.insert(0, str(BASE / "backend"))
+
+from api.embedders import export_onnx, load_embedder  # noqa: E402
+from api.utils.preprocess import normalize_batch  # noqa: E402
+
+MODELS_DIR = BASE / "backend" / "api" / "models"
+ONNX_DIR = MODELS_DIR / "onnx"
+DATA_PATH = BASE / "data" / "indian_news_500.csv"
+
+
+# -------------------------
+# Drift report
+# -------------------------
+def timed_encode(embedder, texts, batch_size: int):
+    start = time.perf_counter()
+    emb = embedder.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return np.asarray(emb, dtype=np.float32), time.perf_counter() - start
+
+
+def drift_report(model_name: str, texts, rf_model, batch_size: int) -> dict:
+    reference = load_embedder(model_name, "torch")
+    ref_emb, ref_secs = timed_encode(reference, texts, batch_size)
+    ref_probs = rf_model.predict_proba(ref_emb)
+
+    report = {
+        "model_name": model_name,
+        "n_texts": len(texts),
+        "torch": {"texts_per_second": round(len(texts) / ref_secs, 1)},
+    }
+    for backend in ("onnx", "onnx-int8"):
+        try:
+            embedder = load_embedder(model_name, backend, ONNX_DIR)
+        except FileNotFoundError as e:
+            print(f"[WARN] Skipping {backend}: {e}")
+            continue
+        emb, secs = timed_encode(embedder, texts, batch_size)
+        cos = (emb * ref_emb).sum(axis=1) / (
+            np.linalg.norm(emb, axis=1) * np.linalg.norm(ref_emb, axis=1)
+        )
+        probs = rf_model.predict_proba(emb)
+        report[backend] = {
+            "texts_per_second": round(len(texts) / secs, 1),
+            "speedup_vs_torch": round(ref_secs / secs, 2),
+            "cosine_mean": round(float(cos.mean()), 6),
+            "cosine_min": round(float(cos.min()), 6),
+            "cosine_p01": round(float(np.percentile(cos, 1)), 6),
+            "label_agreement": round(float((probs.argmax(1) == ref_probs.argmax(1)).mean()), 4),
+            "max_abs_prob_diff": round(float(np.abs(probs - ref_probs).max()), 4),
+            "mean_abs_prob_diff": round(float(np.abs(probs - ref_probs).mean()), 4),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report-only", action="store_true", help="skip the export, only compare")
+    parser.add_argument("--no-quantize", action="store_true", help="do not write model.int8.onnx")
+    parser.add_argument("--data", type=Path, default=DATA_PATH)
+    parser.add_argument("--limit", type=int, default=0, help="only use the first N texts")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--json", type=Path, help="write the report here as well")
+    args = parser.parse_args()
+
+    model_name = (MODELS_DIR / "embed_model_name.txt").read_text().strip()
+    if not args.report_only:
+        out = export_onnx(model_name, ONNX_DIR, quantize=not args.no_quantize)
+        print(f"Exported {model_name} to {out}")
+
+    df = pd.read_csv(args.data).dropna(subset=["text"])
+    texts = df["text"].astype(str).tolist()
+    if args.limit:
+        texts = texts[:args.limit]
+    # Same normalization as training and serving, so the drift is measured
+    # on the inputs the embedder actually sees
+    texts = normalize_batch(texts, "embedding")
+
+    rf_model = joblib.load(MODELS_DIR / "fake_rf.joblib")
+    report = drift_report(model_name, texts, rf_model, args.batch_size)
+    print(json.dumps(report, indent=2))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Measure per-worker memory of the gunicorn deployment with and without
+preloading the models in the master (Linux only, reads /proc).
+
+Run from the backend/ folder:
+
+    python api/scripts/measure_worker_rss.py --workers 4
+
+For each mode it starts gunicorn with backend/gunicorn.conf.py, waits until
+the workers answer /api/ready/, sends a few /api/analyze/ requests so the
+inference pages are touched, then prints Rss, Pss and shared/private memory
+of the master and every worker. Pss (proportional set size) splits shared
+pages between the processes that map them, so the Pss total is the real
+footprint of the deployment.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+# -------------------------
+# /proc helpers
+# -------------------------
+def read_rollup(pid: int) -> dict:
+    """
+    Memory counters of one process in MiB, from /proc/<pid>/smaps_rollup.
+    """
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            key = parts[0].rstrip(":")
+            if key in FIELDS:
+                out[key] = int(parts[1]) / 1024
+    return out
+
+
+def children_of(pid: int) -> list:
+    path = Path(f"/proc/{pid}/task/{pid}/children")
+    if path.exists():
+        return [int(p) for p in path.read_text().split()]
+    kids = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            kids.append(int(stat.parent.name))
+    return kids
+
+
+# -------------------------
+# Gunicorn run
+# -------------------------
+def wait_ready(url: str, probes: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    ok = 0
+    while ok < probes:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"workers not ready after {timeout}s")
+        try:
+            with urllib.request.urlopen(url + "/api/ready/", timeout=5) as resp:
+                ok += resp.status == 200
+        except OSError:
+            time.sleep(0.5)
+
+
+def warm_requests(url: str, n: int):
+    body = json.dumps({"text": "Government announces new policy on rural healthcare funding."}).encode()
+    for _ in range(n):
+        req = urllib.request.Request(url + "/api/analyze/", data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            resp.read()
+
+
+def measure(preload: bool, workers: int, port: int, requests: int, timeout: float) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "GUNICORN_PRELOAD": "1" if preload else "0",
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        # Without preloading every worker loads its own copy at boot
+        "DECISION_LOAD_MODE": "eager",
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "backend/gunicorn.conf.py", "backend.wsgi:application"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(url, probes=workers * 2, timeout=timeout)
+        warm_requests(url, requests)
+        time.sleep(1)
+        master = read_rollup(proc.pid)
+        workers_mem = [read_rollup(pid) for pid in children_of(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    total = {k: master.get(k, 0) + sum(w.get(k, 0) for w in workers_mem) for k in FIELDS}
+    return {"preload": preload, "master": master, "workers": workers_mem, "total": total}
+
+
+def print_report(result: dict):
+    title = "preload" if result["preload"] else "no preload"
+    print(f"\n== {title} ==")
+    print(f"{'process':<10}" + "".join(f"{k:>15}" for k in FIELDS))
+    rows = [("master", result["master"])] + [(f"worker{i}", w) for i, w in enumerate(result["workers"])]
+    rows.append(("total", result["total"]))
+    for name, mem in rows:
+        print(f"{name:<10}" + "".join(f"{mem.get(k, 0):>15.1f}" for k in FIELDS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=20, help="analyze calls before measuring")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for the workers")
+    parser.add_argument("--json", type=Path, help="also write the raw numbers (MiB) here")
+    args = parser.parse_args()
+
+    results = [measure(preload, args.workers, args.port, args.requests, args.timeout) for preload in (False, True)]
+    for result in results:
+        print_report(result)
+
+    saved = results[0]["total"]["Pss"] - results[1]["total"]["Pss"]
+    print(f"\nPss saved by preloading: {saved:.1f} MiB ({args.workers} workers)")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
+"""
+Train the fake-news head on MiniLM embeddings of indian_news_500.csv.
+
+Run from the backend/ folder:
+
+    python api/scripts/train_fake_classifier.py
+    python api/scripts/train_fake_classifier.py --tune --latency-budget-ms 0.5
+
+Besides the forest, linear and MLP heads are distilled from its soft
+probabilities for serving with DECISION_HEAD=linear or mlp.
+"""
 from pathlib import Path
+import argparse
+import json
+import shutil
+import sys
 import pandas as pd
-import re
-from sentence_transformers import SentenceTransformer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
@@ -14,72 +27,237 @@ BASE = Path(__file__).resolve().parents[3]  # project root
 DATA_DIR = BASE / "data"
 MODELS_DIR = BASE / "backend" / "api" / "models"
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
+# Embeddings of previous runs, reused so only new or edited rows are embedded
+EMBED_STORE_DIR = DATA_DIR / "embedding_store"
 
-# -----------------------------
-# Load indian_news_500.csv
-# -----------------------------
-news_path = DATA_DIR / "indian_news_500.csv"
-df = pd.read_csv(news_path)
+sys.path.insert(0, str(BASE / "backend"))
+from api.embedding_store import EmbeddingStore  # noqa: E402
+from api.forest import export_flat_forest  # noqa: E402
+from api.utils.preprocess import normalize_batch  # noqa: E402
 
-# Map labels to 0/1 if needed
-df["label"] = df["label"].map({"FAKE": 1, "REAL": 0, "fake": 1, "real": 0, 1: 1, 0: 0})
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
 
-print(f"Total samples loaded: {len(df)}")
-print("Label distribution:\n", df["label"].value_counts())
 
 # -----------------------------
-# Drop missing or short texts
+# Load indian_news_500.csv
 # -----------------------------
-df = df.dropna(subset=["text", "label"])
-df = df[df["text"].str.len() > 10]  # Remove very short texts
-df = df[df["label"].isin([0, 1])]   # Ensure only 0/1 labels
-print(f"After cleaning: {len(df)} rows.")
+def load_dataset(news_path=DATA_DIR / "indian_news_500.csv"):
+    df = pd.read_csv(news_path)
 
-# -----------------------------
-# Clean text
-# -----------------------------
-def clean_text(text):
-    text = str(text).lower()
-    text = re.sub(r"http\S+", "", text)  # remove URLs
-    text = re.sub(r"@\w+", "", text)     # remove mentions
-    text = re.sub(r"#\w+", "", text)     # remove hashtags
-    text = re.sub(r"\s+", " ", text)     # remove extra spaces
-    return text.strip()
+    # Map labels to 0/1 if needed
+    df["label"] = df["label"].map({"FAKE": 1, "REAL": 0, "fake": 1, "real": 0, 1: 1, 0: 0})
 
-df["text"] = df["text"].apply(clean_text)
+    print(f"Total samples loaded: {len(df)}")
+    print("Label distribution:\n", df["label"].value_counts())
+
+    # Drop missing or short texts
+    df = df.dropna(subset=["text", "label"])
+    df = df[df["text"].str.len() > 10]  # Remove very short texts
+    df = df[df["label"].isin([0, 1])]   # Ensure only 0/1 labels
+    print(f"After cleaning: {len(df)} rows.")
+
+    # Same normalization api.decision applies before embedding at serving time
+    df["text"] = normalize_batch(df["text"], "embedding")
+    return df["text"].tolist(), df["label"].astype(int).tolist()
 
-texts = df["text"].tolist()
-labels = df["label"].astype(int).tolist()
 
 # -----------------------------
 # Generate embeddings
 # -----------------------------
-EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
-embedder = SentenceTransformer(EMBED_MODEL_NAME)
-embeddings = embedder.encode(texts, show_progress_bar=True, convert_to_numpy=True)
+def embed(batch):
+    # Only imported when the store is missing rows
+    from sentence_transformers import SentenceTransformer
+
+    embedder = SentenceTransformer(EMBED_MODEL_NAME)
+    return embedder.encode(batch, show_progress_bar=True, convert_to_numpy=True)
+
+
+def load_embeddings(texts):
+    store = EmbeddingStore(EMBED_STORE_DIR, EMBED_MODEL_NAME, dtype="float32")
+    return store.get(texts, embed), store.last_run
+
 
 # -----------------------------
-# Train-test split
+# Deduplicate
 # -----------------------------
-X_train, X_test, y_train, y_test = train_test_split(
-    embeddings, labels, test_size=0.2, random_state=42, stratify=labels
-)
+def deduplicate(texts, labels, threshold):
+    """
+    Drop exact and near-duplicate rows (MinHash/LSH) before the split, so
+    copies are neither embedded twice nor shared between train and test.
+    """
+    from api.dedup import find_duplicates
+
+    duplicate_of, stats = find_duplicates(texts, threshold=threshold)
+    conflicts = sum(labels[i] != labels[j] for i, j in enumerate(duplicate_of) if j >= 0)
+    print(f"Dedup: {stats['exact_duplicates']} exact and {stats['near_duplicates']} near duplicates "
+          f"(Jaccard >= {threshold}) removed, {stats['kept']} of {stats['rows']} rows kept "
+          f"in {stats['seconds']}s; {conflicts} removed rows had a different label than the kept copy")
+    keep = [i for i, j in enumerate(duplicate_of) if j < 0]
+    return [texts[i] for i in keep], [labels[i] for i in keep], stats
+
 
 # -----------------------------
-# Train classifier
+# Choose classifier
 # -----------------------------
-clf = RandomForestClassifier(n_estimators=200, n_jobs=-1, random_state=42)
-clf.fit(X_train, y_train)
-y_pred = clf.predict(X_test)
+def tune_classifier(X_train, y_train, args):
+    """
+    Cross-validated search over forest and alternative heads on the training
+    split, keeping the best model that meets the latency budget.
+    """
+    from api.tuning import build_model, run_search, select_candidate
+
+    results = run_search(X_train, y_train, folds=args.folds, workers=args.workers)
+    results.sort(key=lambda r: -r["f1_macro"])
+    print(f"{'kind':<20} {'params':<60} {'f1':>6} {'acc':>6} {'fit s':>7} {'lat ms':>8}")
+    for r in results:
+        print(f"{r['kind']:<20} {json.dumps(r['params']):<60} {r['f1_macro']:>6} "
+              f"{r['accuracy']:>6} {r['fit_seconds']:>7} {r['latency_ms']:>8}")
+
+    best = select_candidate(results, args.latency_budget_ms)
+    print(f"Selected {best['kind']} {best['params']} "
+          f"(f1 {best['f1_macro']}, {best['latency_ms']} ms/item, budget {args.latency_budget_ms} ms)")
+    (MODELS_DIR / "tuning_report.json").write_text(json.dumps({
+        "latency_budget_ms": args.latency_budget_ms,
+        "folds": args.folds,
+        "selected": best,
+        "candidates": results,
+    }, indent=2))
+
+    clf = build_model(best["kind"], best["params"])
+    if isinstance(clf, RandomForestClassifier):
+        clf.set_params(n_jobs=-1)
+    return clf
+
 
 # -----------------------------
-# Evaluation
+# Distill serving heads
 # -----------------------------
-print(classification_report(y_test, y_pred, zero_division=0))
+def distill_heads(teacher, X_train, y_train, X_test, y_test, mlp_hidden, folds=5):
+    """
+    Fit linear and MLP heads on the teacher's out-of-fold probabilities over
+    the training split and report how well they agree with it and with the
+    labels on the test split, which neither the teacher nor the heads saw.
+
+    In-sample probabilities of a forest are close to its training labels
+    (each tree has seen most rows), so they would teach the heads little
+    beyond the labels; cross-validated ones carry the teacher's real
+    uncertainty.
+    """
+    import time
+    import numpy as np
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.model_selection import cross_val_predict
+    from api.forest import source_stamp
+    from api.heads import distill_head, head_dir_for
+    from api.tuning import single_item_latency_ms
+
+    X_train = np.asarray(X_train, dtype=np.float32)
+    X_test = np.asarray(X_test, dtype=np.float32)
+    soft = cross_val_predict(clone(teacher), X_train, y_train, cv=folds, method="predict_proba")
+    teacher_test = teacher.predict(X_test)
+    teacher_test_probs = teacher.predict_proba(X_test)
+
+    def scores(model, pred):
+        start = time.perf_counter()
+        model.predict_proba(X_test)
+        batch_seconds = time.perf_counter() - start
+        return {
+            "test_accuracy": round(float(accuracy_score(y_test, pred)), 4),
+            "test_f1_macro": round(float(f1_score(y_test, pred, average="macro", zero_division=0)), 4),
+            "latency_ms": round(single_item_latency_ms(model, X_test[0]), 4),
+            "batch_us_per_item": round(batch_seconds / len(X_test) * 1e6, 2),
+        }
+
+    report = {
+        "targets": f"{folds}-fold out-of-fold teacher probabilities on the training split",
+        "teacher": {"kind": type(teacher).__name__, **scores(teacher, teacher_test)},
+    }
+    source = source_stamp(MODELS_DIR / "fake_rf.joblib")
+    for kind, hidden in (("linear", 0), ("mlp", mlp_hidden)):
+        head = distill_head(X_train, soft, teacher.classes_, hidden=hidden)
+        head.save(head_dir_for(MODELS_DIR, kind), source=source)
+        probs = head.predict_proba(X_test)
+        report[kind] = {
+            "train_target_agreement": round(float((head.predict_proba(X_train).argmax(1) == soft.argmax(1)).mean()), 4),
+            "test_agreement": round(float((head.predict(X_test) == teacher_test).mean()), 4),
+            "test_mean_abs_prob_diff": round(float(np.abs(probs - teacher_test_probs).mean()), 4),
+            **scores(head, head.predict(X_test)),
+        }
+
+    print(json.dumps(report, indent=2))
+    (MODELS_DIR / "distill_report.json").write_text(json.dumps(report, indent=2))
+
 
 # -----------------------------
 # Save model and embedding info
 # -----------------------------
-joblib.dump(clf, MODELS_DIR / "fake_rf.joblib")
-(MODELS_DIR / "embed_model_name.txt").write_text(EMBED_MODEL_NAME)
-print("Saved fake_rf.joblib and embed_model_name.txt to", MODELS_DIR)
\ No newline at end of file
+def export_model(model, path):
+    """
+    Save the model with joblib's defaults (uncompressed). Loading it with
+    mmap_mode does not share a forest between workers: sklearn's
+    ``Tree.__setstate__`` copies the node arrays into each process. The
+    shared copy is the flat export (api.forest, fake_rf_flat/), written next
+    to it by main().
+    """
+    joblib.dump(model, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tune", action="store_true",
+                        help="cross-validate forest sizes/depths, logistic regression and gradient boosting")
+    parser.add_argument("--latency-budget-ms", type=float, default=1.0,
+                        help="max single-item predict_proba time for the selected model")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="search processes (default: all cores)")
+    parser.add_argument("--no-dedup", action="store_true", help="keep duplicate and near-duplicate rows")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="estimated Jaccard similarity of word shingles above which rows are near duplicates")
+    parser.add_argument("--no-distill", action="store_true", help="skip fitting the linear/MLP serving heads")
+    parser.add_argument("--mlp-hidden", type=int, default=64, help="hidden units of the distilled MLP head")
+    args = parser.parse_args()
+
+    texts, labels = load_dataset()
+    dedup_stats = None
+    if not args.no_dedup:
+        texts, labels, dedup_stats = deduplicate(texts, labels, args.dedup_threshold)
+    embeddings, embed_run = load_embeddings(texts)
+    if dedup_stats and embed_run["embedded"]:
+        removed = dedup_stats["rows"] - dedup_stats["kept"]
+        per_text = embed_run["seconds"] / embed_run["embedded"]
+        print(f"Dedup saved ~{removed * per_text:.1f}s of embedding ({removed} rows at {per_text * 1000:.1f} ms/text)")
+
+    # Train-test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        embeddings, labels, test_size=0.2, random_state=42, stratify=labels
+    )
+
+    # Train classifier
+    if args.tune:
+        clf = tune_classifier(X_train, y_train, args)
+    else:
+        clf = RandomForestClassifier(n_estimators=200, n_jobs=-1, random_state=42)
+    clf.fit(X_train, y_train)
+    y_pred = clf.predict(X_test)
+
+    # Evaluation
+    print(classification_report(y_test, y_pred, zero_division=0))
+
+    export_model(clf, MODELS_DIR / "fake_rf.joblib")
+    flat_dir = MODELS_DIR / "fake_rf_flat"
+    if isinstance(clf, RandomForestClassifier):
+        export_flat_forest(clf, flat_dir, source_path=MODELS_DIR / "fake_rf.joblib")
+    else:
+        # Not a forest: serve fake_rf.joblib directly
+        shutil.rmtree(flat_dir, ignore_errors=True)
+    (MODELS_DIR / "embed_model_name.txt").write_text(EMBED_MODEL_NAME)
+    print("Saved fake_rf.joblib, fake_rf_flat/ and embed_model_name.txt to", MODELS_DIR)
+
+    if not args.no_distill:
+        distill_heads(clf, X_train, y_train, X_test, y_test, args.mlp_hidden, folds=args.folds)
+        print("Saved fake_head_linear/ and fake_head_mlp/; serve one with DECISION_HEAD=linear or mlp")
+
+
+if __name__ == "__main__":
+    main()
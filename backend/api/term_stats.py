@@ -0,0 +1,52 @@
+# backend/api/term_stats.py
+import heapq
+from collections import Counter
+from operator import itemgetter
+
+from api.utils.preprocess import normalize
+
+# Words left out of word clouds, on top of the length filter
+WORDCLOUD_STOPWORDS = frozenset({
+    "a", "the", "is", "in", "of", "and", "to", "for", "with", "that", "on",
+    "it", "its", "had", "was", "has", "are", "by", "from",
+})
+MIN_TERM_LENGTH = 3
+WORDCLOUD_TOP_K = 50
+
+
+def terms(text) -> list:
+    """
+    Word-cloud terms of one text: the "terms" normalization, minus
+    stopwords and words shorter than ``MIN_TERM_LENGTH``.
+    """
+    return [
+        w for w in normalize(text, "terms").split()
+        if len(w) >= MIN_TERM_LENGTH and w not in WORDCLOUD_STOPWORDS
+    ]
+
+
+def count_terms(texts, counts: Counter = None) -> Counter:
+    """
+    Term frequencies over ``texts``, added to ``counts`` when given.
+    """
+    counts = Counter() if counts is None else counts
+    for text in texts:
+        counts.update(terms(text))
+    return counts
+
+
+def top_terms(counts, k: int = WORDCLOUD_TOP_K) -> list:
+    """
+    The ``k`` most frequent ``(term, count)`` pairs, ties in first-seen
+    order. Uses a size-k heap (O(n log k)); ``k=None`` sorts everything.
+    """
+    if k is None:
+        return sorted(counts.items(), key=itemgetter(1), reverse=True)
+    return heapq.nlargest(k, counts.items(), key=itemgetter(1))
+
+
+def wordcloud(text, k: int = WORDCLOUD_TOP_K) -> dict:
+    """
+    The ``{"words": {term: count}}`` payload returned by /api/analyze/.
+    """
+    return {"words": dict(top_terms(Counter(terms(text)), k))}
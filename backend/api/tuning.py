@@ -0,0 +1,145 @@
+# backend/api/tuning.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+# Embeddings and labels, set once per worker process by _init_worker
+_X = None
+_y = None
+# Keeps the worker's BLAS/OpenMP pools at one thread (see _init_worker)
+_thread_limits = None
+
+
+# -------------------------
+# Search space
+# -------------------------
+def candidate_grid() -> list:
+    """
+    ``(kind, params)`` pairs covering forest size, depth and max_features
+    plus logistic-regression and gradient-boosting heads.
+    """
+    grid = []
+    for n_estimators, max_depth, max_features in product((50, 100, 200), (None, 8, 16), ("sqrt", 0.1)):
+        grid.append(("random_forest", {
+            "n_estimators": n_estimators, "max_depth": max_depth, "max_features": max_features,
+        }))
+    for C in (0.1, 1.0, 10.0):
+        grid.append(("logistic_regression", {"C": C}))
+    for max_iter, max_depth in product((100, 300), (3, None)):
+        grid.append(("gradient_boosting", {"max_iter": max_iter, "max_depth": max_depth}))
+    return grid
+
+
+def build_model(kind: str, params: dict):
+    if kind == "random_forest":
+        from sklearn.ensemble import RandomForestClassifier
+
+        # One core per candidate; the parallelism comes from the process pool
+        return RandomForestClassifier(n_jobs=1, random_state=42, **params)
+    if kind == "logistic_regression":
+        from sklearn.linear_model import LogisticRegression
+
+        return LogisticRegression(max_iter=2000, **params)
+    if kind == "gradient_boosting":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+
+        return HistGradientBoostingClassifier(random_state=42, **params)
+    raise ValueError(f"Unknown model kind {kind!r}")
+
+
+# -------------------------
+# Evaluation (runs in the worker processes)
+# -------------------------
+def _init_worker(X, y):
+    """
+    Store the data and pin native thread pools to one thread. The pool
+    already runs one candidate per core; without this, gradient boosting
+    (OpenMP) and BLAS would each start a thread per core in every worker
+    and oversubscribe the machine.
+    """
+    global _X, _y, _thread_limits
+    _X, _y = X, y
+    # Libraries loaded later read the variables; loaded ones are limited below
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = "1"
+    import sklearn.ensemble  # noqa: F401  (loads the OpenMP runtime)
+    from threadpoolctl import threadpool_limits
+
+    _thread_limits = threadpool_limits(limits=1)
+
+
+def single_item_latency_ms(model, x, repeats: int = 200) -> float:
+    """
+    Median wall time of ``predict_proba`` on one row, the way
+    ``/api/analyze/`` calls the head. Forests are timed through the flat
+    engine that serves them.
+    """
+    if hasattr(model, "estimators_") and os.getenv("DECISION_RF_ENGINE", "flat") == "flat":
+        from api.forest import FlatForest
+
+        model = FlatForest.from_sklearn(model)
+    x = np.asarray(x, dtype=np.float32).reshape(1, -1)
+    model.predict_proba(x)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(x)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+
+def evaluate_candidate(kind: str, params: dict, folds: int) -> dict:
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.model_selection import StratifiedKFold
+
+    accuracy, f1, fit_seconds = [], [], []
+    for train, test in StratifiedKFold(folds, shuffle=True, random_state=42).split(_X, _y):
+        model = build_model(kind, params)
+        start = time.perf_counter()
+        model.fit(_X[train], _y[train])
+        fit_seconds.append(time.perf_counter() - start)
+        pred = model.predict(_X[test])
+        accuracy.append(accuracy_score(_y[test], pred))
+        f1.append(f1_score(_y[test], pred, average="macro", zero_division=0))
+
+    # Time the model that would be shipped: fit on the whole training split,
+    # not a fold's, since forest depth and size grow with the data
+    model = build_model(kind, params)
+    model.fit(_X, _y)
+    return {
+        "kind": kind,
+        "params": params,
+        "accuracy": round(float(np.mean(accuracy)), 4),
+        "f1_macro": round(float(np.mean(f1)), 4),
+        "f1_std": round(float(np.std(f1)), 4),
+        "fit_seconds": round(float(np.mean(fit_seconds)), 3),
+        "latency_ms": round(single_item_latency_ms(model, _X[0]), 4),
+    }
+
+
+def run_search(X, y, grid=None, folds: int = 5, workers: int = None) -> list:
+    """
+    Cross-validate every candidate of ``grid`` on ``X``/``y`` across a
+    process pool. The embedding matrix is shipped to each worker once.
+    """
+    grid = candidate_grid() if grid is None else grid
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        futures = [pool.submit(evaluate_candidate, kind, params, folds) for kind, params in grid]
+        return [f.result() for f in futures]
+
+
+def select_candidate(results, latency_budget_ms: float) -> dict:
+    """
+    Best macro-F1 among candidates within the latency budget (ties go to the
+    faster one). If none fit, the fastest candidate is returned.
+    """
+    within = [r for r in results if r["latency_ms"] <= latency_budget_ms]
+    if not within:
+        print(f"[WARN] No candidate meets the {latency_budget_ms} ms budget; picking the fastest")
+        return min(results, key=lambda r: r["latency_ms"])
+    return max(within, key=lambda r: (r["f1_macro"], -r["latency_ms"]))
@@ -1,27 +1,131 @@
 # backend/api/utils/preprocess.py
-from pathlib import Path
+"""
+Text normalization shared by training, serving and the word cloud.
+
+Every caller picks a named profile instead of keeping its own copy of the
+regexes, so the text the embedder sees at serving time is exactly the text
+it was trained on:
+
+* ``embedding``: lowercase, drop URLs, @mentions and #hashtags, collapse
+  whitespace (the classifier's input, in train_fake_classifier.py and
+  api.decision). Versioned by ``EMBEDDING_VERSION``, see below
+* ``terms``: as ``embedding``, also dropping punctuation and digits (word
+  cloud and term statistics)
+* ``tokens``: lowercase, drop URLs, mentions and hashtags, turn
+  non-alphanumerics into spaces, tokenize and remove stopwords (the
+  original ``clean_text``, minus NLTK: a regex tokenizer reproduces
+  word_tokenize's output on this text and the stopword list is bundled)
+"""
 import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
 
-# Ensure nltk data is available (quiet)
-nltk.download("punkt", quiet=True)
-nltk.download("stopwords", quiet=True)
+from api.utils.stopwords import ENGLISH_STOPWORDS
+
+PROFILES = ("embedding", "terms", "tokens")
+
+# Patterns are compiled once at import; each profile strips in one pass.
+# A handle stops where a URL starts, which gives the same result as removing
+# URLs first and handles second.
+_URL_OR_HANDLE = r"http\S+|www\.\S+|[@#](?:(?!http\S|www\.\S)\w)+"
+
+# The embedding profile is the classifier's input, so changing it means
+# retraining models/fake_rf.joblib. Bump EMBEDDING_VERSION only together
+# with a retrain:
+# 1: http URLs, @mentions and #hashtags (what the committed model was
+#    trained on)
+# 2: also www. URLs, like the other profiles
+EMBEDDING_VERSION = 1
+_EMBEDDING_STRIP = {
+    1: r"http\S+|[@#](?:(?!http\S)\w)+",
+    2: _URL_OR_HANDLE,
+}
+
+_STRIP = {
+    "embedding": re.compile(_EMBEDDING_STRIP[EMBEDDING_VERSION]),
+    "terms": re.compile(rf"{_URL_OR_HANDLE}|[^\w\s]|\d+"),
+    "tokens": re.compile(_URL_OR_HANDLE),
+}
+_ALNUM_RUN = re.compile(r"[a-z0-9]+")
+
+# Once punctuation is gone, the only Penn Treebank rules word_tokenize can
+# still apply are these contraction splits
+_TREEBANK_SPLITS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+
+STOPWORDS = ENGLISH_STOPWORDS
+
+
+def tokenize(text: str) -> list:
+    """
+    Split already stripped, lowercased text into the tokens NLTK's
+    word_tokenize returns for it once non-alphanumerics are spaces:
+    alphanumeric runs, with the Treebank contractions split.
+    """
+    tokens = []
+    for run in _ALNUM_RUN.findall(text):
+        split = _TREEBANK_SPLITS.get(run)
+        if split:
+            tokens.extend(split)
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def normalize(text, profile: str = "embedding") -> str:
+    """
+    Normalize one text with ``profile``. ``None`` and NaN become "".
+    """
+    if text is None or text != text:
+        return ""
+    text = _STRIP[profile].sub("", str(text).lower())
+    if profile != "tokens":
+        return " ".join(text.split())
+
+    return " ".join(t for t in tokenize(text) if t not in STOPWORDS and len(t) > 1)
+
+
+def normalize_batch(texts, profile: str = "embedding"):
+    """
+    Normalize a list or pandas Series of texts. A Series comes back as a
+    Series with the same index, anything else as a list.
+
+    This is a convenience wrapper, not a faster path: the time goes into
+    the regex pass, which costs the same per character whether it runs per
+    text or over a joined batch (pandas ``.str`` ops loop over ``re`` too).
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown normalization profile {profile!r}; expected one of {PROFILES}")
+    cleaned = [normalize(t, profile) for t in texts]
+    if hasattr(texts, "index") and hasattr(texts, "to_numpy"):
+        import pandas as pd
+
+        return pd.Series(cleaned, index=texts.index, name=texts.name, dtype=object)
+    return cleaned
+
+
+# -------------------------
+# Input validation
+# -------------------------
+INVALID_TEXT = "text must be a non-empty string"
+
+
+def is_valid_text(text) -> bool:
+    """
+    The one check every analyze path applies to its input: a string with at
+    least one non-whitespace character. Numbers, lists and the like are
+    rejected rather than converted.
+    """
+    return isinstance(text, str) and bool(text.strip())
 
-STOPWORDS = set(stopwords.words("english"))
 
 def clean_text(text: str) -> str:
     """
     Simple cleaning: lowercase, remove urls, mentions, hashtags,
     non-alphanumeric chars, tokenise and remove stopwords.
     """
-    if text is None:
-        return ""
-    text = str(text).lower()
-    text = re.sub(r"http\S+|www\.\S+", "", text)
-    text = re.sub(r"@\w+", "", text)
-    text = re.sub(r"#\w+", "", text)
-    text = re.sub(r"[^a-z0-9\s]", " ", text)
-    tokens = [t for t in word_tokenize(text) if t not in STOPWORDS and len(t) > 1]
-    return " ".join(tokens)
+    return normalize(text, "tokens")
@@ -1,3 +1,13 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ProfilingSwitch
+
+
+@admin.register(ProfilingSwitch)
+class ProfilingSwitchAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "enabled", "sample_rate", "updated_at")
+    list_editable = ("enabled", "sample_rate")
+
+    def has_add_permission(self, request):
+        # A single switch; ProfilingMiddleware only reads the first row
+        return not ProfilingSwitch.objects.exists()
@@ -0,0 +1,49 @@
+from collections import Counter
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.corpus_stats import CORPUS_STATS_DIR, PROJECT_ROOT, CorpusStats, accumulate, save_corpus_stats
+from api_app.management.commands.score_corpus import iter_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the corpus statistics served by /api/stats/ and /api/wordcloud/: label counts and "
+        "per-label term frequencies, read from a CSV or Parquet file in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", type=Path, nargs="?", default=PROJECT_ROOT / "data" / "indian_news_500.csv")
+        parser.add_argument("--output", type=Path, default=CORPUS_STATS_DIR)
+        parser.add_argument("--append", action="store_true",
+                            help="add the input's rows to the existing statistics instead of rebuilding")
+        parser.add_argument("--chunk-size", type=int, default=10000)
+        parser.add_argument("--text-column", default="text")
+        parser.add_argument("--label-column", default="label")
+
+    def handle(self, *args, **options):
+        source = options["input"]
+        out_dir = options["output"]
+        if not source.exists():
+            raise CommandError(f"{source} does not exist")
+
+        label_counts, term_counts, sources = None, None, [str(source.resolve())]
+        if options["append"]:
+            if not (out_dir / "meta.json").exists():
+                raise CommandError(f"nothing to append to in {out_dir}; run without --append first")
+            previous = CorpusStats.load(out_dir, mmap=False)
+            label_counts = previous.meta["label_counts"]
+            term_counts = previous.term_counters()
+            sources = (previous.meta.get("source") or "").split(";") + sources
+
+        chunks = iter_chunks(source, options["chunk_size"], options["text_column"], options["label_column"])
+        try:
+            label_counts, term_counts = accumulate(chunks, Counter(label_counts or {}), term_counts)
+        except ValueError as e:
+            raise CommandError(f"{source}: {e}")
+
+        meta = save_corpus_stats(out_dir, label_counts, term_counts, source=";".join(s for s in sources if s))
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {out_dir}: {meta['label_counts']} rows, {meta['n_terms']} distinct terms"
+        ))
@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import AREAS, PROFILE_DIR, area_seconds, hot_functions, merge_profiles, profile_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge the cProfile files written by ProfilingMiddleware and report where the profiled requests "
+        "spent their time: per code area (embedding, forest, normalize, django) and the hottest functions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="*", type=Path, help="profile files (default: every file in --dir)")
+        parser.add_argument("--dir", type=Path, default=PROFILE_DIR)
+        parser.add_argument("--since", type=float, metavar="HOURS", help="only files written in the last HOURS")
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--sort", choices=("tottime", "cumulative"), default="tottime")
+        parser.add_argument("--areas", default="embedding,forest",
+                            help=f"areas to list functions for (of {', '.join(AREAS)})")
+        parser.add_argument("--output", type=Path, help="write the merged profile here (.prof, for snakeviz etc.)")
+        parser.add_argument("--json", type=Path, help="also write the report as JSON")
+
+    def handle(self, *args, **options):
+        files = options["files"] or profile_files(options["dir"], options["since"])
+        if not files:
+            raise CommandError(f"no profiles in {options['dir']}; enable ProfilingMiddleware first")
+        areas = [a.strip() for a in options["areas"].split(",") if a.strip()]
+        unknown = [a for a in areas if a not in AREAS and a != "other"]
+        if unknown:
+            raise CommandError(f"unknown area {', '.join(unknown)}; expected {', '.join(AREAS)} or other")
+
+        stats, runs = merge_profiles(files)
+        total = stats.total_tt
+        by_area = area_seconds(stats)
+        report = {
+            "files": len(files),
+            "requests": runs,
+            "profiled_seconds": total,
+            "areas": {
+                name: {"seconds": sec, "share": sec / total if total else 0.0, "ms_per_request": sec * 1000 / runs}
+                for name, sec in sorted(by_area.items(), key=lambda kv: -kv[1])
+            },
+            "hot": {area: hot_functions(stats, area, options["sort"], options["top"]) for area in areas},
+            "overall": hot_functions(stats, None, "tottime", options["top"]),
+        }
+
+        out = self.stdout
+        out.write(f"{report['files']} files, {runs} requests, {total:.3f} s profiled "
+                  f"({total * 1000 / runs:.2f} ms per request)\n")
+        out.write(f"{'area':<12}{'seconds':>10}{'share':>8}{'ms/request':>12}")
+        for name, row in report["areas"].items():
+            out.write(f"{name:<12}{row['seconds']:>10.3f}{row['share']:>8.0%}{row['ms_per_request']:>12.2f}")
+
+        sections = [(f"{area} by {options['sort']}", rows) for area, rows in report["hot"].items()]
+        sections.append(("overall by tottime", report["overall"]))
+        for title, rows in sections:
+            out.write(f"\n== {title} ==")
+            out.write(f"{'calls':>9}{'tottime':>10}{'cumtime':>10}  function")
+            for r in rows:
+                out.write(f"{r['calls']:>9}{r['tottime']:>10.4f}{r['cumulative']:>10.4f}  {r['function']}")
+
+        if options["output"]:
+            stats.dump_stats(options["output"])
+            out.write(self.style.SUCCESS(f"\nMerged profile written to {options['output']}"))
+        if options["json"]:
+            options["json"].write_text(json.dumps(report, indent=2))
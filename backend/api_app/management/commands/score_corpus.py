@@ -0,0 +1,241 @@
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pyarrow as pa
+from django.core.management.base import BaseCommand, CommandError
+
+CHECKPOINT_NAME = "_checkpoint.json"
+
+# Every worker process holds its own copy of the models, so memory grows
+# with the worker count; keep the default small
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Fixed column types, so a chunk whose labels or errors are all null still
+# writes the same schema as the others and the folder reads as one dataset
+SCHEMA = pa.schema([
+    ("row", pa.int64()),
+    ("label", pa.string()),
+    ("probability", pa.float64()),
+    ("prob_real", pa.float64()),
+    ("prob_fake", pa.float64()),
+    ("error", pa.string()),
+])
+LABELLED_SCHEMA = SCHEMA.append(pa.field("true_label", pa.string()))
+
+
+class ModelUnavailable(RuntimeError):
+    """
+    Raised instead of scoring when the classifier or the embedder did not load.
+    """
+
+
+# -------------------------
+# Input streaming
+# -------------------------
+def iter_chunks(path: Path, chunk_size: int, text_column: str, label_column: str):
+    """
+    Yield ``(texts, labels)`` lists of at most ``chunk_size`` rows from a CSV
+    or Parquet file without loading the whole file. ``labels`` is ``None``
+    when the file has no label column.
+    """
+    if path.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        names = pf.schema_arrow.names
+        if text_column not in names:
+            raise CommandError(f"{path} has no '{text_column}' column")
+        columns = [text_column] + ([label_column] if label_column in names else [])
+        for batch in pf.iter_batches(batch_size=chunk_size, columns=columns):
+            data = batch.to_pydict()
+            yield data[text_column], data.get(label_column)
+        return
+
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0).columns
+    if text_column not in header:
+        raise CommandError(f"{path} has no '{text_column}' column")
+    columns = [text_column] + ([label_column] if label_column in header else [])
+    for frame in pd.read_csv(path, usecols=columns, chunksize=chunk_size, dtype=str, keep_default_na=False):
+        labels = frame[label_column].tolist() if label_column in frame else None
+        yield frame[text_column].tolist(), labels
+
+
+# -------------------------
+# Scoring (runs in the worker processes)
+# -------------------------
+def _init_worker(threads: int = 0):
+    """
+    Load the models in a pool process. ``threads`` caps torch's intra-op
+    threads so that the workers together do not oversubscribe the CPU.
+    """
+    from api import decision
+
+    decision.warmup()
+    if threads and "torch" in sys.modules:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def require_models():
+    """
+    Raise ``ModelUnavailable`` unless the classifier and the embedder loaded
+    in this process.
+    """
+    from api.decision import registry
+
+    missing = [name for name in ("rf_model", "embedder") if registry.get(name) is None]
+    if missing:
+        status = registry.status()
+        raise ModelUnavailable("; ".join(f"{name}: {status[name]['error']}" for name in missing))
+
+
+def score_chunk(chunk_id: int, first_row: int, texts, labels, out_dir: str, batch_size: int) -> int:
+    """
+    Score one chunk and write it to ``part-<chunk_id>.parquet``. The file is
+    written under a temporary name and renamed, so a crash never leaves a
+    half-written part behind. Raises ``ModelUnavailable`` without writing
+    anything when the models are not loaded.
+    """
+    import pyarrow.parquet as pq
+    from api.decision import predict_fake_batch
+
+    require_models()
+    texts = ["" if t is None else str(t) for t in texts]
+    results = predict_fake_batch(texts, batch_size=batch_size)
+
+    columns = {
+        "row": list(range(first_row, first_row + len(texts))),
+        "label": [r.get("label") for r in results],
+        "probability": [r.get("probability") for r in results],
+        "prob_real": [r.get("probabilities", {}).get("real") for r in results],
+        "prob_fake": [r.get("probabilities", {}).get("fake") for r in results],
+        "error": [r.get("error") for r in results],
+    }
+    schema = SCHEMA
+    if labels is not None:
+        columns["true_label"] = ["" if v is None else str(v) for v in labels]
+        schema = LABELLED_SCHEMA
+
+    final = Path(out_dir) / f"part-{chunk_id:06d}.parquet"
+    tmp = final.with_name(final.name + ".tmp")
+    pq.write_table(pa.Table.from_pydict(columns, schema=schema), tmp)
+    os.replace(tmp, final)
+    return chunk_id
+
+
+# -------------------------
+# Checkpoint
+# -------------------------
+def load_checkpoint(out_dir: Path, source: Path, chunk_size: int) -> dict:
+    path = out_dir / CHECKPOINT_NAME
+    if not path.exists():
+        return {"input": str(source.resolve()), "chunk_size": chunk_size, "completed": [], "rows": 0}
+    checkpoint = json.loads(path.read_text())
+    if checkpoint["input"] != str(source.resolve()) or checkpoint["chunk_size"] != chunk_size:
+        raise CommandError(
+            f"{out_dir} holds a run for {checkpoint['input']} with chunk size {checkpoint['chunk_size']}; "
+            "use the same arguments to resume or --restart to start over"
+        )
+    return checkpoint
+
+
+def save_checkpoint(out_dir: Path, checkpoint: dict):
+    tmp = out_dir / (CHECKPOINT_NAME + ".tmp")
+    tmp.write_text(json.dumps(checkpoint))
+    os.replace(tmp, out_dir / CHECKPOINT_NAME)
+
+
+class Command(BaseCommand):
+    help = (
+        "Score a CSV or Parquet corpus (indian_news_500.csv schema: a 'text' column, optional 'label') "
+        "in chunks across a process pool, writing Parquet part files and resuming from a checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", type=Path, help="CSV or Parquet file to score")
+        parser.add_argument("output", type=Path, help="folder for part-*.parquet files and the checkpoint")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="rows per chunk / part file")
+        parser.add_argument("--batch-size", type=int, default=64, help="texts per embedder batch")
+        parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                            help="scoring processes, each with its own copy of the models (0 scores in this process)")
+        parser.add_argument("--threads-per-worker", type=int,
+                            help="torch threads per scoring process (default: CPUs divided by --workers)")
+        parser.add_argument("--text-column", default="text")
+        parser.add_argument("--label-column", default="label")
+        parser.add_argument("--restart", action="store_true", help="discard an existing checkpoint")
+
+    def handle(self, *args, **options):
+        source = options["input"]
+        out_dir = options["output"]
+        chunk_size = options["chunk_size"]
+        if not source.exists():
+            raise CommandError(f"{source} does not exist")
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        if options["restart"]:
+            for stale in [*out_dir.glob("part-*.parquet"), *out_dir.glob("*.tmp"), out_dir / CHECKPOINT_NAME]:
+                stale.unlink(missing_ok=True)
+
+        checkpoint = load_checkpoint(out_dir, source, chunk_size)
+        done = set(checkpoint["completed"])
+        if done:
+            self.stdout.write(f"Resuming: {len(done)} chunks ({checkpoint['rows']} rows) already scored")
+
+        chunks = iter_chunks(source, chunk_size, options["text_column"], options["label_column"])
+        todo = (
+            (chunk_id, chunk_id * chunk_size, texts, labels)
+            for chunk_id, (texts, labels) in enumerate(chunks)
+            if chunk_id not in done
+        )
+
+        def finished(chunk_id, n_rows):
+            done.add(chunk_id)
+            checkpoint["completed"] = sorted(done)
+            checkpoint["rows"] += n_rows
+            save_checkpoint(out_dir, checkpoint)
+            self.stdout.write(f"chunk {chunk_id}: {n_rows} rows (total {checkpoint['rows']})")
+
+        try:
+            self._score(todo, finished, options["workers"], options["threads_per_worker"],
+                        str(out_dir), options["batch_size"])
+        except ModelUnavailable as e:
+            raise CommandError(f"Models unavailable, stopping after {len(done)} scored chunks: {e}")
+        except BrokenProcessPool as e:
+            raise CommandError(f"A scoring process died: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {checkpoint['rows']} rows into {len(done)} part files in {out_dir}"
+        ))
+
+    def _score(self, todo, finished, workers: int, threads: int, out_dir: str, batch_size: int):
+        # A chunk is checkpointed only after its part file is written, and
+        # score_chunk refuses to write when the models did not load
+        if workers <= 0:
+            _init_worker()
+            require_models()
+            for chunk_id, first_row, texts, labels in todo:
+                score_chunk(chunk_id, first_row, texts, labels, out_dir, batch_size)
+                finished(chunk_id, len(texts))
+        else:
+            if threads is None:
+                threads = max(1, (os.cpu_count() or 1) // workers)
+            # At most two chunks per worker are in flight, so memory stays
+            # flat no matter how large the input is.
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+                pending = {}
+                for chunk_id, first_row, texts, labels in todo:
+                    future = pool.submit(score_chunk, chunk_id, first_row, texts, labels, out_dir, batch_size)
+                    pending[future] = len(texts)
+                    if len(pending) >= 2 * workers:
+                        completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for f in completed:
+                            finished(f.result(), pending.pop(f))
+                for f in wait(pending).done:
+                    finished(f.result(), pending.pop(f))
@@ -0,0 +1,157 @@
+import atexit
+import cProfile
+import hmac
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from api import profiling
+from api.batching import run_inline
+from api.metrics import REQUEST_ERRORS, REQUEST_SECONDS, REQUESTS, registry as metrics_registry
+
+PROFILED = metrics_registry.counter("api_profiled_requests_total", "Requests run under cProfile, by trigger.",
+                                    ("trigger",))
+
+# Seconds the admin switch is cached per worker
+SWITCH_TTL = 5.0
+
+
+class RequestMetricsMiddleware:
+    """
+    Counts every request by route, method and status and times it into
+    ``api_request_duration_seconds``. Works in sync and async stacks, so the
+    async analyze view is not forced through a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        _record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        _record(request, response, time.perf_counter() - start)
+        return response
+
+
+def _record(request, response, seconds: float):
+    # The URL pattern, not the path, keeps the label set small
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match is not None else "unmatched"
+    REQUESTS.inc(route, request.method, str(response.status_code))
+    REQUEST_SECONDS.observe(seconds, route)
+    if response.status_code >= 500:
+        REQUEST_ERRORS.inc(route)
+
+
+class ProfilingMiddleware:
+    """
+    Runs requests to ``profiling.ROUTES`` (/api/analyze/ by default) under
+    cProfile when asked to:
+
+    * an ``X-Profile`` header equal to DECISION_PROFILE_TOKEN profiles that
+      request and writes it to its own file, named in the ``X-Profile-File``
+      response header; without a token set the header is ignored;
+    * DECISION_PROFILE_SAMPLE_RATE, or the sample rate of the enabled
+      ProfilingSwitch in the admin, profiles a random share of requests,
+      merged into one file per DECISION_PROFILE_FLUSH_EVERY requests.
+
+    Other requests pay a path check, plus a cached switch lookup on the
+    profiled routes. In an async stack requests pass through untouched:
+    cProfile only sees the calling thread and the async view runs inference
+    on a pool thread. With DECISION_MICROBATCH=1 a profiled request skips
+    the micro-batcher and is scored on its own thread, so its profile holds
+    the embedding and forest work (at batch size one).
+    ``manage.py profile_report`` merges the files.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.store = profiling.ProfileStore()
+        # Sampled profiles not yet merged into a file are written on exit
+        atexit.register(self.store.flush)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.get_response(request)
+        trigger = _profile_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return self.get_response(request)
+        try:
+            with run_inline():
+                response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        PROFILED.inc(trigger)
+        if trigger == "header":
+            response["X-Profile-File"] = self.store.write(profiler).name
+        else:
+            self.store.add(profiler)
+        return response
+
+
+def _profile_trigger(request):
+    if request.path_info.lstrip("/") not in profiling.ROUTES:
+        return None
+    header = request.headers.get("X-Profile")
+    if header is not None and profiling.TOKEN and hmac.compare_digest(header.encode(), profiling.TOKEN.encode()):
+        return "header"
+    rate = max(profiling.SAMPLE_RATE, switch_sample_rate())
+    if rate > 0 and random.random() < rate:
+        return "sampled"
+    return None
+
+
+_switch = {"rate": 0.0, "expires": 0.0, "warned": False}
+
+
+def switch_sample_rate() -> float:
+    """
+    Sample rate of the admin ProfilingSwitch (0 when off or missing), read
+    from the database at most once per SWITCH_TTL seconds.
+    """
+    now = time.monotonic()
+    if now < _switch["expires"]:
+        return _switch["rate"]
+    from django.db import DatabaseError
+
+    from .models import ProfilingSwitch
+
+    try:
+        row = ProfilingSwitch.objects.order_by("id").values_list("enabled", "sample_rate").first()
+        rate = float(row[1]) if row and row[0] else 0.0
+    except DatabaseError as e:
+        if not _switch["warned"]:
+            print(f"[WARN] Profiling switch unavailable ({e}); run: python manage.py migrate")
+            _switch["warned"] = True
+        rate = 0.0
+    _switch.update(rate=min(max(rate, 0.0), 1.0), expires=now + SWITCH_TTL)
+    return _switch["rate"]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 11:13
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilingSwitch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enabled', models.BooleanField(default=False)),
+                ('sample_rate', models.FloatField(default=0.01, help_text='Share of requests to profile, 0 to 1. Workers pick up changes within a few seconds.', validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)])),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'profiling switch',
+                'verbose_name_plural': 'profiling switch',
+            },
+        ),
+    ]
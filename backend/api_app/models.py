@@ -1,3 +1,25 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-# Create your models here.
+
+class ProfilingSwitch(models.Model):
+    """
+    Admin toggle for ProfilingMiddleware. Only the first row is read; while
+    it is enabled, ``sample_rate`` of the requests to the profiled routes run
+    under cProfile (on top of DECISION_PROFILE_SAMPLE_RATE).
+    """
+
+    enabled = models.BooleanField(default=False)
+    sample_rate = models.FloatField(
+        default=0.01,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        help_text="Share of requests to profile, 0 to 1. Workers pick up changes within a few seconds.",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "profiling switch"
+        verbose_name_plural = "profiling switch"
+
+    def __str__(self):
+        return f"Profiling {'on' if self.enabled else 'off'} ({self.sample_rate:.2%} of requests)"
@@ -1,3 +1,1017 @@
-from django.test import TestCase
+import subprocess
+import sys
+import io
+import json
+import tempfile
+from unittest import mock
+from pathlib import Path
 
-# Create your tests here.
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from api.corpus_stats import CorpusStats, accumulate, save_corpus_stats
+from api import decision, profiling
+from api.batching import MicroBatcher
+from api.bucketing import encode_bucketed, plan_batches
+from api.dedup import find_duplicates
+from api.documents import StreamingAggregator, iter_windows
+from api.embed_cache import EmbeddingCache, text_key
+from api.embedders import StubEmbedder, load_embedder, onnx_dir_for, quantize_onnx
+from api.embedding_store import EmbeddingStore
+from api.executor import BoundedExecutor, QueueFull
+from api.registry import ModelRegistry
+from api.forest import FlatForest
+from api.heads import DenseHead, distill_head
+from api.metrics import PREDICTION_ERRORS, REQUESTS, Histogram
+from api.scripts.bench_analyze import make_workload
+from api.scripts.bench_startup import parse_importtime
+from api.term_stats import count_terms, top_terms, wordcloud
+from api.tuning import select_candidate
+from api.utils.preprocess import normalize, normalize_batch
+from api_app import middleware
+from api_app.management.commands.score_corpus import iter_chunks
+from api_app.models import ProfilingSwitch
+
+
+class FlatForestParityTests(SimpleTestCase):
+    """
+    The flat array evaluator must reproduce sklearn's predict_proba.
+    """
+
+    def assert_parity(self, model, X):
+        flat = FlatForest.from_sklearn(model)
+        np.testing.assert_allclose(flat.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+
+    def test_shipped_model(self):
+        model = joblib.load(decision.RF_MODEL_PATH)
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal((500, model.n_features_in_)).astype(np.float32)
+        X /= np.linalg.norm(X, axis=1, keepdims=True)
+        self.assert_parity(model, X)
+
+    def test_deep_forest(self):
+        X, y = make_classification(n_samples=1500, n_features=64, random_state=0)
+        model = RandomForestClassifier(n_estimators=50, random_state=0).fit(X[:1000], y[:1000])
+        self.assert_parity(model, X[1000:])
+
+    def test_single_row_and_mmap_round_trip(self):
+        X, y = make_classification(n_samples=400, n_features=16, random_state=1)
+        model = RandomForestClassifier(n_estimators=20, random_state=1).fit(X, y)
+        with tempfile.TemporaryDirectory() as tmp:
+            FlatForest.from_sklearn(model).save(tmp)
+            flat = FlatForest.load(tmp, mmap=True)
+            self.assertIsInstance(flat.feature, np.memmap)
+            np.testing.assert_allclose(flat.predict_proba(X[0]), model.predict_proba(X[:1]), atol=1e-12)
+
+
+class DistilledHeadTests(SimpleTestCase):
+    """
+    Heads distilled from a forest should mostly agree with it and survive a
+    save/load round trip unchanged.
+    """
+
+    def test_distilled_heads_agree_with_teacher(self):
+        X, y = make_classification(n_samples=1200, n_features=32, random_state=2)
+        forest = RandomForestClassifier(n_estimators=50, random_state=2).fit(X, y)
+        soft = forest.predict_proba(X)
+        for hidden in (0, 32):
+            head = distill_head(X, soft, forest.classes_, hidden=hidden, epochs=100)
+            agreement = (head.predict(X) == forest.predict(X)).mean()
+            self.assertGreater(agreement, 0.9)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                head.save(tmp)
+                loaded = DenseHead.load(tmp, mmap=True)
+                self.assertEqual(loaded.kind, "linear" if hidden == 0 else "mlp")
+                np.testing.assert_allclose(loaded.predict_proba(X[:5]), head.predict_proba(X[:5]), atol=1e-6)
+
+    def test_stale_head_falls_back_to_forest(self):
+        from api.forest import source_stamp
+        from api.heads import head_dir_for
+
+        X, y = make_classification(n_samples=200, n_features=8, random_state=3)
+        head = distill_head(X, np.eye(2)[y], np.array(["fake", "real"]), hidden=0, epochs=5)
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(decision, "MODELS_DIR", Path(tmp)), \
+                mock.patch.object(decision, "HEAD", "linear"):
+            head.save(head_dir_for(tmp, "linear"), source=source_stamp(decision.RF_MODEL_PATH))
+            with mock.patch("api.forest.file_sha1") as file_sha1:
+                self.assertIsInstance(decision._load_rf_model(), DenseHead)
+            file_sha1.assert_not_called()
+
+            # Touched but identical (e.g. a fresh checkout): hashed, still current
+            head.save(head_dir_for(tmp, "linear"), source={**source_stamp(decision.RF_MODEL_PATH), "source_mtime_ns": 0})
+            self.assertIsInstance(decision._load_rf_model(), DenseHead)
+
+            head.save(head_dir_for(tmp, "linear"), source={"source_sha1": "0" * 40})
+            self.assertNotIsInstance(decision._load_rf_model(), DenseHead)
+
+
+class DeduplicationTests(SimpleTestCase):
+    def test_exact_and_near_duplicates_point_at_first_copy(self):
+        article = " ".join(f"word{i}" for i in range(60))
+        edited = article.replace("word30", "changed")
+        texts = [article, "something else entirely", "  " + article.upper(), edited, "another unrelated line"]
+        duplicate_of, stats = find_duplicates(texts, threshold=0.8)
+        self.assertEqual(duplicate_of.tolist(), [-1, -1, 0, 0, -1])
+        self.assertEqual((stats["exact_duplicates"], stats["near_duplicates"], stats["kept"]), (1, 1, 3))
+
+
+class NormalizationTests(SimpleTestCase):
+    def test_profiles(self):
+        text = "Check https://t.co/x  NOW!! @bob #tag\n it's 2024 www.a.in ok"
+        # Embedding profile version 1 keeps www. URLs, as fake_rf.joblib was trained
+        self.assertEqual(normalize(text, "embedding"), "check now!! it's 2024 www.a.in ok")
+        self.assertEqual(normalize(text, "terms"), "check now its ok")
+        self.assertEqual(normalize(None), "")
+
+    def test_tokens_profile_matches_treebank_contractions(self):
+        text = "I cannot wait, gonna watch it @bob http://x.in #news wanna see? Gimme 2 mins!"
+        self.assertEqual(normalize(text, "tokens"), "wait gon na watch wan na see gim mins")
+
+    def test_batch_keeps_series_index(self):
+        import pandas as pd
+
+        series = pd.Series(["A  B", None], index=[5, 6])
+        out = normalize_batch(series)
+        self.assertEqual(out.index.tolist(), [5, 6])
+        self.assertEqual(out.tolist(), ["a b", ""])
+        self.assertEqual(normalize_batch(["A  B"]), ["a b"])
+
+
+class TermStatsTests(SimpleTestCase):
+    def test_wordcloud_counts_filtered_terms(self):
+        cloud = wordcloud("The army, the ARMY and the border! Is it 2024? #tag @x army")
+        self.assertEqual(cloud, {"words": {"army": 3, "border": 1}})
+
+    def test_top_terms_heap_matches_full_sort(self):
+        counts = count_terms(["alpha beta beta gamma", "gamma gamma delta beta"])
+        self.assertEqual(top_terms(counts, k=2), [("beta", 3), ("gamma", 3)])
+        self.assertEqual(top_terms(counts, k=None)[:2], top_terms(counts, k=2))
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "cache.sqlite3"
+
+    def test_key_ignores_spacing_and_unicode_form(self):
+        self.assertEqual(text_key("Talks  resume\n in Delhi ", "m"), text_key("Talks resume in Delhi", "m"))
+        self.assertEqual(text_key("caf\u00e9", "m"), text_key("cafe\u0301", "m"))
+        self.assertNotEqual(text_key("Talks resume", "m"), text_key("Talks resume", "other"))
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = EmbeddingCache("m", capacity=2)
+        cache.put_many(["a", "b"], np.eye(2, dtype=np.float32))
+        cache.get_many(["a"])
+        cache.put_many(["c"], [[1.0, 1.0]])
+        found = cache.get_many(["a", "b", "c"])
+        self.assertIsNone(found[1])
+        np.testing.assert_array_equal(found[0], [1.0, 0.0])
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_sqlite_round_trip_and_model_isolation(self):
+        vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+        EmbeddingCache("m", capacity=0, disk_path=self.path).put_many(["one", "two"], vectors)
+
+        # Another model sharing the file neither sees nor deletes the rows
+        other = EmbeddingCache("other", disk_path=self.path)
+        self.assertEqual(other.get_many(["one", "two"]), [None, None])
+
+        reopened = EmbeddingCache("m", disk_path=self.path)
+        found = reopened.get_many(["two", "one"])
+        np.testing.assert_array_equal(np.vstack(found), vectors[::-1])
+        self.assertEqual(reopened.stats()["disk_hits"], 2)
+
+    def test_disk_reads_do_not_hold_the_memory_lock(self):
+        import threading
+
+        cache = EmbeddingCache("m", disk_path=self.path)
+        cache.put_many(["one"], [[1.0, 2.0]])
+        fresh = EmbeddingCache("m", disk_path=self.path)
+        results = []
+        with fresh._lock:
+            # Another thread's SQLite read proceeds while the LRU is locked
+            reader = threading.Thread(target=lambda: results.append(fresh._disk_get([text_key("one", "m")])))
+            reader.start()
+            reader.join(timeout=5)
+            self.assertFalse(reader.is_alive())
+        np.testing.assert_array_equal(list(results[0].values())[0], [1.0, 2.0])
+
+        threads = [threading.Thread(target=lambda: results.append(fresh.get_many(["one", "two"])))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertTrue(all(found[0] is not None and found[1] is None for found in results[1:]))
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_results_keep_caller_order_and_batches_are_capped(self):
+        sizes = []
+
+        def double(items):
+            sizes.append(len(items))
+            return [2 * x for x in items]
+
+        batcher = MicroBatcher(double, max_batch=3, max_latency_ms=1000)
+        futures = [batcher.submit(i) for i in range(6)]
+        self.assertEqual([f.result(timeout=5) for f in futures], [0, 2, 4, 6, 8, 10])
+        self.assertTrue(all(n <= 3 for n in sizes))
+        self.assertEqual(sum(sizes), 6)
+
+    def test_partial_batch_flushes_at_deadline(self):
+        batcher = MicroBatcher(lambda items: items, max_batch=100, max_latency_ms=20)
+        self.assertEqual(batcher.submit("a").result(timeout=5), "a")
+        self.assertEqual(batcher.stats()["batch_sizes"], {1: 1})
+
+    def test_exception_reaches_every_future(self):
+        def fail(items):
+            raise ValueError("boom")
+
+        batcher = MicroBatcher(fail, max_batch=3, max_latency_ms=1000)
+        futures = [batcher.submit(i) for i in range(3)]
+        for f in futures:
+            with self.assertRaisesMessage(ValueError, "boom"):
+                f.result(timeout=5)
+
+    def test_short_result_fails_every_future(self):
+        batcher = MicroBatcher(lambda items: items[:1], max_batch=3, max_latency_ms=1000)
+        futures = [batcher.submit(i) for i in range(3)]
+        for f in futures:
+            with self.assertRaisesMessage(RuntimeError, "returned 1 results for 3 items"):
+                f.result(timeout=5)
+
+    def test_call_gives_up_after_timeout(self):
+        from concurrent.futures import TimeoutError as FuturesTimeout
+        import threading
+
+        release = threading.Event()
+        self.addCleanup(release.set)
+        batcher = MicroBatcher(lambda items: release.wait() and items, max_batch=1, timeout=0.05)
+        with self.assertRaises(FuturesTimeout):
+            batcher("stuck")
+        with mock.patch.object(decision, "_microbatcher", batcher):
+            self.assertEqual(decision.predict_fake("stuck"), {"error": "Prediction timed out after 0.05s"})
+
+    def test_worker_restarts_after_fork(self):
+        batcher = MicroBatcher(lambda items: items, max_batch=1)
+        self.assertEqual(batcher("a"), "a")
+        parent_thread = batcher._thread
+        with mock.patch("api.batching.os.getpid", return_value=-1):
+            self.assertEqual(batcher("b"), "b")
+        self.assertIsNot(batcher._thread, parent_thread)
+        self.assertTrue(batcher._thread.is_alive())
+
+
+class WordTokenizer:
+    """
+    One token per word; records the keyword arguments of each call.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, truncation=False, max_length=None, **kwargs):
+        self.calls.append({"truncation": truncation, "max_length": max_length, **kwargs})
+        ids = [list(range(len(t.split()))) for t in texts]
+        if truncation:
+            ids = [i[:max_length] for i in ids]
+        return {"input_ids": ids}
+
+
+class WordCountEmbedder:
+    """
+    Embeds a text as (word count, first letter); records each batch.
+    """
+
+    def __init__(self):
+        self.tokenizer = WordTokenizer()
+        self.batches = []
+
+    def get_max_seq_length(self):
+        return 10
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        return np.array([[len(t.split()), ord(t[0]) if t else 0] for t in texts], dtype=np.float32)
+
+
+class BucketingTests(SimpleTestCase):
+    def test_plan_batches_sorts_by_length_within_budget(self):
+        lengths = [50, 5, 40, 6, 7, 45]
+        batches = plan_batches(lengths, token_budget=100, max_batch=8)
+        self.assertEqual(batches, [[1, 3, 4], [2, 5], [0]])
+        for batch in batches:
+            self.assertLessEqual(len(batch) * max(lengths[i] for i in batch), 100)
+        self.assertEqual(plan_batches([5] * 5, token_budget=1000, max_batch=2), [[0, 1], [2, 3], [4]])
+        # An item over the budget still gets a batch of its own
+        self.assertEqual(plan_batches([500, 1], token_budget=100, max_batch=8), [[1], [0]])
+
+    def test_embeddings_come_back_in_input_order(self):
+        embedder = WordCountEmbedder()
+        texts = ["a b c d e f g", "b", "c d e", "d d", "e e e e e e"]
+        out = encode_bucketed(embedder, texts, token_budget=20, max_batch=8)
+        np.testing.assert_array_equal(out, WordCountEmbedder().encode(texts))
+        self.assertGreater(len(embedder.batches), 1)
+        self.assertEqual(embedder.tokenizer.calls[0]["truncation"], True)
+        self.assertEqual(embedder.tokenizer.calls[0]["max_length"], 8)
+
+    def test_single_text_skips_bucketing_under_head(self):
+        embedder = WordCountEmbedder()
+        with mock.patch.object(decision, "LENGTH_BUCKETING", True), \
+                mock.patch.object(decision, "LONG_TEXT_POLICY", "head"):
+            decision._encode_uncached(embedder, ["one lone text"], batch_size=8)
+            self.assertEqual(embedder.tokenizer.calls, [])
+            decision._encode_uncached(embedder, ["two", "texts"], batch_size=8)
+            self.assertEqual(len(embedder.tokenizer.calls), 1)
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def test_concurrent_first_gets_load_once(self):
+        import threading
+        import time
+
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        registry = ModelRegistry()
+        registry.register("model", load)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("model"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(map(id, results))), 1)
+        self.assertTrue(registry.is_ready())
+
+    def test_failure_is_retried_after_backoff(self):
+        calls = []
+
+        def load():
+            calls.append(1)
+            if len(calls) == 1:
+                raise FileNotFoundError("no weights")
+            return "model"
+
+        registry = ModelRegistry(retry_seconds=30)
+        registry.register("model", load)
+        with mock.patch("api.registry.time.monotonic", return_value=1000.0):
+            self.assertIsNone(registry.get("model"))
+            self.assertIsNone(registry.get("model"))
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(registry.is_loaded())
+        self.assertFalse(registry.is_ready())
+        self.assertEqual(registry.status()["model"]["error"], "no weights")
+
+        with mock.patch("api.registry.time.monotonic", return_value=1031.0):
+            self.assertEqual(registry.get("model"), "model")
+        self.assertTrue(registry.is_ready())
+        self.assertIsNone(registry.status()["model"]["error"])
+
+    def test_optional_failure_keeps_ready(self):
+        def broken():
+            raise OSError("disk full")
+
+        registry = ModelRegistry()
+        registry.register("model", lambda: "model")
+        registry.register("cache", broken, required=False)
+        registry.warmup()
+        self.assertTrue(registry.is_ready())
+        self.assertEqual(registry.status()["cache"], {
+            "loaded": False, "load_seconds": mock.ANY, "error": "disk full", "required": False,
+        })
+
+        registry.reset()
+        self.assertIsNone(registry.peek("model"))
+
+
+class DocumentWindowTests(SimpleTestCase):
+    def test_windows_overlap_and_cover_the_tail(self):
+        text = " ".join(f"w{i}" for i in range(11))
+        windows = list(iter_windows(text, window=4, stride=3))
+        self.assertEqual([(s, e) for s, e, _ in windows], [(0, 4), (3, 7), (6, 10), (9, 11)])
+        self.assertEqual(windows[1][2], "w3 w4 w5 w6")
+        self.assertEqual(windows[-1][2], "w9 w10")
+        self.assertEqual(len(list(iter_windows(text, window=4, stride=3, max_chunks=2))), 2)
+        self.assertEqual(list(iter_windows("one two", window=4, stride=3)), [(0, 2, "one two")])
+        self.assertEqual(list(iter_windows("   ")), [])
+
+    def test_aggregations_on_known_vectors(self):
+        probs = np.array([[0.6, 0.4], [0.1, 0.9], [0.7, 0.3]])
+
+        def aggregate(aggregation):
+            agg = StreamingAggregator(2, positive=1, aggregation=aggregation)
+            # Fed in two updates, as the document endpoint streams groups
+            agg.update(probs[:2])
+            agg.update(probs[2:])
+            return agg.result()
+
+        np.testing.assert_allclose(aggregate("mean"), probs.mean(axis=0))
+        np.testing.assert_allclose(aggregate("max"), [0.1, 0.9])
+        weights = np.exp((probs.max(axis=1) - 0.5) / 0.1)
+        np.testing.assert_allclose(aggregate("attention"), weights @ probs / weights.sum())
+        with self.assertRaises(ValueError):
+            StreamingAggregator(2, positive=1, aggregation="median")
+
+
+class EmbeddingStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return StubEmbedder(dimension=8).encode(texts)
+
+    def test_append_reopen_and_lookup(self):
+        store = EmbeddingStore(self.root, "org/model")
+        first = np.array(store.get(["a b", "c d", "a  b"], self.embed))
+        self.assertEqual(self.embedded, ["a b", "c d"])
+        np.testing.assert_array_equal(first[0], first[2])
+
+        reopened = EmbeddingStore(self.root, "org/model")
+        self.assertEqual(reopened.rows, 2)
+        self.assertEqual(reopened.lookup(["c d", "new", "a b"]).tolist(), [1, -1, 0])
+        both = reopened.get(["c d", "new"], self.embed)
+        self.assertEqual(self.embedded[2:], ["new"])
+        np.testing.assert_array_equal(both[0], first[1])
+        self.assertEqual(EmbeddingStore(self.root, "org/model").rows, 3)
+
+    def test_missing_or_truncated_vectors_are_re_embedded(self):
+        store = EmbeddingStore(self.root, "m")
+        store.get(["one", "two", "three"], self.embed)
+        vectors = store.directory / "vectors.bin"
+
+        with open(vectors, "r+b") as f:
+            f.truncate(8 * 4 + 5)
+        store = EmbeddingStore(self.root, "m")
+        self.assertEqual(store.rows, 1)
+        store.get(["one", "two", "three"], self.embed)
+        self.assertEqual(self.embedded[3:], ["two", "three"])
+        self.assertEqual(EmbeddingStore(self.root, "m").lookup(["three"]).tolist(), [2])
+
+        vectors.unlink()
+        store = EmbeddingStore(self.root, "m")
+        self.assertEqual(store.rows, 0)
+        out = store.get(["one", "two"], self.embed)
+        np.testing.assert_array_equal(out, StubEmbedder(dimension=8).encode(["one", "two"]))
+
+
+class SelectCandidateTests(SimpleTestCase):
+    results = [
+        {"name": "big_forest", "f1_macro": 0.93, "latency_ms": 12.0},
+        {"name": "small_forest", "f1_macro": 0.90, "latency_ms": 3.0},
+        {"name": "linear", "f1_macro": 0.90, "latency_ms": 0.2},
+        {"name": "hgb", "f1_macro": 0.85, "latency_ms": 1.5},
+    ]
+
+    def test_best_f1_within_budget_ties_to_faster(self):
+        self.assertEqual(select_candidate(self.results, 20)["name"], "big_forest")
+        self.assertEqual(select_candidate(self.results, 5)["name"], "linear")
+        self.assertEqual(select_candidate(self.results, 1.5)["name"], "linear")
+
+    def test_fastest_when_nothing_meets_budget(self):
+        self.assertEqual(select_candidate(self.results, 0.1)["name"], "linear")
+
+
+class EvaluateCandidateTests(SimpleTestCase):
+    def test_worker_is_single_threaded_and_latency_uses_full_refit(self):
+        import os
+        from threadpoolctl import threadpool_info
+        from api import tuning
+
+        X, y = make_classification(n_samples=60, n_features=6, random_state=0)
+        worker_state = mock.patch.multiple(tuning, _X=None, _y=None, _thread_limits=None)
+        worker_state.start()
+        self.addCleanup(worker_state.stop)
+        with mock.patch.dict(os.environ):
+            tuning._init_worker(X.astype(np.float32), y)
+            self.addCleanup(tuning._thread_limits.restore_original_limits)
+            self.assertEqual(os.environ["OMP_NUM_THREADS"], "1")
+            self.assertTrue(all(pool["num_threads"] == 1 for pool in threadpool_info()))
+
+        fitted_rows, timed = [], []
+        build_model = tuning.build_model
+
+        def recording_build(kind, params):
+            model = build_model(kind, params)
+            fit = model.fit
+            model.fit = lambda X_fit, y_fit: (fitted_rows.append(len(X_fit)), fit(X_fit, y_fit))[1]
+            return model
+
+        with mock.patch.object(tuning, "build_model", recording_build), \
+                mock.patch.object(tuning, "single_item_latency_ms", lambda model, x: timed.append(model) or 0.1):
+            result = tuning.evaluate_candidate("logistic_regression", {"C": 1.0}, folds=3)
+        self.assertEqual(fitted_rows, [40, 40, 40, 60])
+        self.assertEqual(len(timed), 1)
+        self.assertEqual(result["latency_ms"], 0.1)
+
+
+class BoundedExecutorTests(SimpleTestCase):
+    def test_rejects_beyond_workers_plus_queue(self):
+        import threading
+
+        gate = threading.Event()
+        executor = BoundedExecutor(max_workers=1, max_queue=1)
+        futures = [executor.submit(gate.wait) for _ in range(2)]
+        with self.assertRaises(QueueFull):
+            executor.submit(gate.wait)
+        gate.set()
+        for f in futures:
+            f.result(timeout=5)
+        executor.submit(lambda: None).result(timeout=5)
+        self.assertEqual(executor.stats()["rejected"], 1)
+
+
+class CorpusStatsTests(SimpleTestCase):
+    def test_artifact_matches_counter_and_supports_append(self):
+        first = (["army moves to the border today", "fake video of the army", "short"], ["FAKE", "fake", "FAKE"])
+        second = (["border talks resume, army waits", "minister denies the report"], ["REAL", "FAKE"])
+        label_counts, term_counts = accumulate([first, second])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            save_corpus_stats(f"{tmp}/full", label_counts, term_counts)
+            stats = CorpusStats.load(f"{tmp}/full")
+            self.assertEqual(stats.label_counts(), {"normal": 1, "flagged": 3})
+            self.assertEqual(stats.top_terms("flagged", 3), term_counts["flagged"].most_common(3))
+
+            partial = accumulate([first])
+            save_corpus_stats(f"{tmp}/inc", *partial)
+            previous = CorpusStats.load(f"{tmp}/inc")
+            from collections import Counter
+
+            appended = accumulate([second], Counter(previous.label_counts()), previous.term_counters())
+            save_corpus_stats(f"{tmp}/inc", *appended)
+            incremental = CorpusStats.load(f"{tmp}/inc")
+            for label in ("flagged", "normal"):
+                self.assertEqual(incremental.top_terms(label, 100), stats.top_terms(label, 100))
+
+    def test_missing_artifact_is_logged_once_and_picked_up_when_built(self):
+        from api import corpus_stats
+
+        label_counts, term_counts = accumulate([(["army moves to the border today"], ["FAKE"])])
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(corpus_stats, "CORPUS_STATS_DIR", Path(tmp) / "stats"), \
+                mock.patch.object(corpus_stats, "_stats", None), \
+                mock.patch.object(corpus_stats, "_missing_checked_at", None), \
+                mock.patch.object(corpus_stats, "_missing_logged", False), \
+                mock.patch("api.corpus_stats.time.monotonic", return_value=1000.0) as now:
+            with self.assertLogs("api.corpus_stats", "WARNING") as logs:
+                self.assertIsNone(corpus_stats.get_corpus_stats())
+                self.assertIsNone(corpus_stats.get_corpus_stats())
+                now.return_value = 1031.0
+                self.assertIsNone(corpus_stats.get_corpus_stats())
+            self.assertEqual(len(logs.output), 1)
+
+            save_corpus_stats(Path(tmp) / "stats", label_counts, term_counts)
+            self.assertIsNone(corpus_stats.get_corpus_stats())  # miss still cached
+            now.return_value = 1062.0
+            self.assertEqual(corpus_stats.get_corpus_stats().label_counts(), {"normal": 0, "flagged": 1})
+
+
+class StartupImportTests(SimpleTestCase):
+    def test_decision_import_defers_inference_packages(self):
+        code = (
+            "import sys, api.decision; "
+            "print(','.join(m for m in ('numpy', 'sklearn', 'joblib', 'torch', 'pandas') if m in sys.modules))"
+        )
+        backend_dir = Path(__file__).resolve().parents[1]
+        out = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "")
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     api.utils.stopwords\n"
+            "import time:      1500 |       1620 |   api.utils.preprocess\n"
+        )
+        self.assertEqual(parse_importtime(stderr), [
+            ("api.utils.stopwords", 120, 120, 2),
+            ("api.utils.preprocess", 1500, 1620, 1),
+        ])
+
+
+class StubModelsMixin:
+    """
+    Serve the committed forest with the stub embedder.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.object(decision, "EMBED_BACKEND", "stub")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        decision.registry.reset()
+        self.addCleanup(decision.registry.reset)
+
+    def post(self, path, data, **extra):
+        return self.client.post(path, data, content_type="application/json", **extra)
+
+
+class OnnxEmbedderTests(SimpleTestCase):
+    """
+    The ONNX backends on a hand-built graph: token embeddings are an
+    embedding lookup followed by a projection, so the expected sentence
+    vectors can be computed with numpy.
+    """
+
+    words = ["[PAD]", "[UNK]", "border", "talks", "resume", "in", "delhi", "rain"]
+
+    def setUp(self):
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+        from tokenizers import Tokenizer, models, pre_tokenizers
+        from transformers import PreTrainedTokenizerFast
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.directory = onnx_dir_for("tiny/model", self.root)
+        self.directory.mkdir(parents=True)
+
+        tokenizer = Tokenizer(models.WordLevel({w: i for i, w in enumerate(self.words)}, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+        PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token="[UNK]", pad_token="[PAD]") \
+            .save_pretrained(str(self.directory))
+
+        rng = np.random.default_rng(0)
+        self.table = rng.standard_normal((len(self.words), 32)).astype(np.float32)
+        self.projection = rng.standard_normal((32, 8)).astype(np.float32)
+        graph = helper.make_graph(
+            [helper.make_node("Gather", ["table", "input_ids"], ["tokens"]),
+             helper.make_node("MatMul", ["tokens", "projection"], ["last_hidden_state"])],
+            "tiny",
+            [helper.make_tensor_value_info(name, TensorProto.INT64, ["batch", "sequence"])
+             for name in ("input_ids", "attention_mask")],
+            [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", 8])],
+            [numpy_helper.from_array(self.table, "table"), numpy_helper.from_array(self.projection, "projection")],
+        )
+        model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 14)])
+        model.ir_version = 8
+        onnx.save(model, str(self.directory / "model.onnx"))
+        quantize_onnx(self.directory)
+
+    def write_meta(self, normalize: bool):
+        (self.directory / "meta.json").write_text(json.dumps({
+            "model_name": "tiny/model", "max_seq_length": 16, "dimension": 8,
+            "pooling": "mean", "normalize": normalize,
+        }))
+
+    def reference(self, texts, normalize: bool):
+        rows = []
+        for text in texts:
+            ids = [self.words.index(w) if w in self.words else 1 for w in text.split()]
+            row = (self.table[ids] @ self.projection).mean(axis=0)
+            rows.append(row / np.linalg.norm(row) if normalize else row)
+        return np.array(rows)
+
+    def test_mean_pooling_ignores_padding(self):
+        # Different lengths in one batch, so the short text is padded
+        texts = ["border talks resume in delhi", "rain", "talks unknownword"]
+        for normalize in (False, True):
+            self.write_meta(normalize)
+            embedder = load_embedder("tiny/model", "onnx", self.root)
+            out = embedder.encode(texts, batch_size=8)
+            self.assertEqual(out.shape, (3, 8))
+            np.testing.assert_allclose(out, self.reference(texts, normalize), rtol=1e-5, atol=1e-5)
+            np.testing.assert_allclose(embedder.encode(texts[1:2]), out[1:2], rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(np.linalg.norm(out, axis=1), 1.0, rtol=1e-5)
+
+    def test_int8_stays_close_to_float(self):
+        self.write_meta(True)
+        texts = ["border talks resume in delhi", "rain in delhi"]
+        embedder = load_embedder("tiny/model", "onnx-int8", self.root)
+        self.assertTrue(embedder.quantized)
+        out = embedder.encode(texts)
+        cosine = (out * self.reference(texts, True)).sum(axis=1)
+        self.assertTrue(np.all(cosine > 0.99), cosine)
+
+
+class AnalyzeApiTests(StubModelsMixin, SimpleTestCase):
+    """
+    The analyze endpoints end to end, on the stub embedder and the
+    committed forest.
+    """
+
+    # ProfilingMiddleware reads its admin switch
+    databases = {"default"}
+
+    def test_analyze(self):
+        text = "Breaking: @newsdesk reports the border talks resumed https://t.co/abc"
+        first = self.post("/api/analyze/", {"text": text})
+        self.assertEqual(first.status_code, 200)
+        body = first.json()
+        self.assertIn(body["label"], ("real", "fake"))
+        self.assertAlmostEqual(sum(body["probabilities"].values()), 100, delta=0.05)
+        self.assertIn("border", body["wordcloud"]["words"])
+        self.assertEqual(self.post("/api/analyze/", {"text": text}).json(), body)
+
+        lean = self.post("/api/analyze/?wordcloud=0", {"text": text}).json()
+        self.assertNotIn("wordcloud", lean)
+        self.assertEqual(lean["probabilities"], body["probabilities"])
+        self.assertEqual(self.post("/api/analyze/", {"text": ""}).status_code, 400)
+
+    def test_ready_after_warmup(self):
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()["ready"])
+        decision.warmup()
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(m["loaded"] for m in response.json()["models"].values()))
+
+    def test_document_endpoint(self):
+        text = " ".join(make_workload(8, "short", seed=3))
+        n_words = len(text.split())
+        response = self.post("/api/analyze/document/", {"text": text, "aggregation": "attention",
+                                                         "window": 20, "stride": 10})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["aggregation"], "attention")
+        self.assertIn(body["label"], ("real", "fake"))
+        self.assertEqual(body["n_chunks"], len(body["chunks"]))
+        self.assertFalse(body["truncated"])
+        self.assertEqual([c["index"] for c in body["chunks"]], list(range(body["n_chunks"])))
+        self.assertEqual(body["chunks"][1]["start_word"], 10)
+        self.assertEqual(body["chunks"][-1]["end_word"], n_words)
+        self.assertEqual(set(body["chunks"][0]), {"index", "start_word", "end_word", "label", "probability",
+                                                  "probabilities"})
+        self.assertEqual(self.post("/api/analyze/document/", {"text": text, "aggregation": "median"}).status_code,
+                         400)
+        for options in ({"window": 0}, {"stride": -3}, {"window": decision.DOC_MAX_WINDOW_WORDS + 1},
+                        {"stride": "x"}):
+            self.assertEqual(self.post("/api/analyze/document/", {"text": text, **options}).status_code, 400)
+        for empty in ("!!! ???", "@someone https://t.co/abc #tag"):
+            response = self.post("/api/analyze/document/", {"text": empty})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], "text has no words to analyze")
+
+    def test_async_model_unavailable_has_no_retry_after(self):
+        response = self.post("/api/analyze/async/", {"text": "Border talks resume"})
+        self.assertEqual(response.status_code, 200)
+        with mock.patch.object(decision, "EMBED_BACKEND", "nope"):
+            decision.registry.reset()
+            response = self.post("/api/analyze/async/", {"text": "Border talks resume"})
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn("Retry-After", response)
+
+    def test_batch_matches_single_and_keeps_order(self):
+        texts = make_workload(6, "mixed", dup_rate=0.3, seed=7)
+        results = self.post("/api/analyze/batch/", {"texts": [texts[0], "", *texts[1:]]}).json()["results"]
+        self.assertIn("error", results[1])
+        for text, result in zip(texts, results[:1] + results[2:]):
+            single = self.post("/api/analyze/", {"text": text, "wordcloud": False}).json()
+            self.assertEqual(result["probabilities"], single["probabilities"])
+
+    def test_stub_embedder_is_deterministic(self):
+        texts = make_workload(4, "short", seed=1)
+        a, b = StubEmbedder().encode(texts), StubEmbedder().encode(list(reversed(texts)))[::-1]
+        self.assertEqual(a.shape, (4, 384))
+        np.testing.assert_array_equal(a, b)
+        np.testing.assert_allclose(np.linalg.norm(a, axis=1), 1.0, rtol=1e-5)
+
+    def test_metrics_endpoint(self):
+        before = REQUESTS.value("api/analyze/", "POST", "200")
+        invalid = PREDICTION_ERRORS.value("invalid_input")
+        self.post("/api/analyze/", {"text": "Minister denies the viral report"})
+        self.post("/api/analyze/batch/", {"texts": ["one more text", ""]})
+        self.assertEqual(REQUESTS.value("api/analyze/", "POST", "200"), before + 1)
+        self.assertEqual(PREDICTION_ERRORS.value("invalid_input"), invalid + 1)
+
+        response = self.client.get("/api/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        for stage in ("normalize", "embed", "classify", "wordcloud"):
+            self.assertIn(f'decision_stage_seconds_count{{stage="{stage}"}}', body)
+        self.assertIn('decision_model_loaded{model="rf_model"} 1', body)
+        self.assertIn('decision_embed_cache_lookups_total{result="miss"}', body)
+
+
+class ScoreCorpusTests(StubModelsMixin, SimpleTestCase):
+    """
+    ``score_corpus`` in-process (``--workers 0``) on a small CSV.
+    """
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.source = self.dir / "corpus.csv"
+        self.out = self.dir / "scored"
+        # The first chunk holds only empty texts, so all its labels are null
+        texts = ["", "", "Border talks resume", "Minister denies viral report", "Rain expected in Delhi"]
+        pd.DataFrame({"text": texts}).to_csv(self.source, index=False)
+
+    def score(self, *args):
+        out = io.StringIO()
+        call_command("score_corpus", str(self.source), str(self.out), "--workers", "0", "--chunk-size", "2",
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def test_iter_chunks(self):
+        chunks = list(iter_chunks(self.source, 2, "text", "label"))
+        self.assertEqual([len(texts) for texts, _ in chunks], [2, 2, 1])
+        self.assertEqual(chunks[1][0], ["Border talks resume", "Minister denies viral report"])
+        self.assertIsNone(chunks[0][1])
+
+    def test_parts_read_back_as_one_table(self):
+        self.score()
+        parts = sorted(p.name for p in self.out.glob("part-*.parquet"))
+        self.assertEqual(parts, ["part-000000.parquet", "part-000001.parquet", "part-000002.parquet"])
+        self.assertEqual(list(self.out.glob("*.tmp")), [])
+
+        frame = pd.read_parquet(self.out).sort_values("row")
+        self.assertEqual(frame["row"].tolist(), [0, 1, 2, 3, 4])
+        self.assertTrue(frame["label"].iloc[:2].isna().all())
+        self.assertTrue(frame["error"].iloc[2:].isna().all())
+        self.assertEqual(pq.read_schema(self.out / parts[0]), pq.read_schema(self.out / parts[1]))
+
+    def test_resume_scores_only_missing_chunks(self):
+        self.score()
+        checkpoint = self.out / "_checkpoint.json"
+        state = json.loads(checkpoint.read_text())
+        self.assertEqual(state["completed"], [0, 1, 2])
+        self.assertEqual(state["rows"], 5)
+
+        state["completed"], state["rows"] = [0, 2], 3
+        checkpoint.write_text(json.dumps(state))
+        (self.out / "part-000001.parquet").unlink()
+        output = self.score()
+        self.assertIn("Resuming: 2 chunks", output)
+        self.assertIn("chunk 1: 2 rows", output)
+        self.assertNotIn("chunk 0:", output)
+        self.assertEqual(json.loads(checkpoint.read_text())["completed"], [0, 1, 2])
+        self.assertEqual(len(pd.read_parquet(self.out)), 5)
+
+    def test_unavailable_model_stops_without_checkpointing(self):
+        with mock.patch.object(decision, "EMBED_BACKEND", "nope"):
+            decision.registry.reset()
+            with self.assertRaisesMessage(CommandError, "Models unavailable"):
+                self.score()
+        self.assertEqual(list(self.out.glob("part-*.parquet")), [])
+        self.assertFalse((self.out / "_checkpoint.json").exists())
+
+
+class BatchPredictionTests(StubModelsMixin, SimpleTestCase):
+    """
+    ``predict_fake_batch`` error handling and the input validation shared by
+    every analyze path.
+    """
+
+    # ProfilingMiddleware reads its admin switch
+    databases = {"default"}
+
+    good = ["Border talks resume in Delhi", "Minister denies the viral report", "Rain expected this week"]
+
+    def single(self, text):
+        return decision.predict_fake_batch([text])[0]
+
+    def test_mixed_items_keep_their_positions(self):
+        texts = [self.good[0], 123, "", "   ", ["a", "b"], None, self.good[1]]
+        results = decision.predict_fake_batch(texts, batch_size=2)
+        self.assertEqual(len(results), len(texts))
+        for result in results[1:6]:
+            self.assertEqual(result, {"error": "text must be a non-empty string"})
+        self.assertEqual(results[0], self.single(self.good[0]))
+        self.assertEqual(results[6], self.single(self.good[1]))
+
+    def test_failed_minibatch_is_retried_item_by_item(self):
+        encode = decision.encode_texts
+
+        def failing_encode(texts, **kwargs):
+            if "poison" in texts:
+                raise RuntimeError("tokenizer crashed")
+            return encode(texts, **kwargs)
+
+        texts = [self.good[0], "poison", self.good[1], self.good[2]]
+        expected = [self.single(t) for t in self.good]
+        with mock.patch.object(decision, "encode_texts", side_effect=failing_encode) as patched:
+            results = decision.predict_fake_batch(texts, batch_size=2)
+        self.assertEqual(results[1], {"error": "An error occurred during prediction: tokenizer crashed"})
+        self.assertEqual([results[0], results[2], results[3]], expected)
+        # Two minibatches, then both rows of the failing one alone
+        self.assertEqual(patched.call_count, 4)
+
+    def test_classifier_failure_marks_every_valid_row(self):
+        with mock.patch.object(decision, "classify_embeddings", side_effect=ValueError("bad shape")):
+            results = decision.predict_fake_batch([self.good[0], "", self.good[1]])
+        self.assertEqual(results[1], {"error": "text must be a non-empty string"})
+        for i in (0, 2):
+            self.assertEqual(results[i], {"error": "An error occurred during prediction: bad shape"})
+
+    def test_validation_does_not_depend_on_microbatching(self):
+        invalid = [123, ["a", "b"], "  ", None]
+        batcher = MicroBatcher(decision._score_microbatch, max_batch=8, max_latency_ms=1)
+        for microbatcher in (None, batcher):
+            with mock.patch.object(decision, "_microbatcher", microbatcher):
+                for text in invalid:
+                    self.assertEqual(decision.predict_fake(text), {"error": "text must be a non-empty string"})
+                    for path in ("/api/analyze/", "/api/analyze/async/", "/api/analyze/document/"):
+                        self.assertEqual(self.post(path, {"text": text}).status_code, 400, (path, text))
+                self.assertIn("label", decision.predict_fake(self.good[0]))
+        batch = self.post("/api/analyze/batch/", {"texts": invalid}).json()["results"]
+        self.assertTrue(all("error" in r for r in batch))
+
+
+class HistogramTests(SimpleTestCase):
+    def test_cumulative_buckets(self):
+        h = Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            h.observe(value, "a")
+        snap = h.snapshot("a")
+        self.assertEqual(snap["buckets"], {0.1: 2, 1.0: 3, float("inf"): 4})
+        self.assertEqual(snap["count"], 4)
+        self.assertAlmostEqual(snap["sum"], 3.65)
+        lines = [f"{k} {v}" for k, v in h.samples()]
+        self.assertIn('test_seconds_bucket{stage="a",le="+Inf"} 4', lines)
+
+
+class ProfilingTests(StubModelsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        # Pin the knobs read from the environment at import time, so the
+        # tests behave the same under any DECISION_PROFILE_* or
+        # DECISION_MICROBATCH setting
+        for target, name, value in ((profiling, "PROFILE_DIR", self.dir), (profiling, "TOKEN", "s3cret"),
+                                    (profiling, "FLUSH_EVERY", 2), (profiling, "SAMPLE_RATE", 0.0),
+                                    (decision, "_microbatcher", None)):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        middleware._switch["expires"] = 0.0
+        self.addCleanup(middleware._switch.update, expires=0.0)
+
+    def test_header_needs_the_token(self):
+        response = self.post("/api/analyze/", {"text": "Border talks resume"}, HTTP_X_PROFILE="s3cret")
+        self.assertTrue((self.dir / response["X-Profile-File"]).exists())
+        response = self.post("/api/analyze/", {"text": "Border talks resume"}, HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-File", response)
+        self.assertEqual(len(list(self.dir.glob("*.prof"))), 1)
+
+    @override_settings(DEBUG=True)
+    def test_header_ignored_without_a_token(self):
+        with mock.patch.object(profiling, "TOKEN", ""):
+            response = self.post("/api/analyze/", {"text": "Border talks resume"}, HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-File", response)
+        self.assertEqual(list(self.dir.glob("*.prof")), [])
+
+    def test_microbatched_request_is_profiled_inline(self):
+        batcher = MicroBatcher(decision._score_microbatch, max_batch=8, max_latency_ms=1)
+        with mock.patch.object(decision, "_microbatcher", batcher):
+            response = self.post("/api/analyze/", {"text": "Border talks resume"}, HTTP_X_PROFILE="s3cret")
+            self.assertEqual(response.status_code, 200)
+            # Unprofiled requests still go through the batcher
+            self.post("/api/analyze/", {"text": "Rain expected in Delhi"})
+        stats, _ = profiling.merge_profiles([self.dir / response["X-Profile-File"]])
+        self.assertGreater(profiling.area_seconds(stats).get("forest", 0), 0)
+        self.assertEqual(batcher.stats()["items"], 1)
+
+    def test_admin_switch_and_report(self):
+        self.post("/api/analyze/", {"text": "not profiled"})
+        self.assertEqual(list(self.dir.glob("*.prof")), [])
+
+        ProfilingSwitch.objects.create(enabled=True, sample_rate=1.0)
+        middleware._switch["expires"] = 0.0
+        for text in ("first sampled text", "second sampled text"):
+            self.post("/api/analyze/", {"text": text})
+        files = list(self.dir.glob("*-n2.prof"))
+        self.assertEqual(len(files), 1)
+
+        out = io.StringIO()
+        call_command("profile_report", "--dir", str(self.dir), "--top", "3", stdout=out)
+        self.assertIn("1 files, 2 requests", out.getvalue())
+        self.assertIn("api/forest.py", out.getvalue())
+
+    def test_rotation_keeps_newest(self):
+        import cProfile
+
+        store = profiling.ProfileStore(self.dir, keep=2)
+        for _ in range(3):
+            profile = cProfile.Profile()
+            profile.enable()
+            sum(range(100))
+            profile.disable()
+            store.write(profile)
+        self.assertEqual(len(list(self.dir.glob("*.prof"))), 2)
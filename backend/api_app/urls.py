@@ -1,6 +1,16 @@
 from django.urls import path
-from .views import analyze_view
+from .views import (
+    analyze_view, analyze_async_view, analyze_batch_view, analyze_document_view, metrics_view, ready_view,
+    stats_view, wordcloud_view,
+)
 
 urlpatterns = [
     path("analyze/", analyze_view),
+    path("analyze/async/", analyze_async_view),
+    path("analyze/batch/", analyze_batch_view),
+    path("analyze/document/", analyze_document_view),
+    path("metrics/", metrics_view),
+    path("ready/", ready_view),
+    path("stats/", stats_view),
+    path("wordcloud/", wordcloud_view),
 ]
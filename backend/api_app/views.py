@@ -1,80 +1,251 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from collections import Counter
-import pandas as pd
-import re
-from pathlib import Path
+from django.http import HttpResponse, JsonResponse
+import asyncio
+import json
+
+from api.metrics import STAGE_SECONDS
+from api.term_stats import WORDCLOUD_TOP_K, wordcloud
+from api.utils.preprocess import INVALID_TEXT, is_valid_text, normalize
 
 # -------------------------
-# Path and data setup
+# Limits
 # -------------------------
-BASE_DIR = Path(__file__).resolve().parents[2]
-DATA_DIR = BASE_DIR / "data"
-news_path = DATA_DIR / "indian_news_500.csv"
-
-# Load and clean data once when the server starts
-try:
-    df = pd.read_csv(news_path)
-    df["label"] = df["label"].map({"FAKE": 1, "REAL": 0, "fake": 1, "real": 0, 1: 1, 0: 0})
-    df = df.dropna(subset=["text", "label"])
-    df = df[df["text"].str.len() > 10]
-    df = df[df["label"].isin([0, 1])]
+# Upper bound on the number of texts accepted by the batch endpoint
+ANALYZE_BATCH_MAX_ITEMS = 256
 
-except FileNotFoundError:
-    df = pd.DataFrame(columns=["text", "label"])
-    print(f"Error: File not found at {news_path}. Stats and word cloud will be empty.")
+# Corpus statistics come from the artifact built by
+# `python manage.py build_corpus_stats` (see api/corpus_stats.py), so no
+# dataset is read when a worker starts.
 
 
-# -------------------------
-# Helper function for text cleaning
-# -------------------------
-def clean_text(text):
-    text = str(text).lower()
-    text = re.sub(r"http\S+|@\w+|#\w+", "", text)  # remove URLs, mentions, hashtags
-    text = re.sub(r"[^\w\s]", "", text)  # remove punctuation
-    text = re.sub(r"\d+", "", text)      # remove numbers
-    text = re.sub(r"\s+", " ", text)     # remove extra spaces
-    return text.strip()
+def _flag(value) -> bool:
+    """
+    Read a boolean request option sent as JSON, form or query string.
+    """
+    if isinstance(value, str):
+        return value.strip().lower() not in ("0", "false", "no", "off", "")
+    return bool(value)
 
 
 # -------------------------
 # API Endpoints
 # -------------------------
+def analyze_payload(text, include_wordcloud: bool = True) -> dict:
+    """
+    Prediction for one text plus its word cloud, as returned by the analyze
+    endpoints, or ``{"error": ...}`` when the models are unavailable.
+    """
+    from api.decision import predict_fake
+
+    result = predict_fake(text)
+    if "error" in result:
+        return result
+
+    response_data = {
+        "label": result["label"],
+        "probability": result["probability"],
+        "probabilities": result["probabilities"],
+    }
+    if include_wordcloud:
+        with STAGE_SECONDS.time("wordcloud"):
+            response_data["wordcloud"] = wordcloud(text)
+    return response_data
+
+
 @api_view(["POST"])
 def analyze_view(request):
     """
     Analyzes a given text using the trained model and generates a word cloud
-    for the text being analyzed.
+    for the text being analyzed. Clients that only need the label can send
+    "wordcloud": false (or ?wordcloud=0) to skip it.
     """
     text = request.data.get("text", "")
-    if not text:
-        return Response({"error": "text is required"}, status=400)
-    
-    # You need to ensure the `predict_fake` function is imported and works correctly
-    # with your `sentence_transformers` and `RandomForestClassifier` models.
+    if not is_valid_text(text):
+        return Response({"error": INVALID_TEXT}, status=400)
+
+    try:
+        include_wordcloud = _flag(request.data.get("wordcloud", request.query_params.get("wordcloud", True)))
+        result = analyze_payload(text, include_wordcloud)
+    except ImportError:
+        return Response({"error": "Prediction model not found. Check decision.py."}, status=500)
+
+    if "error" in result:
+        return Response(result, status=503)
+    return Response(result)
+
+
+async def analyze_async_view(request):
+    """
+    Same request and response as /api/analyze/, for ASGI servers. Inference
+    runs on a bounded thread pool, so the event loop keeps accepting
+    connections while compute stays at a fixed concurrency. When the pool
+    and its queue are full the request is turned away with 429 and a
+    Retry-After header instead of waiting.
+    """
+    from api import decision
+    from api.executor import QueueFull
+
+    if request.method != "POST":
+        return JsonResponse({"error": "method not allowed"}, status=405)
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "request body must be JSON"}, status=400)
+    text = data.get("text", "") if isinstance(data, dict) else ""
+    if not is_valid_text(text):
+        return JsonResponse({"error": INVALID_TEXT}, status=400)
+    include_wordcloud = _flag(data.get("wordcloud", request.GET.get("wordcloud", True)))
+
+    try:
+        future = decision.inference_executor().submit(analyze_payload, text, include_wordcloud)
+    except QueueFull:
+        return _retry_later({"error": "server busy, retry later"}, status=429)
+    try:
+        result = await asyncio.wait_for(asyncio.wrap_future(future), decision.ASYNC_TIMEOUT)
+    except asyncio.TimeoutError:
+        return _retry_later({"error": "inference timed out"}, status=503)
+
+    # A missing model is not cured by retrying soon, so no Retry-After here
+    if "error" in result:
+        return JsonResponse(result, status=503)
+    return JsonResponse(result)
+
+
+# Plain Django view (DRF views cannot be async); the decorator form of
+# csrf_exempt does not preserve coroutine functions on Django 4.2
+analyze_async_view.csrf_exempt = True
+
+
+def _retry_later(data, status):
+    from api.decision import ASYNC_RETRY_AFTER
+
+    response = JsonResponse(data, status=status)
+    response["Retry-After"] = str(ASYNC_RETRY_AFTER)
+    return response
+
+
+@api_view(["POST"])
+def analyze_batch_view(request):
+    """
+    Analyzes a list of texts in one call. The texts are embedded and
+    classified together; each result carries its own label/probability or
+    error, in the same order as the input.
+    """
+    texts = request.data.get("texts")
+    if not isinstance(texts, list) or not texts:
+        return Response({"error": "texts must be a non-empty list"}, status=400)
+    if len(texts) > ANALYZE_BATCH_MAX_ITEMS:
+        return Response({"error": f"at most {ANALYZE_BATCH_MAX_ITEMS} texts per request"}, status=400)
+
     try:
-        from api.decision import predict_fake # Assumes decision.py is in the same directory
-        result = predict_fake(text)
-        
-        # New code to generate word cloud from the input text
-        stop_words = {"a", "the", "is", "in", "of", "and", "to", "for", "with", "that", "on", "it", "its", "had", "was", "has", "are", "by", "from"}
-        
-        cleaned_text = clean_text(text)
-        all_words = [word for word in cleaned_text.split() if word not in stop_words and len(word) > 2]
-        word_freqs = Counter(all_words).most_common(50)
-        
-        wordcloud_data = {
-            "words": {word: value for word, value in word_freqs}
-        }
-        
-        # Combine the prediction result and word cloud data into a single response
-        response_data = {
-            "label": result["label"],
-            "probability": result["probability"],
-            "wordcloud": wordcloud_data
-        }
-        
-        return Response(response_data)
-        
+        from api.decision import predict_fake_batch
     except ImportError:
         return Response({"error": "Prediction model not found. Check decision.py."}, status=500)
+
+    return Response({"results": predict_fake_batch(texts)})
+
+
+@api_view(["POST"])
+def analyze_document_view(request):
+    """
+    Analyzes a long article window by window. Optional fields: "aggregation"
+    ("mean", "max" or "attention"), "window" and "stride" (in words, from 1
+    to DECISION_DOC_MAX_WINDOW_WORDS).
+    """
+    from api.documents import AGGREGATIONS
+
+    try:
+        from api.decision import DOC_MAX_WINDOW_WORDS, predict_fake_document
+    except ImportError:
+        return Response({"error": "Prediction model not found. Check decision.py."}, status=500)
+
+    text = request.data.get("text", "")
+    if not is_valid_text(text):
+        return Response({"error": INVALID_TEXT}, status=400)
+    # Punctuation or links alone would be scored as empty windows
+    if not any(ch.isalnum() for ch in normalize(text, "embedding")):
+        return Response({"error": "text has no words to analyze"}, status=400)
+
+    options = {"aggregation": request.data.get("aggregation", "mean")}
+    if options["aggregation"] not in AGGREGATIONS:
+        return Response({"error": f"aggregation must be one of {', '.join(AGGREGATIONS)}"}, status=400)
+    try:
+        for key in ("window", "stride"):
+            if key in request.data:
+                options[key] = int(request.data[key])
+    except (TypeError, ValueError):
+        return Response({"error": "window and stride must be integers"}, status=400)
+    for key in ("window", "stride"):
+        if key in options and not 1 <= options[key] <= DOC_MAX_WINDOW_WORDS:
+            return Response({"error": f"{key} must be between 1 and {DOC_MAX_WINDOW_WORDS}"}, status=400)
+
+    result = predict_fake_document(text, **options)
+    if "error" in result:
+        return Response(result, status=503)
+    return Response(result)
+
+
+@api_view(["GET"])
+def stats_view(request):
+    """
+    Returns the count of flagged vs. normal content in the training corpus.
+    """
+    from api.corpus_stats import get_corpus_stats
+
+    stats = get_corpus_stats()
+    if stats is None:
+        return Response({"error": "Corpus statistics not built. Run manage.py build_corpus_stats."}, status=503)
+    return Response(stats.label_counts())
+
+
+@api_view(["GET"])
+def wordcloud_view(request):
+    """
+    Returns the most frequent terms in flagged content (or in the label
+    given by ?label=), read from the precomputed corpus statistics.
+    Optional ?k= sets the number of terms (default 50).
+    """
+    from api.corpus_stats import get_corpus_stats
+
+    stats = get_corpus_stats()
+    if stats is None:
+        return Response({"error": "Corpus statistics not built. Run manage.py build_corpus_stats."}, status=503)
+
+    label = request.query_params.get("label", "flagged")
+    if label not in stats.labels:
+        return Response({"error": f"label must be one of {', '.join(stats.labels)}"}, status=400)
+    try:
+        k = max(1, min(int(request.query_params.get("k", WORDCLOUD_TOP_K)), 1000))
+    except ValueError:
+        return Response({"error": "k must be an integer"}, status=400)
+    return Response({"words": dict(stats.top_terms(label, k))})
+
+
+def metrics_view(request):
+    """
+    Request, stage-latency, batch-size, error, cache and model-load metrics
+    of this worker in the Prometheus text format.
+    """
+    from api import decision  # noqa: F401  (registers its collector)
+    from api.metrics import registry
+
+    if request.method != "GET":
+        return JsonResponse({"error": "method not allowed"}, status=405)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@api_view(["GET"])
+def ready_view(request):
+    """
+    Readiness probe for the load balancer: 200 once the models are loaded in
+    this worker, 503 otherwise. A lazy worker starts loading in the
+    background on its first probe so it becomes ready without user traffic.
+    """
+    from api.decision import registry
+
+    if registry.is_ready():
+        return Response({"ready": True, "models": registry.status()})
+
+    registry.warmup(background=True)
+    return Response({"ready": False, "models": registry.status()}, status=503)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Load the ML models now if DECISION_LOAD_MODE asks for it (default: lazy)
+from api.decision import startup  # noqa: E402
+
+startup()
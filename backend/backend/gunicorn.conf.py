@@ -0,0 +1,48 @@
+"""
+Gunicorn config for the backend project.
+
+With ``preload_app`` the master imports ``backend.wsgi`` and loads the
+RandomForest and the SentenceTransformer once, before forking. Workers then
+share those pages copy-on-write instead of each holding a private copy.
+
+Run from the backend/ folder:
+
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:application
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+# Set GUNICORN_PRELOAD=0 to give every worker its own copy of the models
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+if preload_app:
+    # The models have to be in memory before fork() for the workers to share
+    # them. "background" would load on a thread, and threads do not survive
+    # fork(), so preloading always loads eagerly.
+    os.environ["DECISION_LOAD_MODE"] = "eager"
+
+
+def when_ready(server):
+    # Runs in the master after the app (and models) are loaded, before the
+    # first fork. Moving every object into the permanent generation stops the
+    # cyclic GC in the workers from writing to their headers, which would
+    # otherwise un-share the pages that hold them.
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Each worker gets an equal slice of the cores for torch's intra-op pool
+    # instead of every worker spawning one thread per core.
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // max(1, workers)))
@@ -43,6 +43,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the request timings cover the whole stack
+    'api_app.middleware.RequestMetricsMiddleware',
+    # Off unless asked for (X-Profile header, sample rate or admin switch)
+    'api_app.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
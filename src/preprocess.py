@@ -1,17 +1,9 @@
 # src/preprocess.py
-import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+# The normalization code lives in backend/api/utils/preprocess.py; this keeps
+# the old import path working for the Streamlit demo.
+import sys
+from pathlib import Path
 
-nltk.download("punkt", quiet=True)
-nltk.download("stopwords", quiet=True)
-STOPWORDS = set(stopwords.words("english"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
 
-def clean_text(text: str):
-    text = str(text).lower()
-    text = re.sub(r'http\S+|www.\S+', '', text)
-    text = re.sub(r'@\w+|#\w+', '', text)
-    text = re.sub(r'[^a-z0-9\s]', ' ', text)
-    tokens = [t for t in word_tokenize(text) if t not in STOPWORDS and len(t) > 1]
-    return " ".join(tokens)
+from api.utils.preprocess import STOPWORDS, clean_text, normalize, normalize_batch, tokenize  # noqa: E402,F401